@@ -0,0 +1,123 @@
+"""
+ALTERNATING LEAST SQUARES (NumPy)
+=================================
+Explicit-feedback matrix factorization with user/item biases, solved with
+batched normal equations over sparse rating matrices.
+
+Unlike cmfrec, the model can be initialised from existing factors, which is
+what the hyperparameter sweep uses to warm-start larger k from smaller k.
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class ALSModel:
+    """
+    Biased matrix factorization: r_ui ~ mu + b_u + b_i + p_u . q_i
+    """
+
+    def __init__(self, n_factors=4, lambda_=0.1, n_iter=10, random_state=42):
+        """
+        Parameters:
+        -----------
+        n_factors : Number of latent factors (d)
+        lambda_ : L2 regularization applied to factors and biases
+        n_iter : Number of ALS sweeps (users then items)
+        random_state : Seed for the factor initialisation
+        """
+        self.n_factors = n_factors
+        self.lambda_ = lambda_
+        self.n_iter = n_iter
+        self.random_state = random_state
+        self.global_mean = 0.0
+        self.user_factors = None
+        self.item_factors = None
+        self.user_bias = None
+        self.item_bias = None
+
+    def fit(self, user_idx, item_idx, ratings, n_users, n_items,
+            init_user_factors=None, init_item_factors=None):
+        """
+        Fit on encoded (user_idx, item_idx, rating) triplets
+
+        Parameters:
+        -----------
+        user_idx, item_idx : int arrays of 0-based row/column indices
+        ratings : float array of observed ratings
+        n_users, n_items : Matrix dimensions
+        init_user_factors, init_item_factors : Optional factors to start from.
+            They may have fewer columns than n_factors; the missing columns
+            are filled with small random values.
+        """
+        rng = np.random.default_rng(self.random_state)
+        ratings = np.asarray(ratings, dtype=np.float64)
+        self.global_mean = float(ratings.mean())
+
+        # Binary structure in both orientations, reused every sweep
+        ones = np.ones(len(ratings), dtype=np.float64)
+        user_major = csr_matrix((ones, (user_idx, item_idx)), shape=(n_users, n_items))
+        item_major = user_major.T.tocsr()
+
+        self.user_factors = self._init_factors(init_user_factors, n_users, rng)
+        self.item_factors = self._init_factors(init_item_factors, n_items, rng)
+        self.user_bias = np.zeros(n_users)
+        self.item_bias = np.zeros(n_items)
+
+        centered = ratings - self.global_mean
+        for _ in range(self.n_iter):
+            target = centered - self.item_bias[item_idx]
+            self.user_factors, self.user_bias = self._solve(
+                user_major, user_idx, item_idx, target, self.item_factors
+            )
+            target = centered - self.user_bias[user_idx]
+            self.item_factors, self.item_bias = self._solve(
+                item_major, item_idx, user_idx, target, self.user_factors
+            )
+
+        return self
+
+    def predict(self, user_idx, item_idx):
+        """Predict ratings for encoded (user_idx, item_idx) pairs"""
+        return (
+            self.global_mean
+            + self.user_bias[user_idx]
+            + self.item_bias[item_idx]
+            + np.einsum('ij,ij->i', self.user_factors[user_idx], self.item_factors[item_idx])
+        )
+
+    def _init_factors(self, init, n_rows, rng):
+        factors = rng.normal(0, 0.1, size=(n_rows, self.n_factors))
+        if init is not None:
+            k = min(init.shape[1], self.n_factors)
+            factors[:, :k] = init[:, :k]
+            factors[:, k:] *= 0.1
+        return factors
+
+    def _solve(self, structure, rows, cols, target, fixed):
+        """
+        Solve all rows at once: (F^T F + lambda I) x = F^T t, where F is
+        the fixed side's factors augmented with a constant bias column.
+        """
+        n_rows = structure.shape[0]
+        features = np.hstack([fixed, np.ones((fixed.shape[0], 1))])
+        d = features.shape[1]
+
+        # Per-row Gram matrices via one sparse-dense product over outer products
+        outer = (features[:, :, None] * features[:, None, :]).reshape(len(features), d * d)
+        gram = np.asarray(structure @ outer).reshape(n_rows, d, d)
+        gram += self.lambda_ * np.eye(d)
+
+        weighted = csr_matrix((target, (rows, cols)), shape=structure.shape)
+        rhs = np.asarray(weighted @ features)
+
+        solution = np.linalg.solve(gram, rhs[:, :, None])[:, :, 0]
+        return solution[:, :-1], solution[:, -1]
+
+
+def encode_ids(ids, categories=None):
+    """Map raw ids to 0-based codes; returns (codes, categories)"""
+    if categories is None:
+        categories = np.unique(ids)
+    codes = np.searchsorted(categories, ids).astype(np.int32)
+    return codes, categories
@@ -0,0 +1,72 @@
+"""
+APPROXIMATE NEAREST NEIGHBORS (IVF)
+===================================
+Inverted-file index over dense embeddings (e.g. MF item factors), in NumPy:
+vectors are clustered with a few k-means iterations, and a query is compared
+exactly only against the members of its n_probe closest clusters.
+
+Similarity is the inner product, so pass unit-length vectors for cosine.
+"""
+
+import numpy as np
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate inner-product search
+    """
+
+    def __init__(self, vectors, n_lists=None, n_probe=4, n_iter=10, random_state=42):
+        """
+        Build the index
+
+        Parameters:
+        -----------
+        vectors : (n x d) array of embeddings
+        n_lists : Number of clusters (default: about sqrt(n))
+        n_probe : Clusters scanned per query
+        n_iter : k-means iterations
+        """
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n_vectors = len(self.vectors)
+        self.n_lists = min(n_lists or max(1, int(np.sqrt(n_vectors))), n_vectors)
+        self.n_probe = n_probe
+
+        rng = np.random.default_rng(random_state)
+        self.centroids = self.vectors[rng.choice(n_vectors, self.n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignment = np.argmax(self.vectors @ self.centroids.T, axis=1)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assignment, self.vectors)
+            counts = np.bincount(assignment, minlength=self.n_lists)
+            filled = counts > 0
+            self.centroids[filled] = sums[filled] / counts[filled, None]
+
+        # Members of each list, contiguous: list l is order[starts[l]:starts[l + 1]]
+        assignment = np.argmax(self.vectors @ self.centroids.T, axis=1)
+        self.order = np.argsort(assignment, kind='stable').astype(np.int32)
+        self.starts = np.searchsorted(assignment[self.order], np.arange(self.n_lists + 1))
+
+    def search(self, query, k=10, exclude=None):
+        """
+        Approximate top-k rows by inner product with `query`
+
+        Returns:
+        --------
+        (rows, scores) : sorted by decreasing score
+        """
+        query = np.asarray(query, dtype=np.float32)
+        n_probe = min(self.n_probe, self.n_lists)
+        lists = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+
+        candidates = np.concatenate([self.order[self.starts[l]:self.starts[l + 1]] for l in lists])
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        scores = self.vectors[candidates] @ query
+
+        k = min(k, len(candidates))
+        if k <= 0:
+            return np.array([], dtype=np.int32), np.array([], dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return candidates[top], scores[top]
@@ -1,12 +1,96 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, current_app
 from app.utils.logger import api_logger, log_error
 from app.utils.decorators import log_api_call
+from app.utils.metrics import CONTENT_TYPE, RECOMMEND_ROUTING, registry
 from app.services.data_service import data_service
 from app.services.recommender import recommender_service
 import traceback
 
 api_bp = Blueprint('api', __name__)
 
+def _genre_args(source):
+    """genre / exclude_genre filters from query args or a JSON body (names, comma-separated or list)"""
+    return source.get('genre') or None, source.get('exclude_genre') or None
+
+def _int_arg(source, name, default, minimum=1):
+    """Integer request parameter (int or numeric string) >= minimum; raises ValueError"""
+    value = source.get(name, default)
+    try:
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer >= {minimum}") from None
+    if value < minimum:
+        raise ValueError(f"{name} must be an integer >= {minimum}")
+    return value
+
+def _float_arg(source, name, default, maximum=None):
+    """Finite non-negative number request parameter (<= maximum if given); raises ValueError"""
+    value = source.get(name, default)
+    message = f"{name} must be a non-negative number" if maximum is None else f"{name} must be a number between 0 and {maximum}"
+    try:
+        if isinstance(value, bool):
+            raise ValueError
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(message) from None
+    if not 0 <= value < float('inf') or (maximum is not None and value > maximum):
+        raise ValueError(message)
+    return value
+
+def _weight_overrides(weights, names):
+    """{engine: number} blend weight overrides (None = none); raises ValueError"""
+    if weights is None:
+        return {}
+    if not isinstance(weights, dict):
+        raise ValueError(f"weights must be an object of {{engine: number}} with engines {', '.join(names)}")
+    for name, weight in weights.items():
+        if name not in names:
+            raise ValueError(f"Unknown weights engine '{name}'. Known engines: {', '.join(names)}")
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)):
+            raise ValueError(f"weights.{name} must be a number")
+    return {name: float(weight) for name, weight in weights.items()}
+
+def _parse_user_ratings(ratings_input):
+    """
+    Split a ratings list into (movie_id, rating) pairs and unmatched entries
+
+    Entries identify a movie by movie_id or movie_title; entries with a rating
+    outside 1-5, an unknown title or a movie_id missing from the catalog are
+    returned as unmatched, and a movie given twice keeps its last rating. A
+    malformed list raises ValueError.
+    """
+    if not isinstance(ratings_input, list):
+        raise ValueError("ratings must be a list of {movie_id|movie_title, rating} objects")
+    
+    user_ratings = {}
+    unmatched = []
+    for entry in ratings_input:
+        if not isinstance(entry, dict):
+            raise ValueError("ratings must be a list of {movie_id|movie_title, rating} objects")
+        
+        rating = entry.get('rating')
+        if isinstance(rating, bool) or not isinstance(rating, (int, float)) or not 1 <= rating <= 5:
+            unmatched.append(entry)
+            continue
+        
+        movie_id = entry.get('movie_id')
+        if movie_id is not None:
+            movie_id = _int_arg(entry, 'movie_id', None)
+            if not data_service.has_movie(movie_id):
+                movie_id = None
+        elif isinstance(entry.get('movie_title'), str) and entry['movie_title']:
+            movie_match = data_service.find_movie_by_title(entry['movie_title'])
+            movie_id = None if movie_match.empty else int(movie_match.iloc[0]['movie_id'])
+        
+        if movie_id is None:
+            unmatched.append(entry)
+        else:
+            user_ratings.pop(movie_id, None)
+            user_ratings[movie_id] = float(rating)
+    return list(user_ratings.items()), unmatched
+
 @api_bp.route('/health', methods=['GET'])
 @log_api_call
 def health_check():
@@ -26,10 +110,15 @@ def get_movies():
     """Get all movies or search by title"""
     search = request.args.get('search', '').lower()
     limit = int(request.args.get('limit', 50))
+    genre, exclude_genre = _genre_args(request.args)
     
-    api_logger.info(f"Movies requested - search: '{search}', limit: {limit}")
+    api_logger.info("Movies requested - search: '%s', limit: %s, genre: %s, exclude_genre: %s", search, limit, genre, exclude_genre)
     
-    result = data_service.get_movies(search, limit)
+    try:
+        result = data_service.get_movies(search, limit, genre, exclude_genre)
+    except ValueError as e:
+        api_logger.warning("Invalid recommendation request: %s", e)
+        return jsonify({'error': str(e)}), 400
     
     movies_list = []
     for _, row in result.iterrows():
@@ -41,72 +130,199 @@ def get_movies():
             'numRatings': int(row['num_ratings'])
         })
     
-    api_logger.info(f"Returning {len(movies_list)} movies")
+    api_logger.info("Returning %d movies", len(movies_list))
     return jsonify(movies_list)
 
 @api_bp.route('/trending', methods=['GET'])
 @log_api_call
 def get_trending():
-    """Get trending movies (most rated)"""
-    limit = int(request.args.get('limit', 10))
+    """Get trending movies (most rated, all-time, in a recent window or for a demographic segment)"""
+    limit = request.args.get('limit', 10)
+    genre, exclude_genre = _genre_args(request.args)
+    window = request.args.get('window', 'all')
+    min_ratings = request.args.get('min_ratings')
+    segment = {dimension: request.args.get(dimension) for dimension in ('gender', 'age', 'occupation')}
+    segment_mode = any(value is not None for value in segment.values())
     
-    api_logger.info(f"Trending movies requested - limit: {limit}")
+    api_logger.info(
+        "Trending movies requested - limit: %s, window: %s, min_ratings: %s, segment: %s, genre: %s, exclude_genre: %s",
+        limit, window, min_ratings, segment, genre, exclude_genre
+    )
     
-    result = data_service.get_trending(limit)
+    try:
+        limit = _int_arg(request.args, 'limit', 10)
+        min_ratings = _float_arg(request.args, 'min_ratings', None) if min_ratings is not None else None
+        if segment_mode:
+            if window != 'all':
+                raise ValueError("window cannot be combined with gender/age/occupation")
+            result = data_service.get_segment_trending(
+                limit, sort=request.args.get('sort', 'popular'), min_ratings=min_ratings,
+                genre=genre, exclude_genre=exclude_genre, **segment
+            )
+        else:
+            result = data_service.get_trending(limit, genre, exclude_genre, window, min_ratings)
+    except ValueError as e:
+        api_logger.warning("Invalid trending request: %s", e)
+        return jsonify({'error': str(e)}), 400
     
+    # Window counts are integers except the decayed ones
+    decayed = not segment_mode and result['window_ratings'].dtype.kind == 'f'
     trending_list = []
     for _, row in result.iterrows():
-        trending_list.append({
+        movie = {
             'id': int(row['movie_id']),
             'title': row['title'],
             'genres': row['genres'],
             'avgRating': float(row['avg_rating']),
             'numRatings': int(row['num_ratings'])
-        })
+        }
+        if segment_mode:
+            movie['segmentRatings'] = int(row['segment_ratings'])
+            movie['segmentAvgRating'] = float(row['segment_avg_rating'])
+        else:
+            movie['windowRatings'] = float(row['window_ratings']) if decayed else int(row['window_ratings'])
+        trending_list.append(movie)
     
-    api_logger.info(f"Returning {len(trending_list)} trending movies")
+    api_logger.info("Returning %d trending movies", len(trending_list))
     return jsonify(trending_list)
 
 @api_bp.route('/recommend', methods=['POST'])
 @log_api_call
 def get_recommendations():
     """Get movie recommendations based on a movie title"""
-    data = request.json
+    data = request.json or {}
     movie_title = data.get('movie_title', '')
-    top_n = data.get('top_n', 10)
-    method = data.get('method', 'cosine')  # cosine or pearson
+    method = data.get('method', 'cosine')  # cosine, pearson, ease, content, hybrid or pipeline
+    genre, exclude_genre = _genre_args(data)
+    
+    try:
+        top_n = _int_arg(data, 'top_n', 10)
+        diversity = _float_arg(data, 'diversity', 0, maximum=1)
+        n_candidates = _int_arg(data, 'candidates', current_app.config['HYBRID_CANDIDATES'])
+        weight_overrides = _weight_overrides(data.get('weights'), recommender_service.HYBRID_WEIGHT_NAMES)
+    except ValueError as e:
+        api_logger.warning("Invalid recommendation request: %s", e)
+        return jsonify({'error': str(e)}), 400
     
-    api_logger.info(f"Recommendations requested - movie: '{movie_title}', method: {method}, top_n: {top_n}")
+    api_logger.info("Recommendations requested - movie: '%s', method: %s, top_n: %s, diversity: %s", movie_title, method, top_n, diversity)
     
     if not movie_title:
         api_logger.warning("Recommendation request missing movie_title")
         return jsonify({'error': 'movie_title is required'}), 400
     
+    # With diversity, rank a larger relevance-ordered pool and let MMR pick top_n
+    fetch_n = max(top_n, current_app.config['DIVERSITY_CANDIDATES']) if diversity > 0 else top_n
+    
     # Find movie ID
     movie_match = data_service.find_movie_by_title(movie_title)
     
     if movie_match.empty:
-        api_logger.warning(f"Movie not found: '{movie_title}'")
+        api_logger.warning("Movie not found: '%s'", movie_title)
         return jsonify({'error': 'Movie not found'}), 404
     
     movie_id = movie_match.iloc[0]['movie_id']
     matched_title = movie_match.iloc[0]['title']
     
-    api_logger.info(f"Found movie: '{matched_title}' (ID: {movie_id})")
+    api_logger.info("Found movie: '%s' (ID: %s)", matched_title, movie_id)
+    
+    # Too few ratings for collaborative filtering: answer from metadata
+    # (hybrid and pipeline already draw on the content engine)
+    requested_method = method
+    support = data_service.movie_support(movie_id)
+    if method not in ('hybrid', 'pipeline') and support < current_app.config['CONTENT_MIN_RATINGS']:
+        api_logger.info("Routing '%s' to content engine (%s ratings)", matched_title, support)
+        RECOMMEND_ROUTING.inc(method, 'content')
+        method = 'content'
     
     try:
-        if method == 'cosine':
-            recommendations = recommender_service.get_cosine_recommendations(movie_id, top_n)
+        if method == 'hybrid':
+            weights = {**current_app.config['HYBRID_WEIGHTS'], **weight_overrides}
+            
+            result = recommender_service.get_hybrid_recommendations(
+                movie_id, fetch_n, weights,
+                n_candidates=n_candidates,
+                genre=genre, exclude_genre=exclude_genre
+            )
+            result['recommendations'] = recommender_service.diversify(result['recommendations'], top_n, diversity)
+            api_logger.info("Generated %d hybrid recommendations in %.1fms", len(result['recommendations']), result['timing']['totalMs'])
+            
+            result.update({'input_movie': matched_title, 'method': method, 'requested_method': requested_method})
+            return jsonify(result)
+        
+        if method == 'pipeline':
+            result = recommender_service.get_pipeline_recommendations(
+                movie_id, current_app.config, fetch_n, genre, exclude_genre
+            )
+            result['recommendations'] = recommender_service.diversify(result['recommendations'], top_n, diversity)
+            api_logger.info(
+                "Generated %d pipeline recommendations from %d candidates in %.1fms",
+                len(result['recommendations']), result['candidates'], result['timing']['totalMs']
+            )
+            
+            result.update({'input_movie': matched_title, 'method': method, 'requested_method': requested_method})
+            return jsonify(result)
+        
+        if method == 'content':
+            recommendations = recommender_service.get_content_recommendations(movie_id, fetch_n, genre, exclude_genre)
+        elif method == 'ease':
+            recommendations = recommender_service.get_ease_recommendations(movie_id, fetch_n, genre, exclude_genre)
+        elif method == 'cosine':
+            recommendations = recommender_service.get_cosine_recommendations(movie_id, fetch_n, genre, exclude_genre)
         else:
-            recommendations = recommender_service.get_pearson_recommendations(movie_id, top_n)
+            recommendations = recommender_service.get_pearson_recommendations(movie_id, fetch_n, genre, exclude_genre)
+        recommendations = recommender_service.diversify(recommendations, top_n, diversity)
         
-        api_logger.info(f"Generated {len(recommendations)} recommendations for '{matched_title}'")
+        api_logger.info("Generated %d recommendations for '%s'", len(recommendations), matched_title)
         
         return jsonify({
             'input_movie': matched_title,
             'method': method,
+            'requested_method': requested_method,
             'recommendations': recommendations
         })
+    except ValueError as e:
+        api_logger.warning("Invalid recommendation request: %s", e)
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        log_error(type(e).__name__, str(e), traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/recommend/user', methods=['POST'])
+@log_api_call
+def get_user_recommendations():
+    """Get movie recommendations for a new user from their ratings (user-based CF)"""
+    data = request.json or {}
+    ratings_input = data.get('ratings', [])
+    
+    try:
+        top_n = _int_arg(data, 'top_n', 10)
+        neighbors = _int_arg(data, 'neighbors', current_app.config['USER_BASED_NEIGHBORS'])
+        slow_ms = _float_arg(data, 'slow_ms', current_app.config['USER_BASED_SLOW_MS'])
+        user_ratings, unmatched = _parse_user_ratings(ratings_input)
+    except ValueError as e:
+        api_logger.warning("Invalid user-based request: %s", e)
+        return jsonify({'error': str(e)}), 400
+    
+    api_logger.info("User-based recommendations requested - ratings: %d, neighbors: %s, top_n: %s", len(ratings_input), neighbors, top_n)
+    
+    if not user_ratings:
+        api_logger.warning("User-based request without any valid ratings")
+        return jsonify({'error': 'ratings must contain at least one {movie_id|movie_title, rating 1-5}'}), 400
+    
+    try:
+        result = recommender_service.get_user_based_recommendations(
+            user_ratings,
+            top_n=top_n,
+            n_neighbors=neighbors,
+            min_common=current_app.config['USER_BASED_MIN_COMMON'],
+            max_postings=current_app.config['USER_BASED_MAX_POSTINGS'],
+            slow_ms=slow_ms
+        )
+        
+        api_logger.info("Generated %d user-based recommendations in %.1fms", len(result['recommendations']), result['timing']['totalMs'])
+        
+        result.update({'method': 'user', 'unmatched': unmatched})
+        return jsonify(result)
     except Exception as e:
         log_error(type(e).__name__, str(e), traceback.format_exc())
         return jsonify({'error': str(e)}), 500
@@ -119,5 +335,18 @@ def get_stats():
     
     stats = data_service.get_stats()
     
-    api_logger.info(f"Returning stats: {stats['totalMovies']} movies, {stats['totalRatings']} ratings")
+    api_logger.info("Returning stats: %s movies, %s ratings", stats['totalMovies'], stats['totalRatings'])
     return jsonify(stats)
+
+@api_bp.route('/debug/startup', methods=['GET'])
+@log_api_call
+def get_startup_profile():
+    """Wall time, CPU time and memory of every load_data stage, and the startup budget check"""
+    if data_service.startup is None:
+        return jsonify({'error': 'Data not loaded yet'}), 404
+    return jsonify({'initialized': data_service.initialized, **data_service.startup.report()})
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request, recommendation, load and process metrics in the Prometheus text format"""
+    return Response(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,141 @@
+"""
+Configuration for ZeeMovies application
+
+Every setting can be overridden with an environment variable of the same
+name prefixed with ZEE_ (e.g. ZEE_USER_BASED_NEIGHBORS=20).
+"""
+import os
+
+
+def _env(name, default, cast=str):
+    value = os.environ.get(f'ZEE_{name}')
+    if value is None:
+        return default
+    try:
+        return cast(value)
+    except ValueError as e:
+        raise ValueError(f"Invalid ZEE_{name}: {e}") from e
+
+
+def _weights(*names):
+    """
+    Cast for 'cosine=0.3,mf=0.2' -> {'cosine': 0.3, 'mf': 0.2}; when names
+    are given, any other name raises ValueError when the setting is read
+    """
+    def cast(value):
+        pairs = (item.split('=') for item in value.split(',') if item.strip())
+        weights = {name.strip(): float(weight) for name, weight in pairs}
+        unknown = sorted(set(weights) - set(names)) if names else []
+        if unknown:
+            raise ValueError(f"Unknown names {unknown} in weights '{value}'. Known names: {', '.join(names)}")
+        return weights
+    return cast
+
+
+def _flag(value):
+    """'1' / 'true' / 'yes' / 'on' -> True, anything else -> False"""
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _levels(value):
+    """'api=WARNING,access=INFO' -> {'api': 'WARNING', 'access': 'INFO'}"""
+    pairs = (item.split('=') for item in value.split(',') if item.strip())
+    return {name.strip(): level.strip().upper() for name, level in pairs}
+
+
+class Config:
+    # Folder with ratings.dat, movies.dat and users.dat
+    DATA_PATH = _env('DATA_PATH', './data/')
+
+    # User-based collaborative filtering (/api/recommend/user)
+    USER_BASED_NEIGHBORS = _env('USER_BASED_NEIGHBORS', 10, int)
+    USER_BASED_MIN_COMMON = _env('USER_BASED_MIN_COMMON', 2, int)
+    # Report-only threshold: slower requests are logged, counted and flagged
+    # in the response (the work itself is bounded by USER_BASED_MAX_POSTINGS)
+    USER_BASED_SLOW_MS = _env('USER_BASED_SLOW_MS', 100.0, float)
+    # Cap on movie postings scanned per request; the least popular input
+    # movies are used first when a request would exceed it
+    USER_BASED_MAX_POSTINGS = _env('USER_BASED_MAX_POSTINGS', 500000, int)
+
+    # Content-based engine (cold start): movies with fewer ratings than
+    # CONTENT_MIN_RATINGS are answered from metadata neighbors instead
+    CONTENT_MIN_RATINGS = _env('CONTENT_MIN_RATINGS', 10, int)
+    CONTENT_NEIGHBORS = _env('CONTENT_NEIGHBORS', 50, int)
+
+    # EASE closed-form item model (method=ease)
+    EASE_LAMBDA = _env('EASE_LAMBDA', 500.0, float)
+
+    # Matrix factorization (ALS) fitted at load for the hybrid ranker
+    MF_FACTORS = _env('MF_FACTORS', 16, int)
+    MF_LAMBDA = _env('MF_LAMBDA', 1.0, float)
+    MF_ITERATIONS = _env('MF_ITERATIONS', 10, int)
+
+    # Hybrid ranker (method=hybrid): per-engine blend weights (engines with
+    # weight 0 are not queried) and candidates retrieved per engine
+    HYBRID_WEIGHTS = _env('HYBRID_WEIGHTS', {
+        'cosine': 0.3,
+        'pearson': 0.2,
+        'mf': 0.2,
+        'ease': 0.0,
+        'content': 0.1,
+        'popularity': 0.2
+    }, _weights('cosine', 'pearson', 'mf', 'ease', 'content', 'popularity'))
+    HYBRID_CANDIDATES = _env('HYBRID_CANDIDATES', 100, int)
+
+    # Two-stage pipeline (method=pipeline): candidates per generator, size
+    # of the precomputed neighbor tables, reranker feature weights, MMR
+    # diversity (0 = off) and the co-rater count at which the Pearson feature
+    # gets its full weight
+    PIPELINE_CANDIDATES = _env('PIPELINE_CANDIDATES', 300, int)
+    PIPELINE_NEIGHBORS = _env('PIPELINE_NEIGHBORS', 100, int)
+    PIPELINE_WEIGHTS = _env('PIPELINE_WEIGHTS', {'pearson': 0.5, 'mf': 0.5}, _weights('pearson', 'mf'))
+    PIPELINE_DIVERSITY = _env('PIPELINE_DIVERSITY', 0.0, float)
+    PIPELINE_SIGNIFICANCE = _env('PIPELINE_SIGNIFICANCE', 50, int)
+
+    # MMR diversity on /api/recommend (diversity=0..1): size of the
+    # relevance-ordered pool the diverse top_n is picked from
+    DIVERSITY_CANDIDATES = _env('DIVERSITY_CANDIDATES', 100, int)
+
+    # /api/trending: default minimum ratings all-time and inside a day
+    # window (window=7d, 30d, ...), half-life of window=decay
+    TRENDING_MIN_RATINGS = _env('TRENDING_MIN_RATINGS', 100, int)
+    TRENDING_WINDOW_MIN_RATINGS = _env('TRENDING_WINDOW_MIN_RATINGS', 1, int)
+    TRENDING_HALF_LIFE_DAYS = _env('TRENDING_HALF_LIFE_DAYS', 30.0, float)
+
+    # Demographic trending (/api/trending?gender=&age=&occupation=): segment
+    # means are shrunk toward the movie mean with SEGMENT_SHRINKAGE pseudo-
+    # ratings; sort=rating needs SEGMENT_MIN_RATINGS ratings in the segment
+    SEGMENT_SHRINKAGE = _env('SEGMENT_SHRINKAGE', 20.0, float)
+    SEGMENT_MIN_RATINGS = _env('SEGMENT_MIN_RATINGS', 5, int)
+
+    # Access log: query strings and JSON bodies are recorded so traffic can be
+    # replayed (benchmarks/replay_access_log.py); larger bodies are omitted
+    ACCESS_LOG_BODY_MAX = _env('ACCESS_LOG_BODY_MAX', 16384, int)
+
+    # Logging: LOG_ASYNC hands records to a background writer thread (file and
+    # console I/O off the request thread); LOG_LEVELS gates each logger
+    # (e.g. 'api=WARNING' drops per-request info lines before formatting);
+    # ACCESS_LOG_SAMPLE is the fraction of successful requests written to
+    # access.log (4xx/5xx are always written); LOG_LEAN_RECORDS stops logging
+    # from filling the caller/thread/process fields of records, for every
+    # logger in the process (off by default)
+    LOG_ASYNC = _env('LOG_ASYNC', True, _flag)
+    LOG_CONSOLE = _env('LOG_CONSOLE', True, _flag)
+    LOG_LEVELS = _env('LOG_LEVELS', {'api': 'INFO', 'access': 'INFO', 'error': 'ERROR'}, _levels)
+    ACCESS_LOG_SAMPLE = _env('ACCESS_LOG_SAMPLE', 1.0, float)
+    LOG_LEAN_RECORDS = _env('LOG_LEAN_RECORDS', False, _flag)
+
+    # Startup budget: load_data fails (StartupBudgetExceeded) when it takes
+    # longer than STARTUP_BUDGET_S or a stage longer than its entry in
+    # STARTUP_STAGE_BUDGETS (e.g. 'similarity=20,ease=30'); 0 / empty = off.
+    # STARTUP_TRACEMALLOC adds per-stage Python allocation figures (slower load)
+    STARTUP_BUDGET_S = _env('STARTUP_BUDGET_S', 0.0, float)
+    STARTUP_STAGE_BUDGETS = _env('STARTUP_STAGE_BUDGETS', {}, _weights())
+    STARTUP_TRACEMALLOC = _env('STARTUP_TRACEMALLOC', False, _flag)
+
+    # Per-request profiling: with PROFILING_ENABLED, requests with the
+    # PROFILING_HEADER header or ?<PROFILING_QUERY_FLAG>=1 run under cProfile
+    # (stats in logs/profiles/, id in the X-Profile-Id response header)
+    PROFILING_ENABLED = _env('PROFILING_ENABLED', False, _flag)
+    PROFILING_HEADER = _env('PROFILING_HEADER', 'X-Profile')
+    PROFILING_QUERY_FLAG = _env('PROFILING_QUERY_FLAG', 'profile')
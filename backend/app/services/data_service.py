@@ -1,7 +1,20 @@
+import time
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
 from sklearn.metrics.pairwise import cosine_similarity
 import traceback
+from app.config import Config
 from app.utils.logger import api_logger, error_logger
+from app.utils.metrics import DATA_ROWS, LOAD_STAGE_SECONDS, SNAPSHOT_TIMESTAMP, SNAPSHOT_VERSION
+from content_recommender import ContentRecommender
+from data_loader import load_ratings, read_movies, read_users
+from ease_recommender import EASERecommender
+from als_solver import ALSModel
+from schema import compact_frames, genre_bitmask, genre_bits, genre_filter, memory_mb
+from segment_popularity import SegmentPopularity
+from startup_profile import StartupBudgetExceeded, StartupProfile
+from trending_index import TrendingIndex, parse_window
 
 class DataService:
     _instance = None
@@ -14,69 +27,192 @@ class DataService:
             cls._instance.users_df = None
             cls._instance.movie_user_pivot = None
             cls._instance.item_similarity_matrix = None
+            cls._instance.rating_index = None
+            cls._instance.movie_stats = None
+            cls._instance.trending_index = None
+            cls._instance.segment_popularity = None
+            cls._instance.genre_vocabulary = None
+            cls._instance.content_engine = None
+            cls._instance.ease_engine = None
+            cls._instance.mf_model = None
+            cls._instance.mf_item_embeddings = None
+            cls._instance.pivot_genre_masks = None
+            cls._instance.pivot_row_sums = None
+            cls._instance.pivot_row_sq_sums = None
+            cls._instance.snapshot_version = 0
+            cls._instance.startup = None
             cls._instance.initialized = False
         return cls._instance
 
+    @contextmanager
+    def _stage(self, name):
+        """Profile one load_data stage (startup profile and load stage metric)"""
+        with self.startup.stage(name) as record:
+            yield
+        LOAD_STAGE_SECONDS.set(record['wallS'], name)
+
     def load_data(self):
         """Load and prepare data"""
         if self.initialized:
             return
 
         api_logger.info("Loading data...")
+        self.startup = StartupProfile('DataService', trace_memory=Config.STARTUP_TRACEMALLOC)
         
         try:
-            # Load datasets
-            self.ratings_df = pd.read_csv(
-                './data/ratings.dat',
-                sep='::',
-                engine='python',
-                header=0,
-                names=['user_id', 'movie_id', 'rating', 'timestamp'],
-                encoding='ISO-8859-1'
-            )
-            api_logger.info(f"Loaded {len(self.ratings_df)} ratings")
-            
-            self.movies_df = pd.read_csv(
-                './data/movies.dat',
-                sep='::',
-                engine='python',
-                header=0,
-                names=['movie_id', 'title', 'genres'],
-                encoding='ISO-8859-1'
-            )
+            # Load datasets; ratings are streamed in chunks straight into compact
+            # columns, the rating index and per-movie stats
+            with self._stage('ratings'):
+                self.ratings_df, self.rating_index, rating_stats = load_ratings(f'{Config.DATA_PATH}ratings.dat')
+            api_logger.info(f"Loaded {len(self.ratings_df)} ratings ({memory_mb(self.ratings_df):.2f} MB)")
+            
+            with self._stage('movies'):
+                self.movies_df = read_movies(f'{Config.DATA_PATH}movies.dat')
             api_logger.info(f"Loaded {len(self.movies_df)} movies")
             
-            self.users_df = pd.read_csv(
-                './data/users.dat',
-                sep='::',
-                engine='python',
-                header=0,
-                names=['user_id', 'gender', 'age', 'occupation', 'zip_code'],
-                encoding='ISO-8859-1'
-            )
+            with self._stage('users'):
+                self.users_df = read_users(f'{Config.DATA_PATH}users.dat')
             api_logger.info(f"Loaded {len(self.users_df)} users")
             
-            # Create pivot table for recommendations
+            # Compact dtypes for movies and users: int32 ids, categoricals
+            with self._stage('compact'):
+                frames, memory_report = compact_frames(movies=self.movies_df, users=self.users_df)
+                self.movies_df, self.users_df = frames['movies'], frames['users']
+                
+                # One uint32 genre bitmask per movie for vectorized genre filters
+                masks, self.genre_vocabulary = genre_bitmask(self.movies_df['genres'])
+                self.movies_df['genre_mask'] = masks
+            for name, row in memory_report.iterrows():
+                api_logger.info(
+                    f"Memory {name}: {row['before_mb']:.2f} MB -> {row['after_mb']:.2f} MB "
+                    f"({row['saved_pct']:.0f}% saved)"
+                )
+            
+            # Dense movie x user pivot, densified from the rating index rather
+            # than re-grouping the ratings (float32, 0 = not rated)
             api_logger.info("Creating pivot table...")
-            self.movie_user_pivot = self.ratings_df.pivot_table(
-                index='movie_id',
-                columns='user_id',
-                values='rating'
-            ).fillna(0)
+            with self._stage('pivot'):
+                self.movie_user_pivot = pd.DataFrame(
+                    self.rating_index.movie_matrix.T.toarray(),
+                    index=pd.Index(self.rating_index.movie_ids, name='movie_id'),
+                    columns=pd.Index(self.rating_index.user_ids, name='user_id')
+                )
             
             # Pre-calculate item similarity matrix
             api_logger.info("Calculating similarity matrix...")
-            self.item_similarity_matrix = cosine_similarity(self.movie_user_pivot)
+            with self._stage('similarity'):
+                self.item_similarity_matrix = cosine_similarity(self.movie_user_pivot)
+            
+            # Row moments for vectorized Pearson, genre masks in pivot order
+            with self._stage('pivot_moments'):
+                pivot_values = self.movie_user_pivot.values
+                self.pivot_row_sums = pivot_values.sum(axis=1)
+                self.pivot_row_sq_sums = np.einsum('ij,ij->i', pivot_values, pivot_values)
+                self.pivot_genre_masks = (
+                    self.movies_df.set_index('movie_id')['genre_mask']
+                    .reindex(self.movie_user_pivot.index, fill_value=0)
+                    .values.astype(np.uint32)
+                )
+            
+            # EASE item weights: one float32 inverse of the item Gram matrix
+            api_logger.info("Fitting EASE model...")
+            with self._stage('ease'):
+                self.ease_engine = EASERecommender(
+                    self.ratings_df, self.movies_df, lambda_=Config.EASE_LAMBDA, index=self.rating_index
+                ).fit()
+            api_logger.info(f"EASE fitted in {self.ease_engine.fit_time:.2f}s ({self.ease_engine.memory_mb:.0f} MB)")
+            
+            # Matrix factorization over the same index; unit-length item
+            # factors make MF item-item similarity a single product
+            api_logger.info("Fitting matrix factorization model...")
+            with self._stage('mf'):
+                coo = self.rating_index.user_matrix.tocoo()
+                self.mf_model = ALSModel(
+                    n_factors=Config.MF_FACTORS, lambda_=Config.MF_LAMBDA, n_iter=Config.MF_ITERATIONS
+                ).fit(coo.row, coo.col, coo.data, *self.rating_index.shape)
+                norms = np.linalg.norm(self.mf_model.item_factors, axis=1, keepdims=True)
+                self.mf_item_embeddings = (self.mf_model.item_factors / np.maximum(norms, 1e-12)).astype(np.float32)
+            
+            # Per-movie stats and details looked up by id on the hot path
+            # (whole catalog; unrated movies have 0 ratings)
+            with self._stage('movie_stats'):
+                self.movie_stats = self.movies_df.set_index('movie_id')[['title', 'genres', 'genre_mask']].join(rating_stats)
+                self.movie_stats = self.movie_stats.fillna({'avg_rating': 0, 'num_ratings': 0}).astype({'num_ratings': 'int64'})
+                self.movie_stats = self.movie_stats[['avg_rating', 'num_ratings', 'title', 'genres', 'genre_mask']]
+            
+            # Cumulative daily rating counts per movie for windowed trending
+            with self._stage('trending_index'):
+                self.trending_index = TrendingIndex.from_ratings(
+                    self.ratings_df, self.movie_stats.index.values, half_life_days=Config.TRENDING_HALF_LIFE_DAYS
+                )
+            api_logger.info(
+                f"Trending index: {self.trending_index.n_buckets} days "
+                f"({self.trending_index.memory_mb:.1f} MB)"
+            )
+            
+            # Popularity cubes over gender x age x occupation for new visitors
+            with self._stage('segment_popularity'):
+                self.segment_popularity = SegmentPopularity(
+                    self.ratings_df, self.users_df, self.movie_stats.index.values,
+                    shrinkage=Config.SEGMENT_SHRINKAGE, min_ratings=Config.SEGMENT_MIN_RATINGS
+                ).fit()
+            api_logger.info(
+                f"Segment popularity built in {self.segment_popularity.fit_time:.2f}s "
+                f"({self.segment_popularity.memory_mb:.0f} MB)"
+            )
+            
+            # Metadata neighbors for movies with too few ratings
+            api_logger.info("Building content neighbor table...")
+            with self._stage('content'):
+                self.content_engine = ContentRecommender(self.movies_df, k=Config.CONTENT_NEIGHBORS).fit()
+            api_logger.info(f"Content neighbor table built in {self.content_engine.fit_time:.2f}s")
+            
+            # Per-stage timing and memory, then the startup budget: a load over
+            # budget is never marked initialized, so it is not served
+            self.startup.finish()
+            for line in self.startup.format_table().splitlines():
+                api_logger.info("%s", line)
+            self.startup.enforce_budget(Config.STARTUP_BUDGET_S, Config.STARTUP_STAGE_BUDGETS)
             
             self.initialized = True
+            self.snapshot_version += 1
+            SNAPSHOT_VERSION.set(self.snapshot_version)
+            SNAPSHOT_TIMESTAMP.set(time.time())
+            for table, frame in (('ratings', self.ratings_df), ('movies', self.movies_df), ('users', self.users_df)):
+                DATA_ROWS.set(len(frame), table)
             api_logger.info("Data loaded successfully!")
             
+        except StartupBudgetExceeded as e:
+            error_logger.error("%s", e)
+            raise
         except Exception as e:
             error_logger.error(f"Failed to load data: {str(e)}")
             error_logger.error(traceback.format_exc())
             raise
 
-    def get_movies(self, search='', limit=50):
+    def genre_allowed(self, masks, genre=None, exclude_genre=None):
+        """
+        Boolean mask over `masks` (genre bitmasks): movies with any of `genre`
+        and none of `exclude_genre` (comma-separated names or lists).
+        Unknown genre names raise ValueError.
+        """
+        include = genre_bits(genre, self.genre_vocabulary) if genre else 0
+        exclude = genre_bits(exclude_genre, self.genre_vocabulary) if exclude_genre else 0
+        return genre_filter(masks, include, exclude)
+
+    def has_movie(self, movie_id):
+        """Whether movie_id is in the catalog"""
+        if not self.initialized:
+            self.load_data()
+        return movie_id in self.movie_stats.index
+
+    def movie_support(self, movie_id):
+        """Number of ratings of a movie (0 if unknown)"""
+        if movie_id not in self.movie_stats.index:
+            return 0
+        return int(self.movie_stats.at[movie_id, 'num_ratings'])
+
+    def get_movies(self, search='', limit=50, genre=None, exclude_genre=None):
         if not self.initialized:
             self.load_data()
             
@@ -85,33 +221,59 @@ class DataService:
         else:
             filtered = self.movies_df
         
-        # Get movie stats
-        movie_stats = self.ratings_df.groupby('movie_id').agg({
-            'rating': ['mean', 'count']
-        }).reset_index()
-        movie_stats.columns = ['movie_id', 'avg_rating', 'num_ratings']
+        if genre or exclude_genre:
+            filtered = filtered[self.genre_allowed(filtered['genre_mask'].values, genre, exclude_genre)]
         
-        # Merge and sort
-        result = filtered.merge(movie_stats, on='movie_id', how='left')
+        # Attach precomputed movie stats and sort
+        result = filtered.join(self.movie_stats[['avg_rating', 'num_ratings']], on='movie_id')
         result = result.fillna({'avg_rating': 0, 'num_ratings': 0})
-        result = result.sort_values('num_ratings', ascending=False).head(limit)
+        result = result.sort_values('num_ratings', ascending=False, kind='stable').head(limit)
         
         return result
 
-    def get_trending(self, limit=10):
+    def get_trending(self, limit=10, genre=None, exclude_genre=None, window='all', min_ratings=None):
+        """
+        Most rated movies in a time window relative to the newest rating:
+        'all', a number of days ('7d', '30d', '365d') or 'decay' (exponentially
+        decayed counts). min_ratings applies to the count inside the window.
+        The result has a window_ratings column; invalid arguments raise ValueError.
+        """
         if not self.initialized:
             self.load_data()
 
-        movie_stats = self.ratings_df.groupby('movie_id').agg({
-            'rating': ['mean', 'count']
-        }).reset_index()
-        movie_stats.columns = ['movie_id', 'avg_rating', 'num_ratings']
+        window = parse_window(window)
+        if min_ratings is None:
+            min_ratings = Config.TRENDING_MIN_RATINGS if window == 'all' else Config.TRENDING_WINDOW_MIN_RATINGS
+        
+        allowed = None
+        if genre or exclude_genre:
+            allowed = self.genre_allowed(self.movie_stats['genre_mask'].values, genre, exclude_genre)
         
-        # Filter movies with at least 100 ratings
-        popular = movie_stats[movie_stats['num_ratings'] >= 100]
-        popular = popular.sort_values('num_ratings', ascending=False).head(limit)
+        positions, counts = self.trending_index.top(window, limit, min_ratings, allowed)
+        result = self.movie_stats.iloc[positions].rename_axis('movie_id').reset_index()
+        result['window_ratings'] = counts
+        return result
+
+    def get_segment_trending(self, limit=10, gender=None, age=None, occupation=None,
+                             sort='popular', min_ratings=None, genre=None, exclude_genre=None):
+        """
+        Top movies of a demographic segment (any dimension left as None is
+        rolled up), by segment rating count or shrunk segment mean rating.
+        The result has segment_ratings and segment_avg_rating columns;
+        invalid arguments raise ValueError.
+        """
+        if not self.initialized:
+            self.load_data()
+
+        segment = self.segment_popularity.segment(gender, age, occupation)
+        allowed = None
+        if genre or exclude_genre:
+            allowed = self.genre_allowed(self.movie_stats['genre_mask'].values, genre, exclude_genre)
         
-        result = popular.merge(self.movies_df, on='movie_id')
+        positions, counts, means = self.segment_popularity.top(segment, limit, sort, min_ratings, allowed)
+        result = self.movie_stats.iloc[positions].rename_axis('movie_id').reset_index()
+        result['segment_ratings'] = counts
+        result['segment_avg_rating'] = means
         return result
 
     def get_stats(self):
@@ -122,7 +284,7 @@ class DataService:
             'totalMovies': int(len(self.movies_df)),
             'totalRatings': int(len(self.ratings_df)),
             'totalUsers': int(len(self.users_df)),
-            'avgRating': float(self.ratings_df['rating'].mean()),
+            'avgRating': float(self.ratings_df['rating'].to_numpy().mean(dtype=np.float64)),
             'sparsity': float((self.movie_user_pivot == 0).sum().sum() / (self.movie_user_pivot.shape[0] * self.movie_user_pivot.shape[1]) * 100)
         }
 
@@ -0,0 +1,255 @@
+"""
+Two-stage recommendation pipeline
+
+Stage 1: cheap candidate generators (precomputed neighbor tables, ANN over
+MF embeddings, trending, content) each return a few hundred movie ids.
+Stage 2: a reranker applies the expensive scoring (exact co-rated Pearson,
+MF dot products, diversity) to that candidate set only.
+
+Every stage is timed. Generators and the reranker are plain objects, so a
+pipeline can be assembled with other parts and handed to RecommenderService.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from ann_index import IVFIndex
+from similarity import blocked_top_k_cosine, corated_pearson, mmr_rerank
+
+EMPTY = (np.array([], dtype=np.int64), np.array([], dtype=np.float32))
+
+
+class NeighborTableGenerator:
+    """Candidates from a precomputed (movies x k) neighbor table"""
+
+    def __init__(self, name, movie_ids, neighbors, scores):
+        self.name = name
+        self.movie_ids = movie_ids
+        self.neighbors = neighbors
+        self.scores = scores
+
+    def generate(self, movie_id, n):
+        position = np.searchsorted(self.movie_ids, movie_id)
+        if position >= len(self.movie_ids) or self.movie_ids[position] != movie_id:
+            return EMPTY
+        neighbors = self.neighbors[position][:n]
+        valid = neighbors >= 0
+        return self.movie_ids[neighbors[valid]], self.scores[position][:n][valid]
+
+
+class ANNGenerator:
+    """Candidates from an IVF index over unit-length embeddings"""
+
+    def __init__(self, movie_ids, embeddings, n_probe=8):
+        self.name = 'ann'
+        self.movie_ids = movie_ids
+        self.embeddings = embeddings
+        self.index = IVFIndex(embeddings, n_probe=n_probe)
+
+    def generate(self, movie_id, n):
+        position = np.searchsorted(self.movie_ids, movie_id)
+        if position >= len(self.movie_ids) or self.movie_ids[position] != movie_id:
+            return EMPTY
+        rows, scores = self.index.search(self.embeddings[position], n, exclude=position)
+        return self.movie_ids[rows], scores
+
+
+class TrendingGenerator:
+    """The most rated movies, whatever the query (at most `limit` of them)"""
+
+    def __init__(self, movie_ids, counts, limit=50):
+        order = np.argsort(-counts, kind='stable')
+        self.name = 'trending'
+        self.movie_ids = movie_ids[order]
+        self.scores = (counts[order] / max(counts.max(), 1)).astype(np.float32)
+        self.limit = limit
+
+    def generate(self, movie_id, n):
+        n = min(n, self.limit)
+        keep = self.movie_ids[:n + 1] != movie_id
+        return self.movie_ids[:n + 1][keep][:n], self.scores[:n + 1][keep][:n]
+
+
+class ContentGenerator:
+    """Candidates from the content engine's neighbor table"""
+
+    def __init__(self, content_engine):
+        self.name = 'content'
+        self.content_engine = content_engine
+
+    def generate(self, movie_id, n):
+        return self.content_engine.similar_movies(movie_id, n)
+
+
+class Reranker:
+    """
+    Exact scoring of a candidate set
+
+    score = sum of weight * feature over the features below, then an optional
+    MMR pass over MF-embedding similarity trades relevance for diversity.
+
+    - pearson: co-rated Pearson with the query movie (0 under min_common),
+      shrunk by min(common, significance) / significance so pairs with few
+      co-raters do not outrank well-supported ones
+    - mf: cosine of the MF item factors
+    """
+    FEATURES = ('pearson', 'mf')
+
+    def __init__(self, rating_index, embeddings, weights=None, diversity=0.0, min_common=5,
+                 significance=50):
+        weights = weights or {'pearson': 0.5, 'mf': 0.5}
+        unknown = sorted(set(weights) - set(self.FEATURES))
+        if unknown:
+            raise ValueError(f"Unknown reranker features {unknown}. Known features: {', '.join(self.FEATURES)}")
+        if significance < 1:
+            raise ValueError(f"significance must be >= 1, got {significance}")
+        self.rating_index = rating_index
+        self.movie_user = rating_index.movie_matrix.T.tocsr()
+        self.embeddings = embeddings
+        self.weights = weights
+        self.diversity = diversity
+        self.min_common = min_common
+        self.significance = significance
+
+    def _pearson(self, query_code, codes):
+        query = self.movie_user[query_code].toarray()
+        correlation, common = corated_pearson(query, self.movie_user[codes], self.min_common)
+        support = np.minimum(common[:, 0], self.significance) / self.significance
+        return np.nan_to_num(correlation[:, 0]) * support
+
+    def _mf(self, query_code, codes):
+        return self.embeddings[codes] @ self.embeddings[query_code]
+
+    def rerank(self, movie_id, candidate_ids, top_n, diversity=None):
+        """
+        Returns:
+        --------
+        (movie_ids, scores, features, timing) for the top_n candidates;
+        features maps each feature name to its values for those movies
+        """
+        diversity = self.diversity if diversity is None else diversity
+        timing = {}
+        query_code = self.rating_index.movie_codes(movie_id)[0]
+        codes = self.rating_index.movie_codes(candidate_ids)
+        known = codes >= 0
+        if query_code < 0 or not known.any():
+            return candidate_ids[:0], np.array([], dtype=np.float32), {}, timing
+        candidate_ids, codes = candidate_ids[known], codes[known]
+
+        features = {}
+        scorers = {'pearson': self._pearson, 'mf': self._mf}
+        for name, weight in self.weights.items():
+            if weight:
+                start_time = time.perf_counter()
+                features[name] = scorers[name](query_code, codes).astype(np.float32)
+                timing[f'{name}Ms'] = (time.perf_counter() - start_time) * 1000
+
+        relevance = np.zeros(len(codes), dtype=np.float32)
+        for name, values in features.items():
+            relevance += self.weights[name] * values
+
+        start_time = time.perf_counter()
+        if diversity > 0:
+            # MMR over the best few times top_n, not the whole candidate set
+            pool = np.argsort(-relevance, kind='stable')[:top_n * 5]
+            vectors = self.embeddings[codes[pool]]
+            picked = pool[mmr_rerank(relevance[pool], vectors @ vectors.T, top_n, diversity)]
+        else:
+            picked = np.argsort(-relevance, kind='stable')[:top_n]
+        timing['diversityMs'] = (time.perf_counter() - start_time) * 1000
+
+        return (candidate_ids[picked], relevance[picked],
+                {name: values[picked] for name, values in features.items()}, timing)
+
+
+class RecommendationPipeline:
+    """
+    Candidate generation (concurrent) followed by reranking
+    """
+
+    def __init__(self, generators, reranker, n_candidates=300, max_workers=None):
+        """
+        Parameters:
+        -----------
+        generators : Objects with .name and .generate(movie_id, n) -> (movie_ids, scores)
+        reranker : Object with .rerank(movie_id, candidate_ids, top_n, diversity)
+        n_candidates : Candidates requested from each generator
+        """
+        self.generators = list(generators)
+        self.reranker = reranker
+        self.n_candidates = n_candidates
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or len(self.generators))
+
+    def _generate(self, generator, movie_id):
+        start_time = time.perf_counter()
+        movie_ids, _ = generator.generate(movie_id, self.n_candidates)
+        return movie_ids, (time.perf_counter() - start_time) * 1000
+
+    def run(self, movie_id, top_n=10, candidate_filter=None, diversity=None):
+        """
+        Recommend top_n movies for movie_id
+
+        candidate_filter : Optional callable(movie_ids) -> boolean mask,
+                           applied to the merged candidates before reranking
+
+        Returns:
+        --------
+        dict with movie_ids, scores, features, sources (generators that
+        proposed each movie), candidates (count) and timing (ms per stage)
+        """
+        start_time = time.perf_counter()
+        timing = {}
+
+        futures = [self._executor.submit(self._generate, generator, movie_id) for generator in self.generators]
+        proposals = {}
+        for generator, future in zip(self.generators, futures):
+            movie_ids, elapsed_ms = future.result()
+            proposals[generator.name] = movie_ids
+            timing[f'{generator.name}Ms'] = elapsed_ms
+
+        candidate_ids = np.unique(np.concatenate([ids for ids in proposals.values()] + [EMPTY[0]]))
+        candidate_ids = candidate_ids[candidate_ids != movie_id]
+        if candidate_filter is not None and len(candidate_ids):
+            candidate_ids = candidate_ids[candidate_filter(candidate_ids)]
+        candidates_time = time.perf_counter()
+        timing['candidatesMs'] = (candidates_time - start_time) * 1000
+
+        movie_ids, scores, features, rerank_timing = self.reranker.rerank(movie_id, candidate_ids, top_n, diversity)
+        timing.update(rerank_timing)
+        timing['rerankMs'] = (time.perf_counter() - candidates_time) * 1000
+        timing['totalMs'] = (time.perf_counter() - start_time) * 1000
+
+        proposed = {name: set(ids.tolist()) for name, ids in proposals.items()}
+        sources = [[name for name, ids in proposed.items() if movie in ids] for movie in movie_ids.tolist()]
+        return {
+            'movie_ids': movie_ids,
+            'scores': scores,
+            'features': features,
+            'sources': sources,
+            'candidates': int(len(candidate_ids)),
+            'timing': timing
+        }
+
+
+def build_default_pipeline(data_service, n_candidates=300, neighbors=100, weights=None, diversity=0.0,
+                           significance=50):
+    """
+    Pipeline over the data already loaded by DataService: item cosine and
+    EASE neighbor tables, ANN over the MF item factors, trending and content
+    """
+    index = data_service.rating_index
+    movie_ids = index.movie_ids
+
+    cosine_neighbors, cosine_scores = blocked_top_k_cosine(index.movie_matrix.T, k=neighbors)
+    _, ease_neighbors, ease_scores = data_service.ease_engine.item_neighbors(k=neighbors)
+    counts = data_service.movie_stats['num_ratings'].reindex(movie_ids, fill_value=0).values
+
+    generators = [
+        NeighborTableGenerator('cosine', movie_ids, cosine_neighbors, cosine_scores),
+        NeighborTableGenerator('ease', movie_ids, ease_neighbors, ease_scores),
+        ANNGenerator(movie_ids, data_service.mf_item_embeddings),
+        TrendingGenerator(movie_ids, counts),
+        ContentGenerator(data_service.content_engine),
+    ]
+    reranker = Reranker(index, data_service.mf_item_embeddings, weights=weights, diversity=diversity,
+                        significance=significance)
+    return RecommendationPipeline(generators, reranker, n_candidates=n_candidates)
@@ -1,99 +1,491 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
 import numpy as np
-from scipy.stats import pearsonr
 from app.utils.logger import api_logger
+from app.utils.metrics import CACHE_REQUESTS, ENGINE_RETRIEVAL_LATENCY, RECOMMEND_LATENCY, USER_BASED_SLOW_REQUESTS
 from app.services.data_service import data_service
+from app.services.pipeline import build_default_pipeline
+from similarity import mmr_rerank
+from user_based_recommender import UserBasedRecommender
+
+def blend_scores(engine_results, weights, popularity=None):
+    """
+    Align per-engine candidate scores into dense arrays and blend them
+
+    Each engine's scores are min-max normalized to [0, 1] over its own
+    candidates; a candidate an engine did not return scores 0 for it.
+
+    Parameters:
+    -----------
+    engine_results : {engine: (movie_ids, scores)}
+    weights : {engine: weight}; 'popularity' weights the popularity feature
+    popularity : Optional callable mapping candidate ids to [0, 1] scores
+
+    Returns:
+    --------
+    (candidate_ids, blended, normalized) : sorted candidate ids, blended
+    scores and the {engine: normalized scores} they were built from
+    """
+    candidate_ids = np.unique(np.concatenate(
+        [ids for ids, _ in engine_results.values()] or [np.array([], dtype=np.int64)]
+    ))
+
+    normalized = {}
+    for engine, (ids, scores) in engine_results.items():
+        aligned = np.zeros(len(candidate_ids))
+        if len(ids):
+            scores = np.asarray(scores, dtype=np.float64)
+            low, high = scores.min(), scores.max()
+            aligned[np.searchsorted(candidate_ids, ids)] = (
+                (scores - low) / (high - low) if high > low else 1.0
+            )
+        normalized[engine] = aligned
+
+    if popularity is not None and weights.get('popularity', 0):
+        normalized['popularity'] = popularity(candidate_ids)
+
+    names = list(normalized)
+    matrix = np.vstack([normalized[name] for name in names]) if names else np.zeros((0, 0))
+    blended = np.array([weights.get(name, 0.0) for name in names]) @ matrix if names else np.zeros(0)
+    return candidate_ids, blended, normalized
+
+
+def timed(method):
+    """Record the wrapped recommendation call in the per-method latency histogram"""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                RECOMMEND_LATENCY.observe(time.perf_counter() - start_time, method)
+        return wrapper
+    return decorator
+
 
 class RecommenderService:
-    def get_cosine_recommendations(self, movie_id, top_n=10):
-        """Get recommendations using cosine similarity"""
-        if not data_service.initialized:
-            data_service.load_data()
-            
+    # Engines the hybrid ranker can retrieve candidates from
+    HYBRID_ENGINES = ('cosine', 'pearson', 'mf', 'ease', 'content')
+    # Popularity is blended as a candidate feature, not retrieved
+    HYBRID_WEIGHT_NAMES = HYBRID_ENGINES + ('popularity',)
+
+    def __init__(self):
+        self._user_based = None
+        self._executor = ThreadPoolExecutor(max_workers=len(self.HYBRID_ENGINES))
+        self.pipeline = None
+        self._pipeline_version = None
+        self._pipeline_lock = threading.Lock()
+
+    def set_pipeline(self, pipeline):
+        """Use a custom RecommendationPipeline for method=pipeline (kept across data reloads)"""
+        with self._pipeline_lock:
+            self.pipeline = pipeline
+            self._pipeline_version = 'custom'
+
+    def _pipeline(self, config):
+        """
+        The configured pipeline, built over DataService on first use and
+        rebuilt when load_data publishes a new snapshot
+        """
+        version = data_service.snapshot_version
+        if self.pipeline is not None and self._pipeline_version in (version, 'custom'):
+            CACHE_REQUESTS.inc('pipeline', 'hit')
+            return self.pipeline
+
+        # One build per snapshot: concurrent first requests wait for it
+        with self._pipeline_lock:
+            if self.pipeline is None or self._pipeline_version not in (version, 'custom'):
+                CACHE_REQUESTS.inc('pipeline', 'miss')
+                start_time = time.perf_counter()
+                self.pipeline = build_default_pipeline(
+                    data_service,
+                    n_candidates=config['PIPELINE_CANDIDATES'],
+                    neighbors=config['PIPELINE_NEIGHBORS'],
+                    weights=config['PIPELINE_WEIGHTS'],
+                    diversity=config['PIPELINE_DIVERSITY'],
+                    significance=config['PIPELINE_SIGNIFICANCE']
+                )
+                self._pipeline_version = version
+                api_logger.info("Recommendation pipeline built for snapshot %s in %.0fms",
+                                version, (time.perf_counter() - start_time) * 1000)
+            else:
+                CACHE_REQUESTS.inc('pipeline', 'hit')
+            return self.pipeline
+
+    def _user_based_engine(self):
+        """User-based engine bound to the shared in-memory data and index"""
+        stale = self._user_based is None or self._user_based.index is not data_service.rating_index
+        CACHE_REQUESTS.inc('user_based_engine', 'miss' if stale else 'hit')
+        if stale:
+            self._user_based = UserBasedRecommender(
+                data_service.ratings_df,
+                data_service.movies_df,
+                index=data_service.rating_index
+            )
+        return self._user_based
+
+    @staticmethod
+    def _top_indices(scores, top_n):
+        """Indices of the top_n finite scores, best first (-inf marks excluded)"""
+        top_n = min(top_n, int(np.isfinite(scores).sum()))
+        if top_n <= 0:
+            return np.array([], dtype=int)
+        top = np.argpartition(-scores, top_n - 1)[:top_n]
+        return top[np.argsort(-scores[top], kind='stable')]
+
+    def _pivot_scores(self, movie_id, scores_for, genre=None, exclude_genre=None):
+        """
+        Score every pivot movie against movie_id with scores_for(movie_idx),
+        masking the movie itself and movies outside the genre filter
+        """
         try:
             movie_idx = data_service.movie_user_pivot.index.get_loc(movie_id)
         except KeyError:
-            api_logger.warning(f"Movie ID {movie_id} not found in pivot table")
-            return []
-        
-        # Get similarity scores
-        similarity_scores = list(enumerate(data_service.item_similarity_matrix[movie_idx]))
-        similarity_scores = sorted(similarity_scores, key=lambda x: x[1], reverse=True)
-        
-        # Get top N (excluding the movie itself)
-        top_similar = similarity_scores[1:top_n+1]
-        
+            api_logger.warning("Movie ID %s not found in pivot table", movie_id)
+            return None
+
+        scores = scores_for(movie_idx)
+        scores[movie_idx] = -np.inf
+        if genre or exclude_genre:
+            allowed = data_service.genre_allowed(data_service.pivot_genre_masks, genre, exclude_genre)
+            scores[~allowed] = -np.inf
+        return scores
+
+    def _similarity_recommendations(self, scores, top_n):
+        """Recommendation dicts for the top_n pivot rows by score"""
+        top = self._top_indices(scores, top_n)
+        return self._recommendation_list(data_service.movie_user_pivot.index[top], scores[top])
+
+    @staticmethod
+    def _recommendation_list(rec_movie_ids, scores):
+        """Recommendation dicts for movie ids and their similarity scores"""
+        details = data_service.movie_stats.loc[rec_movie_ids]
+
         recommendations = []
-        for idx, score in top_similar:
-            rec_movie_id = data_service.movie_user_pivot.index[idx]
-            movie_info = data_service.get_movie_details(rec_movie_id)
-            movie_ratings = data_service.get_movie_ratings(rec_movie_id)
-            
+        for score, (rec_movie_id, info) in zip(scores, details.iterrows()):
+            score = float(score)
             recommendations.append({
                 'id': int(rec_movie_id),
-                'title': movie_info['title'],
-                'genres': movie_info['genres'],
-                'similarity': float(score),
+                'title': info['title'],
+                'genres': info['genres'],
+                'similarity': score,
                 'match': f"{int(score * 100)}%",
-                'avgRating': float(movie_ratings['rating'].mean()) if len(movie_ratings) > 0 else 0,
-                'numRatings': int(len(movie_ratings))
+                'avgRating': float(info['avg_rating']),
+                'numRatings': int(info['num_ratings'])
             })
-        
+
         return recommendations
 
-    def get_pearson_recommendations(self, movie_id, top_n=10):
+    @timed('cosine')
+    def get_cosine_recommendations(self, movie_id, top_n=10, genre=None, exclude_genre=None):
+        """Get recommendations using cosine similarity"""
+        if not data_service.initialized:
+            data_service.load_data()
+
+        scores = self._pivot_scores(
+            movie_id,
+            lambda movie_idx: data_service.item_similarity_matrix[movie_idx].astype(np.float64),
+            genre, exclude_genre
+        )
+        if scores is None:
+            return []
+        return self._similarity_recommendations(scores, top_n)
+
+    @timed('pearson')
+    def get_pearson_recommendations(self, movie_id, top_n=10, genre=None, exclude_genre=None):
         """Get recommendations using Pearson correlation"""
         if not data_service.initialized:
             data_service.load_data()
 
-        try:
-            target_movie_ratings = data_service.movie_user_pivot.loc[movie_id].dropna()
-        except KeyError:
-            api_logger.warning(f"Movie ID {movie_id} not found in pivot table")
+        scores = self._pivot_scores(movie_id, self._pearson_row, genre, exclude_genre)
+        if scores is None:
             return []
-        
-        correlations = []
-        
-        for other_movie_id in data_service.movie_user_pivot.index:
-            if other_movie_id == movie_id:
-                continue
-            
-            other_movie_ratings = data_service.movie_user_pivot.loc[other_movie_id].dropna()
-            
-            # Find common users
-            common_users = target_movie_ratings.index.intersection(other_movie_ratings.index)
-            
-            if len(common_users) > 5:
-                corr, _ = pearsonr(
-                    target_movie_ratings[common_users],
-                    other_movie_ratings[common_users]
-                )
-                
-                if not np.isnan(corr):
-                    correlations.append({
-                        'movie_id': other_movie_id,
-                        'correlation': corr,
-                        'common_users': len(common_users)
-                    })
-        
-        # Sort by correlation
-        correlations = sorted(correlations, key=lambda x: x['correlation'], reverse=True)[:top_n]
-        
+        return self._similarity_recommendations(scores, top_n)
+
+    @staticmethod
+    def _pearson_row(movie_idx):
+        """
+        Correlation of a pivot row with every row of the (zero-filled) pivot
+        in one matrix-vector product, from precomputed row moments
+        """
+        values = data_service.movie_user_pivot.values
+        n = values.shape[1]
+        sums, sq_sums = data_service.pivot_row_sums, data_service.pivot_row_sq_sums
+
+        numerator = n * (values @ values[movie_idx]) - sums * sums[movie_idx]
+        denominator = np.sqrt(
+            np.clip(n * sq_sums - sums ** 2, 0, None)
+            * max(n * sq_sums[movie_idx] - sums[movie_idx] ** 2, 0)
+        )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = numerator / denominator
+        correlation[denominator <= 0] = -np.inf
+        return correlation
+
+    def _retrieve(self, engine, movie_id, n_candidates, genre=None, exclude_genre=None):
+        """Top n_candidates (movie_ids, scores) of one engine, timed"""
+        start_time = time.perf_counter()
+
+        if engine in ('ease', 'content'):
+            masks = data_service.pivot_genre_masks if engine == 'ease' else data_service.movies_df['genre_mask'].values
+            allowed = data_service.genre_allowed(masks, genre, exclude_genre) if genre or exclude_genre else None
+            model = data_service.ease_engine if engine == 'ease' else data_service.content_engine
+            movie_ids, scores = model.similar_movies(movie_id, n_candidates, allowed)
+        else:
+            row_scores = {
+                'cosine': lambda movie_idx: data_service.item_similarity_matrix[movie_idx].astype(np.float64),
+                'pearson': self._pearson_row,
+                'mf': lambda movie_idx: (data_service.mf_item_embeddings
+                                         @ data_service.mf_item_embeddings[movie_idx]).astype(np.float64)
+            }[engine]
+            scores = self._pivot_scores(movie_id, row_scores, genre, exclude_genre)
+            if scores is None:
+                movie_ids, scores = np.array([], dtype=np.int64), np.array([])
+            else:
+                top = self._top_indices(scores, n_candidates)
+                movie_ids, scores = data_service.movie_user_pivot.index.values[top], scores[top]
+
+        elapsed = time.perf_counter() - start_time
+        ENGINE_RETRIEVAL_LATENCY.observe(elapsed, engine)
+        return movie_ids, scores, elapsed * 1000
+
+    @staticmethod
+    def _popularity(movie_ids):
+        """log-scaled rating counts in [0, 1]"""
+        counts = data_service.movie_stats['num_ratings']
+        return np.log1p(counts.loc[movie_ids].values) / np.log1p(max(counts.max(), 1))
+
+    @timed('hybrid')
+    def get_hybrid_recommendations(self, movie_id, top_n=10, weights=None, n_candidates=100,
+                                   genre=None, exclude_genre=None):
+        """
+        Blend several engines' candidates into one ranking
+
+        Every engine with a non-zero weight retrieves its top n_candidates
+        concurrently; scores are normalized per engine, aligned over the union
+        of candidates and blended (see blend_scores). Popularity is a feature
+        of the candidates rather than a retriever, so at least one retrieving
+        engine needs a non-zero weight (ValueError otherwise).
+        """
+        if not data_service.initialized:
+            data_service.load_data()
+
+        start_time = time.perf_counter()
+        engines = [engine for engine in self.HYBRID_ENGINES if weights.get(engine, 0)]
+        if not engines:
+            raise ValueError(f"weights must give at least one of {', '.join(self.HYBRID_ENGINES)} a non-zero weight")
+        futures = {
+            engine: self._executor.submit(self._retrieve, engine, movie_id, n_candidates, genre, exclude_genre)
+            for engine in engines
+        }
+
+        engine_results, timing = {}, {}
+        for engine, future in futures.items():
+            movie_ids, scores, elapsed_ms = future.result()
+            engine_results[engine] = (movie_ids, scores)
+            timing[f'{engine}Ms'] = elapsed_ms
+        retrieval_time = time.perf_counter()
+
+        candidate_ids, blended, normalized = blend_scores(engine_results, weights, self._popularity)
+        top = self._top_indices(blended, top_n)
+
+        recommendations = self._recommendation_list(candidate_ids[top], blended[top])
+        for recommendation, idx in zip(recommendations, top):
+            recommendation['breakdown'] = {engine: float(scores[idx]) for engine, scores in normalized.items()}
+
+        timing.update({
+            'retrievalMs': (retrieval_time - start_time) * 1000,
+            'blendMs': (time.perf_counter() - retrieval_time) * 1000,
+            'totalMs': (time.perf_counter() - start_time) * 1000
+        })
+
+        return {
+            'recommendations': recommendations,
+            'weights': {name: weights[name] for name in normalized},
+            'candidates': int(len(candidate_ids)),
+            'timing': timing
+        }
+
+    def diversify(self, recommendations, top_n, diversity):
+        """
+        Maximal Marginal Relevance over a relevance-ordered recommendation list
+
+        Relevance is each item's min-max normalized 'similarity'; redundancy is
+        the item-item cosine similarity held by DataService, read one row per
+        pick (movies outside the pivot have no similarity to anything).
+        """
+        if diversity <= 0 or len(recommendations) <= 1:
+            return recommendations[:top_n]
+
+        relevance = np.array([recommendation['similarity'] for recommendation in recommendations])
+        low, high = relevance.min(), relevance.max()
+        relevance = (relevance - low) / (high - low) if high > low else np.ones_like(relevance)
+
+        codes = data_service.rating_index.movie_codes([recommendation['id'] for recommendation in recommendations])
+        known = codes >= 0
+        similarity_matrix = data_service.item_similarity_matrix
+
+        if known.all():
+            def similarity_row(position):
+                return similarity_matrix[codes[position], codes]
+        else:
+            known_codes = codes[known]
+
+            def similarity_row(position):
+                row = np.zeros(len(codes), dtype=np.float32)
+                if known[position]:
+                    row[known] = similarity_matrix[codes[position], known_codes]
+                return row
+
+        picked = mmr_rerank(relevance, similarity_row, top_n, diversity)
+        return [recommendations[position] for position in picked]
+
+    @timed('pipeline')
+    def get_pipeline_recommendations(self, movie_id, config, top_n=10, genre=None, exclude_genre=None):
+        """
+        Two-stage recommendations: candidate generators, then exact reranking
+        of the candidates only (see app.services.pipeline)
+        """
+        if not data_service.initialized:
+            data_service.load_data()
+
+        candidate_filter = None
+        if genre or exclude_genre:
+            masks = data_service.movie_stats['genre_mask']
+            candidate_filter = lambda movie_ids: data_service.genre_allowed(
+                masks.loc[movie_ids].values, genre, exclude_genre
+            )
+
+        result = self._pipeline(config).run(movie_id, top_n, candidate_filter)
+
+        recommendations = self._recommendation_list(result['movie_ids'], result['scores'])
+        for position, recommendation in enumerate(recommendations):
+            recommendation['features'] = {name: float(values[position]) for name, values in result['features'].items()}
+            recommendation['sources'] = result['sources'][position]
+
+        return {
+            'recommendations': recommendations,
+            'candidates': result['candidates'],
+            'timing': result['timing']
+        }
+
+    @timed('ease')
+    def get_ease_recommendations(self, movie_id, top_n=10, genre=None, exclude_genre=None):
+        """Get recommendations from the EASE item weights"""
+        if not data_service.initialized:
+            data_service.load_data()
+
+        # The rating index and the pivot share the same sorted movie ids
+        allowed = None
+        if genre or exclude_genre:
+            allowed = data_service.genre_allowed(data_service.pivot_genre_masks, genre, exclude_genre)
+
+        rec_movie_ids, scores = data_service.ease_engine.similar_movies(movie_id, top_n, allowed)
+        return self._recommendation_list(rec_movie_ids, scores)
+
+    @timed('content')
+    def get_content_recommendations(self, movie_id, top_n=10, genre=None, exclude_genre=None):
+        """Get recommendations from movie metadata (genres, release period, title)"""
+        if not data_service.initialized:
+            data_service.load_data()
+
+        allowed = None
+        if genre or exclude_genre:
+            allowed = data_service.genre_allowed(data_service.movies_df['genre_mask'].values, genre, exclude_genre)
+
+        rec_movie_ids, scores = data_service.content_engine.similar_movies(movie_id, top_n, allowed)
+        return self._recommendation_list(rec_movie_ids, scores)
+
+    @timed('user')
+    def get_user_based_recommendations(self, user_ratings, top_n=10, n_neighbors=10,
+                                       min_common=2, max_postings=500000, slow_ms=100.0):
+        """
+        Get recommendations for a new user from similar users (weighted ratings)
+
+        user_ratings is a list of (movie_id, rating) pairs. Similar users are
+        found through the movies' posting lists; if those lists hold more than
+        max_postings entries, the least popular input movies are used first.
+        Requests slower than slow_ms are only reported (logged, counted and
+        flagged in timing), not cut short.
+        """
+        if not data_service.initialized:
+            data_service.load_data()
+
+        start_time = time.perf_counter()
+        engine = self._user_based_engine()
+        index = data_service.rating_index
+
+        movie_codes = index.movie_codes([movie_id for movie_id, _ in user_ratings])
+        ratings = np.array([rating for _, rating in user_ratings], dtype=np.float32)
+        known = movie_codes >= 0
+        movie_codes, ratings = movie_codes[known], ratings[known]
+
+        # Bound the work: least popular movies first, up to max_postings
+        postings = np.diff(index.movie_matrix.indptr)[movie_codes]
+        order = np.argsort(postings, kind='stable')
+        within_cap = np.cumsum(postings[order]) <= max_postings
+        within_cap[:1] = True
+        used = order[within_cap]
+        truncated = bool(len(used) < len(order))
+
+        user_codes, similarity, common = engine.user_similarities(
+            movie_codes[used], ratings[used], min_common
+        )
+        similarity_time = time.perf_counter()
+
+        neighbors = np.argsort(-similarity, kind='stable')[:n_neighbors]
+        scores = engine.score_movies(user_codes[neighbors], similarity[neighbors], movie_codes)
+        predicted = scores['weighted_rating_sum'] / scores['similarity_sum']
+
+        # Highest predicted rating first, more similarity mass breaks ties
+        ranked = np.lexsort((-scores['similarity_sum'], -predicted))[:top_n]
+        rec_movie_ids = index.movie_ids[scores['movie_codes'][ranked]]
+        details = data_service.movie_stats.loc[rec_movie_ids]
+
         recommendations = []
-        for item in correlations:
-            rec_movie_id = item['movie_id']
-            movie_info = data_service.get_movie_details(rec_movie_id)
-            movie_ratings = data_service.get_movie_ratings(rec_movie_id)
-            
+        for position, (rec_movie_id, info) in zip(ranked, details.iterrows()):
+            score = float(predicted[position])
             recommendations.append({
                 'id': int(rec_movie_id),
-                'title': movie_info['title'],
-                'genres': movie_info['genres'],
-                'similarity': float(item['correlation']),
-                'match': f"{int(item['correlation'] * 100)}%",
-                'avgRating': float(movie_ratings['rating'].mean()) if len(movie_ratings) > 0 else 0,
-                'numRatings': int(len(movie_ratings))
+                'title': info['title'],
+                'genres': info['genres'],
+                'score': score,
+                'match': f"{int(score / 5 * 100)}%",
+                'supportingNeighbors': int(scores['num_ratings'][position]),
+                'avgRating': float(info['avg_rating']),
+                'numRatings': int(info['num_ratings'])
             })
-        
-        return recommendations
+
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        slow = elapsed_ms > slow_ms
+        if slow:
+            USER_BASED_SLOW_REQUESTS.inc()
+            api_logger.warning(
+                "User-based recommendation took %.1fms (slow threshold %.0fms) for %d ratings",
+                elapsed_ms, slow_ms, len(user_ratings)
+            )
+
+        return {
+            'recommendations': recommendations,
+            'neighbors': [
+                {
+                    'userId': int(index.user_ids[user_codes[i]]),
+                    'similarity': float(similarity[i]),
+                    'commonMovies': int(common[i])
+                }
+                for i in neighbors
+            ],
+            'ratingsUsed': int(len(used)),
+            'truncated': truncated,
+            'timing': {
+                'similarityMs': (similarity_time - start_time) * 1000,
+                'totalMs': elapsed_ms,
+                'slowMs': slow_ms,
+                'slow': slow
+            }
+        }
 
 recommender_service = RecommenderService()
@@ -1,14 +1,28 @@
 from functools import wraps
+import json
 import time
 import traceback
-from flask import request
-from app.utils.logger import log_request, log_error
+from flask import request, current_app
+from app.utils.logger import log_request, log_error, should_log_request
+from app.utils.metrics import HTTP_LATENCY, HTTP_REQUESTS
+
+def _replay_details():
+    """(query string, one-line JSON body) of the current request for the access log"""
+    query = request.query_string.decode('latin-1') or None
+    payload = request.get_json(silent=True) if request.is_json else None
+    if payload is None:
+        return query, None
+    body = json.dumps(payload, separators=(',', ':'))
+    limit = current_app.config.get('ACCESS_LOG_BODY_MAX', 16384)
+    if len(body) > limit:
+        body = f"<omitted {len(body)} chars>"
+    return query, body
 
 def log_api_call(f):
-    """Decorator to log API calls with timing"""
+    """Decorator to log API calls with timing and record them in the request metrics"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        start_time = time.time()
+        start_time = time.perf_counter()
         endpoint = request.path
         method = request.method
         
@@ -17,7 +31,7 @@ def log_api_call(f):
             result = f(*args, **kwargs)
             
             # Calculate response time
-            response_time = time.time() - start_time
+            response_time = time.perf_counter() - start_time
             
             # Get status code
             if isinstance(result, tuple):
@@ -25,14 +39,20 @@ def log_api_call(f):
             else:
                 status_code = 200
             
-            # Log the request
-            log_request(endpoint, method, status_code, response_time)
+            HTTP_REQUESTS.inc(endpoint, method, str(status_code))
+            HTTP_LATENCY.observe(response_time, endpoint, method)
+            
+            # Log the request (with what is needed to replay it), if sampled
+            if should_log_request(status_code):
+                log_request(endpoint, method, status_code, response_time, *_replay_details())
             
             return result
             
         except Exception as e:
-            response_time = time.time() - start_time
-            log_request(endpoint, method, 500, response_time)
+            response_time = time.perf_counter() - start_time
+            HTTP_REQUESTS.inc(endpoint, method, '500')
+            HTTP_LATENCY.observe(response_time, endpoint, method)
+            log_request(endpoint, method, 500, response_time, *_replay_details())
             log_error(type(e).__name__, str(e), traceback.format_exc())
             raise
     
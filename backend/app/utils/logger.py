@@ -1,10 +1,20 @@
 """
 Logging configuration for ZeeMovies application
+
+With Config.LOG_ASYNC (the default) each logger only puts records on a queue;
+a QueueListener thread formats them and does the file and console I/O, so a
+request pays for one queue put per line. Messages use lazy %-style arguments,
+so lines below a logger's level (Config.LOG_LEVELS) are never formatted.
 """
+import atexit
 import logging
 import os
+import queue
+import random
 from datetime import datetime
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from app.config import Config
 
 # Create logs directory if it doesn't exist
 LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs')
@@ -19,12 +29,42 @@ ACCESS_LOG_FILE = os.path.join(LOGS_DIR, 'access.log')
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
 
-def setup_logger(name, log_file, level=logging.INFO):
+# Logger name -> (log file name, default level)
+LOGGERS = {
+    'api': ('api.log', 'INFO'),
+    'error': ('error.log', 'ERROR'),
+    'access': ('access.log', 'INFO'),
+}
+
+# logging's own settings for the caller, thread and process record fields
+_RECORD_FIELDS = (logging._srcfile, logging.logThreads, logging.logProcesses, logging.logMultiprocessing)
+
+_listeners = []
+_access_sample = 1.0
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues records as they are
+
+    The stock handler merges the %-arguments into the message on the calling
+    thread; here the listener thread does it while formatting. Log arguments
+    must therefore not be mutated after the call (ints, floats and strings).
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logger(name, log_file, level=logging.INFO, async_mode=False, console=True):
     """
     Set up a logger with file and console handlers
+
+    Existing handlers are replaced, so loggers can be reconfigured at runtime.
+    With async_mode the handlers run on a QueueListener thread.
     """
     formatter = logging.Formatter(LOG_FORMAT, DATE_FORMAT)
-    
+
     # File handler with rotation (10MB max, keep 5 backups)
     file_handler = RotatingFileHandler(
         log_file,
@@ -32,44 +72,131 @@ def setup_logger(name, log_file, level=logging.INFO):
         backupCount=5
     )
     file_handler.setFormatter(formatter)
-    
+    handlers = [file_handler]
+
     # Console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
     # Create logger
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+    if async_mode:
+        records = queue.SimpleQueue()
+        listener = QueueListener(records, *handlers, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+        logger.addHandler(DeferredQueueHandler(records))
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
+
     return logger
 
+
+def stop_logging():
+    """Flush queued records and stop the background writer threads"""
+    while _listeners:
+        listener = _listeners.pop()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def set_lean_records(enabled):
+    """
+    Skip the caller, thread and process fields of new log records, or restore them
+
+    LOG_FORMAT uses none of these fields, and skipping them saves a stack walk
+    and several lookups per record. The switches are module globals of
+    logging, so every logger in the process (Flask, werkzeug, libraries)
+    loses these fields too.
+    """
+    srcfile, threads, processes, multiprocessing = (None, False, False, False) if enabled else _RECORD_FIELDS
+    logging._srcfile = srcfile
+    logging.logThreads = threads
+    logging.logProcesses = processes
+    logging.logMultiprocessing = multiprocessing
+
+
+def configure_logging(async_mode=None, levels=None, access_sample=None, console=None, logs_dir=LOGS_DIR,
+                      lean_records=None):
+    """
+    (Re)configure the api, error and access loggers
+
+    Parameters:
+    -----------
+    async_mode : Queue records to a background writer (default Config.LOG_ASYNC)
+    levels : {logger name: level name} (default Config.LOG_LEVELS; missing names keep LOGGERS' level)
+    access_sample : Fraction of successful requests written to access.log (default Config.ACCESS_LOG_SAMPLE)
+    console : Also write to stderr (default Config.LOG_CONSOLE)
+    logs_dir : Folder of the log files
+    lean_records : Process-wide set_lean_records (default Config.LOG_LEAN_RECORDS)
+    """
+    global _access_sample
+    async_mode = Config.LOG_ASYNC if async_mode is None else async_mode
+    levels = Config.LOG_LEVELS if levels is None else levels
+    console = Config.LOG_CONSOLE if console is None else console
+    _access_sample = Config.ACCESS_LOG_SAMPLE if access_sample is None else access_sample
+    set_lean_records(Config.LOG_LEAN_RECORDS if lean_records is None else lean_records)
+
+    stop_logging()
+    os.makedirs(logs_dir, exist_ok=True)
+    for name, (file_name, default_level) in LOGGERS.items():
+        level = logging.getLevelName(levels.get(name, default_level))
+        setup_logger(name, os.path.join(logs_dir, file_name), level, async_mode, console)
+
+
 # Create loggers
-api_logger = setup_logger('api', API_LOG_FILE)
-error_logger = setup_logger('error', ERROR_LOG_FILE, logging.ERROR)
-access_logger = setup_logger('access', ACCESS_LOG_FILE)
+configure_logging()
+atexit.register(stop_logging)
+api_logger = logging.getLogger('api')
+error_logger = logging.getLogger('error')
+access_logger = logging.getLogger('access')
 
-def log_request(endpoint, method, status_code, response_time):
-    """Log API request details"""
+def should_log_request(status_code):
+    """
+    Whether this request goes to access.log: access INFO enabled, and either
+    an error status or picked by the Config.ACCESS_LOG_SAMPLE sampling
+    """
+    if not access_logger.isEnabledFor(logging.INFO):
+        return False
+    return status_code >= 400 or _access_sample >= 1.0 or random.random() < _access_sample
+
+def log_request(endpoint, method, status_code, response_time, query=None, body=None):
+    """
+    Log API request details
+
+    The query string is appended to the endpoint and a JSON body (one line)
+    goes last, so access.log lines can be replayed:
+        POST /api/recommend - Status: 200 - Time: 0.012s - Body: {"movie_title":"Heat (1995)"}
+    """
     access_logger.info(
-        f"{method} {endpoint} - Status: {status_code} - Time: {response_time:.3f}s"
+        "%s %s%s%s - Status: %s - Time: %.3fs%s%s",
+        method, endpoint, '?' if query else '', query or '', status_code, response_time,
+        ' - Body: ' if body is not None else '', body if body is not None else ''
     )
 
 def log_error(error_type, error_message, traceback_info=None):
     """Log error details"""
-    error_logger.error(f"{error_type}: {error_message}")
+    error_logger.error("%s: %s", error_type, error_message)
     if traceback_info:
-        error_logger.error(f"Traceback: {traceback_info}")
+        error_logger.error("Traceback: %s", traceback_info)
 
 def log_startup():
     """Log application startup"""
     api_logger.info("=" * 80)
-    api_logger.info(f"ZeeMovies API Server Starting - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    api_logger.info("ZeeMovies API Server Starting - %s", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
     api_logger.info("=" * 80)
 
 def log_shutdown():
     """Log application shutdown"""
     api_logger.info("=" * 80)
-    api_logger.info(f"ZeeMovies API Server Shutting Down - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    api_logger.info("ZeeMovies API Server Shutting Down - %s", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
     api_logger.info("=" * 80)
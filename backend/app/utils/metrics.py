@@ -0,0 +1,222 @@
+"""
+In-process metrics for ZeeMovies application
+
+Counters, gauges and fixed-bucket histograms kept in plain dicts and exposed
+at /api/metrics in the Prometheus text format. Recording is one dict lookup
+and an add under a per-metric lock (about 1 us); all formatting happens at
+scrape time. Gauges can be backed by a function read at scrape time (e.g.
+resident memory).
+"""
+import resource
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from startup_profile import peak_resident_bytes, resident_bytes
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _check(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+
+    def samples(self):
+        """(suffix, label names, label values, value, extra label) per exposed sample"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, names, values, value, extra in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values, extra)} {_format_value(value)}")
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Monotonic count per label values"""
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for labels, value in snapshot:
+            yield '', self.labelnames, labels, value, ''
+
+
+class Gauge(_Metric):
+    """
+    Current value per label values, set by the code or read at scrape time
+
+    function, when given, returns a number (no labels) or {label values: number};
+    kind='counter' exposes a function reading a monotonic total.
+    """
+
+    def __init__(self, name, documentation, labelnames=(), function=None, kind='gauge'):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+        self.kind = kind
+
+    def set(self, value, *labels):
+        self._values[labels] = value
+
+    def value(self, *labels):
+        return self._values.get(labels)
+
+    def samples(self):
+        values = self._values
+        if self.function is not None:
+            values = self.function()
+            values = values if isinstance(values, dict) else {(): values}
+        for labels, value in sorted(list(values.items())):
+            if value is not None:
+                yield '', self.labelnames, labels, value, ''
+
+
+class Histogram(_Metric):
+    """Fixed-bucket distribution (counts per bucket, sum and count) per label values"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        # Values above the last bound land in the implicit +Inf bucket
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                self._check(labels)
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """Observe the duration of a with-block in seconds"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, *labels)
+
+    def count(self, *labels):
+        series = self._values.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        for labels, counts, total in sorted(snapshot):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield '_bucket', self.labelnames, labels, cumulative, f'le="{_format_value(float(bound))}"'
+            yield '_sum', self.labelnames, labels, total, ''
+            yield '_count', self.labelnames, labels, cumulative, ''
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), function=None, kind='gauge'):
+        return self._register(Gauge(name, documentation, labelnames, function, kind))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        return '\n'.join(metric.render() for metric in self.metrics.values()) + '\n'
+
+
+def _cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+registry = MetricsRegistry()
+
+# HTTP (log_api_call)
+HTTP_REQUESTS = registry.counter(
+    'zee_http_requests_total', 'API requests by endpoint, method and status code', ('endpoint', 'method', 'status'))
+HTTP_LATENCY = registry.histogram(
+    'zee_http_request_duration_seconds', 'API request latency', ('endpoint', 'method'))
+
+# RecommenderService
+RECOMMEND_LATENCY = registry.histogram(
+    'zee_recommend_duration_seconds', 'Recommendation latency per engine method', ('method',))
+ENGINE_RETRIEVAL_LATENCY = registry.histogram(
+    'zee_engine_retrieval_duration_seconds', 'Hybrid candidate retrieval latency per engine', ('engine',))
+RECOMMEND_ROUTING = registry.counter(
+    'zee_recommend_routing_total', 'Requests answered by another method than requested', ('requested', 'method'))
+USER_BASED_SLOW_REQUESTS = registry.counter(
+    'zee_user_based_slow_requests_total', 'User-based requests slower than USER_BASED_SLOW_MS')
+CACHE_REQUESTS = registry.counter(
+    'zee_cache_requests_total', 'Lookups of lazily built engines by result (hit or miss)', ('cache', 'result'))
+
+# DataService
+LOAD_STAGE_SECONDS = registry.gauge(
+    'zee_load_stage_duration_seconds', 'Wall time of each load_data stage in the last load', ('stage',))
+SNAPSHOT_VERSION = registry.gauge(
+    'zee_data_snapshot_version', 'Number of completed data loads in this process')
+SNAPSHOT_TIMESTAMP = registry.gauge(
+    'zee_data_snapshot_timestamp_seconds', 'Unix time the current data snapshot finished loading')
+DATA_ROWS = registry.gauge(
+    'zee_data_rows', 'Rows of each loaded table', ('table',))
+
+# Process
+registry.gauge('process_resident_memory_bytes', 'Resident memory size in bytes', function=resident_bytes)
+registry.gauge('process_max_resident_memory_bytes', 'Peak resident memory size in bytes',
+               function=peak_resident_bytes)
+registry.gauge('process_cpu_seconds_total', 'User and system CPU time in seconds', function=_cpu_seconds,
+               kind='counter')
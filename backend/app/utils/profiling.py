@@ -0,0 +1,109 @@
+"""
+On-demand request profiling for ZeeMovies application
+
+With Config.PROFILING_ENABLED, a request carrying the PROFILING_HEADER header
+(X-Profile: 1) or the PROFILING_QUERY_FLAG query flag (?profile=1) runs under
+cProfile. The stats are saved to logs/profiles/<id>.prof (pstats / snakeviz)
+with <id>.json holding the request parameters, status, duration and the top
+functions by cumulative time; the id is returned in the X-Profile-Id
+response header.
+
+The hooks are only registered when profiling is enabled, so a disabled
+server runs exactly the same code as before. cProfile sees the request
+thread only (work handed to the hybrid thread pool shows up as waiting).
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import uuid
+from datetime import datetime
+
+from flask import g, request
+
+from app.utils.logger import LOGS_DIR, api_logger
+
+PROFILES_DIR = os.path.join(LOGS_DIR, 'profiles')
+PROFILE_ID_HEADER = 'X-Profile-Id'
+TOP_FUNCTIONS = 25
+
+
+def _requested(config):
+    value = request.headers.get(config['PROFILING_HEADER']) or request.args.get(config['PROFILING_QUERY_FLAG'])
+    return value is not None and value.lower() not in ('0', 'false', 'no', 'off')
+
+
+def _top_functions(stats, limit=TOP_FUNCTIONS):
+    """[{function, calls, totalS, cumulativeS}] by cumulative time"""
+    rows = []
+    for (filename, line, function), (_, calls, total, cumulative, _) in list(stats.stats.items()):
+        rows.append({
+            'function': f"{os.path.basename(filename)}:{line}({function})",
+            'calls': calls,
+            'totalS': total,
+            'cumulativeS': cumulative
+        })
+    rows.sort(key=lambda row: row['cumulativeS'], reverse=True)
+    return rows[:limit]
+
+
+def save_profile(profiler, elapsed_s, status_code, profiles_dir=PROFILES_DIR):
+    """Write <id>.prof and <id>.json for the current request; returns the id"""
+    os.makedirs(profiles_dir, exist_ok=True)
+    profile_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    path = os.path.join(profiles_dir, profile_id)
+
+    profiler.dump_stats(f'{path}.prof')
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    with open(f'{path}.json', 'w') as handle:
+        json.dump({
+            'id': profile_id,
+            'method': request.method,
+            'path': request.path,
+            'query': request.query_string.decode('latin-1'),
+            'body': request.get_json(silent=True) if request.is_json else None,
+            'status': status_code,
+            'elapsedMs': elapsed_s * 1000,
+            'totalCalls': stats.total_calls,
+            'topFunctions': _top_functions(stats)
+        }, handle, indent=2)
+    return profile_id
+
+
+def init_profiling(app):
+    """Register the profiling hooks on the app when PROFILING_ENABLED is set"""
+    if not app.config.get('PROFILING_ENABLED'):
+        return False
+
+    @app.before_request
+    def start_profile():
+        if _requested(app.config):
+            g.profiler = cProfile.Profile()
+            g.profile_start = time.perf_counter()
+            g.profiler.enable()
+
+    @app.after_request
+    def save_request_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            elapsed_s = time.perf_counter() - g.pop('profile_start')
+            profile_id = save_profile(profiler, elapsed_s, response.status_code)
+            response.headers[PROFILE_ID_HEADER] = profile_id
+            response.headers['Access-Control-Expose-Headers'] = PROFILE_ID_HEADER
+            api_logger.info("Profiled %s %s in %.1fms -> %s", request.method, request.path, elapsed_s * 1000,
+                            os.path.join(PROFILES_DIR, profile_id + '.prof'))
+        return response
+
+    @app.teardown_request
+    def stop_profile(exception=None):
+        # after_request is skipped on unhandled errors: never leave a profiler running
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+
+    api_logger.info("Request profiling enabled (%s header or ?%s=1)",
+                    app.config['PROFILING_HEADER'], app.config['PROFILING_QUERY_FLAG'])
+    return True
@@ -0,0 +1,85 @@
+"""
+RATINGS PARSER BENCHMARK
+========================
+Time to parse a '::'-separated ratings file with pandas' python engine
+(sep='::', the previous loader) against data_loader.read_ratings (memory-
+mapped, separator-translated blocks parsed at C speed) and
+data_loader.load_ratings (parse plus id encoding, movie stats and sparse
+matrices).
+
+Synthetic datasets of the requested sizes (synthetic_data.py) are written to
+a temporary folder. The python engine is only timed up to --python-max-rows
+(it needs minutes per 10M lines).
+
+Run from the backend folder:
+    python benchmarks/bench_loader.py --rows 1000000 10000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_loader import RATINGS_COLUMNS, load_ratings, read_ratings
+from synthetic_data import generate
+
+
+def _time(function):
+    start_time = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start_time
+
+
+def run(row_counts=(1_000_000, 10_000_000), python_max_rows=1_000_000):
+    print("\n" + "="*80)
+    print("RATINGS PARSER (python engine vs data_loader)")
+    print("="*80)
+    print(f"{'rows':>12} {'python s':>10} {'read s':>8} {'load s':>8} {'speedup':>8} {'M rows/s':>9}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for n_rows in row_counts:
+            generate(folder, n_rows)
+            path = os.path.join(folder, 'ratings.dat')
+
+            python_s = None
+            if n_rows <= python_max_rows:
+                reference, python_s = _time(lambda: pd.read_csv(
+                    path, sep='::', engine='python', header=0,
+                    names=RATINGS_COLUMNS, encoding='ISO-8859-1'
+                ))
+
+            ratings, read_s = _time(lambda: read_ratings(path))
+            _, load_s = _time(lambda: load_ratings(path))
+            assert len(ratings) == n_rows
+            if python_s is not None:
+                assert (reference.values == ratings.values).all()
+                del reference
+
+            results.append({
+                'rows': n_rows,
+                'python_s': python_s,
+                'read_s': read_s,
+                'load_s': load_s,
+                'speedup': python_s / read_s if python_s else None
+            })
+            speedup = f"{python_s / read_s:>7.0f}x" if python_s else f"{'-':>8}"
+            python_text = f"{python_s:>10.2f}" if python_s else f"{'-':>10}"
+            print(f"{n_rows:>12,} {python_text} {read_s:>8.2f} {load_s:>8.2f} {speedup} {n_rows / read_s / 1e6:>9.2f}")
+            os.remove(path)
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Ratings parser throughput')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--python-max-rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    run(args.rows, args.python_max_rows)
@@ -0,0 +1,154 @@
+"""
+LOGGING OVERHEAD BENCHMARK
+==========================
+Per-request latency of the API (Flask test client, single thread) under each
+logging mode of app/utils/logger.py:
+
+- off: every logger gated above its messages (nothing formatted or written)
+- sync: handlers on the request thread (the previous behavior)
+- async: records queued to the QueueListener writer thread (default)
+- async, api=WARNING: per-request info lines gated off
+- async, 10% access sample
+- async, lean records: ZEE_LOG_LEAN_RECORDS (no caller/thread/process fields)
+
+The mixed workload (health, trending, cosine recommend) gives p50 / p99 per
+mode. Its mean is dominated by ~40ms recommend calls whose run-to-run noise
+exceeds the logging cost, so the overhead column is measured on a cheap fixed
+endpoint instead: the median /api/health latency of each repeat, best
+(minimum) repeat per mode, minus that of 'off'. Also reported: the
+request-thread cost of a single api_logger.info line and a single access
+line in each mode. Logs go to a temporary folder. The console handler is left out unless
+--console is given (stderr then needs redirecting, e.g. 2>/dev/null).
+
+Run from the backend folder:
+    python benchmarks/bench_logging.py --requests 500
+    ZEE_DATA_PATH=./data/synthetic_1000000/ python benchmarks/bench_logging.py
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.services.data_service import data_service
+from app.utils.logger import api_logger, configure_logging, log_request, should_log_request, stop_logging
+
+MODES = [
+    ('off', dict(async_mode=False, levels={'api': 'CRITICAL', 'access': 'CRITICAL', 'error': 'CRITICAL'})),
+    ('sync', dict(async_mode=False)),
+    ('async', dict(async_mode=True)),
+    ('async, api=WARNING', dict(async_mode=True, levels={'api': 'WARNING'})),
+    ('async, 10% access sample', dict(async_mode=True, access_sample=0.1)),
+    ('async, lean records', dict(async_mode=True, lean_records=True)),
+]
+
+
+def _requests(n_requests, seed=42):
+    """Mixed health / trending / cosine recommend requests"""
+    rng = np.random.default_rng(seed)
+    stats = data_service.movie_stats
+    titles = stats[stats['num_ratings'] >= 20]['title'].astype(str).values
+    requests = []
+    for i in range(n_requests):
+        kind = i % 3
+        if kind == 0:
+            requests.append(('GET', '/api/health', None))
+        elif kind == 1:
+            requests.append(('GET', '/api/trending?limit=10', None))
+        else:
+            requests.append(('POST', '/api/recommend', {'movie_title': str(rng.choice(titles)), 'method': 'cosine'}))
+    return requests
+
+
+def _health_median_ms(client, n_requests):
+    """Median latency of n_requests GET /api/health (ms)"""
+    timings = []
+    for _ in range(n_requests):
+        start_time = time.perf_counter()
+        client.get('/api/health')
+        timings.append((time.perf_counter() - start_time) * 1000)
+    return float(np.median(timings))
+
+
+def _log_call_us(n_calls=20000):
+    """Mean request-thread cost of one api_logger.info line and one log_request line (us)"""
+    start_time = time.perf_counter()
+    for i in range(n_calls):
+        api_logger.info("Recommendations requested - movie: '%s', method: %s, top_n: %s", 'Heat (1995)', 'cosine', i)
+    info_us = (time.perf_counter() - start_time) / n_calls * 1e6
+    start_time = time.perf_counter()
+    for i in range(n_calls):
+        if should_log_request(200):
+            log_request('/api/recommend', 'POST', 200, 0.012, None, '{"movie_title":"Heat (1995)"}')
+    request_us = (time.perf_counter() - start_time) / n_calls * 1e6
+    return info_us, request_us
+
+
+def run(n_requests=300, console=False, repeats=5):
+    with tempfile.TemporaryDirectory() as logs_dir:
+        configure_logging(async_mode=True, console=console, logs_dir=logs_dir)
+        data_service.load_data()
+        client = create_app().test_client()
+        requests = _requests(n_requests)
+        for method, path, body in requests:  # warm caches
+            client.open(path, method=method, json=body)
+
+        # Modes are interleaved per repeat so drift hits all of them alike
+        timings = {name: [] for name, _ in MODES}
+        health = {name: [] for name, _ in MODES}
+        calls = {}
+        for _ in range(repeats):
+            for name, options in MODES:
+                configure_logging(console=console, logs_dir=logs_dir, **{'access_sample': 1.0, 'levels': {}, **options})
+                for method, path, body in requests:
+                    start_time = time.perf_counter()
+                    client.open(path, method=method, json=body)
+                    timings[name].append((time.perf_counter() - start_time) * 1000)
+                health[name].append(_health_median_ms(client, n_requests))
+                calls[name] = _log_call_us()
+                # Queued records are written before the next mode starts
+                stop_logging()
+
+        print("\n" + "="*100)
+        print(f"LOGGING OVERHEAD ({n_requests} requests x {repeats} repeats per mode)")
+        print("="*100)
+        print(f"{'mode':<28} {'mix p50 ms':>10} {'mix p99 ms':>10} {'health ms':>10} {'overhead us':>12} "
+              f"{'info us':>8} {'access us':>10}")
+
+        results = []
+        baseline = min(health[MODES[0][0]])
+        for name, _ in MODES:
+            values = np.asarray(timings[name])
+            health_ms = min(health[name])
+            result = {
+                'mode': name,
+                'p50_ms': float(np.percentile(values, 50)),
+                'p99_ms': float(np.percentile(values, 99)),
+                'health_ms': health_ms,
+                'overhead_us': (health_ms - baseline) * 1000,
+                'info_call_us': calls[name][0],
+                'access_call_us': calls[name][1]
+            }
+            results.append(result)
+            print(f"{name:<28} {result['p50_ms']:>10.3f} {result['p99_ms']:>10.3f} {result['health_ms']:>10.3f} "
+                  f"{result['overhead_us']:>12.1f} {result['info_call_us']:>8.2f} {result['access_call_us']:>10.2f}")
+        print("\noverhead: best-repeat median /api/health latency minus the 'off' mode's")
+
+    configure_logging()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Request latency with logging on vs off')
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--console', action='store_true', help='Include the stderr console handler')
+    args = parser.parse_args()
+
+    run(args.requests, args.console, args.repeats)
@@ -0,0 +1,76 @@
+"""
+MMR DIVERSITY RERANKING BENCHMARK
+=================================
+Time of RecommenderService.diversify picking 20 of 500 candidates with the
+item-item similarity held by DataService, against plain relevance order.
+
+Run from the backend folder (needs ./data/):
+    python benchmarks/bench_mmr.py --candidates 500 --top-n 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.data_service import data_service
+from app.services.recommender import recommender_service
+
+
+def run(n_candidates=500, top_n=20, diversity=0.3, n_repeats=1000, seed=42):
+    data_service.load_data()
+    rng = np.random.default_rng(seed)
+
+    # Candidate lists shaped like real ones: random rated movies, decreasing scores
+    movie_ids = data_service.movie_user_pivot.index.values
+    lists = []
+    for _ in range(20):
+        chosen = rng.choice(movie_ids, size=n_candidates, replace=False)
+        scores = np.sort(rng.random(n_candidates))[::-1]
+        lists.append([{'id': int(movie_id), 'similarity': float(score)} for movie_id, score in zip(chosen, scores)])
+
+    print("\n" + "="*80)
+    print(f"MMR RERANKING ({n_candidates} -> {top_n}, diversity={diversity}, {n_repeats} runs)")
+    print("="*80)
+
+    timings = []
+    for i in range(n_repeats):
+        recommendations = lists[i % len(lists)]
+        start_time = time.perf_counter()
+        recommender_service.diversify(recommendations, top_n, diversity)
+        timings.append((time.perf_counter() - start_time) * 1000)
+
+    # Average pairwise similarity of the picked lists, with and without MMR
+    def redundancy(picked):
+        codes = data_service.rating_index.movie_codes([recommendation['id'] for recommendation in picked])
+        block = data_service.item_similarity_matrix[np.ix_(codes, codes)]
+        return (block.sum() - np.trace(block)) / (len(codes) * (len(codes) - 1))
+
+    plain = np.mean([redundancy(recommendations[:top_n]) for recommendations in lists])
+    diverse = np.mean([redundancy(recommender_service.diversify(recommendations, top_n, diversity))
+                       for recommendations in lists])
+
+    results = {
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p99_ms': float(np.percentile(timings, 99)),
+        'redundancy_plain': float(plain),
+        'redundancy_mmr': float(diverse)
+    }
+    print(f"   p50: {results['p50_ms']:.3f} ms   p99: {results['p99_ms']:.3f} ms")
+    print(f"   Mean pairwise similarity: {plain:.4f} (relevance order) -> {diverse:.4f} (MMR)")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='MMR reranking latency')
+    parser.add_argument('--candidates', type=int, default=500)
+    parser.add_argument('--top-n', type=int, default=20)
+    parser.add_argument('--diversity', type=float, default=0.3)
+    parser.add_argument('--repeats', type=int, default=1000)
+    args = parser.parse_args()
+
+    run(args.candidates, args.top_n, args.diversity, args.repeats)
@@ -0,0 +1,75 @@
+"""
+USER-BASED ENDPOINT LATENCY BENCHMARK
+=====================================
+p50/p99 latency of POST /api/recommend/user for new users with 5, 20 and
+100 input ratings, measured through the Flask test client.
+
+Run from the backend folder (needs ./data/):
+    python benchmarks/bench_user_based.py --requests 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.services.data_service import data_service
+
+
+def run(n_ratings_list=(5, 20, 100), n_requests=200, neighbors=10, seed=42):
+    data_service.load_data()
+    client = create_app().test_client()
+    rng = np.random.default_rng(seed)
+
+    # Sample input movies by popularity, like a real onboarding flow
+    stats = data_service.movie_stats
+    movie_ids = stats.index.values
+    weights = stats['num_ratings'].values / stats['num_ratings'].sum()
+
+    print("\n" + "="*80)
+    print(f"USER-BASED LATENCY ({n_requests} requests per size, neighbors={neighbors})")
+    print("="*80)
+    print(f"{'ratings':>8} {'p50 ms':>10} {'p99 ms':>10} {'server p50':>12} {'server p99':>12}")
+
+    results = {}
+    for n_ratings in n_ratings_list:
+        latencies, server = [], []
+        for _ in range(n_requests):
+            chosen = rng.choice(movie_ids, size=n_ratings, replace=False, p=weights)
+            payload = {
+                'ratings': [
+                    {'movie_id': int(movie_id), 'rating': int(rng.integers(1, 6))}
+                    for movie_id in chosen
+                ],
+                'neighbors': neighbors
+            }
+
+            start_time = time.perf_counter()
+            response = client.post('/api/recommend/user', json=payload)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+            server.append(response.get_json()['timing']['totalMs'])
+
+        results[n_ratings] = {
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'server_p50_ms': float(np.percentile(server, 50)),
+            'server_p99_ms': float(np.percentile(server, 99))
+        }
+        row = results[n_ratings]
+        print(f"{n_ratings:>8} {row['p50_ms']:>10.2f} {row['p99_ms']:>10.2f} "
+              f"{row['server_p50_ms']:>12.2f} {row['server_p99_ms']:>12.2f}")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark /api/recommend/user latency')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--neighbors', type=int, default=10)
+    args = parser.parse_args()
+    run(n_requests=args.requests, neighbors=args.neighbors)
@@ -0,0 +1,279 @@
+"""
+ACCESS LOG REPLAY
+=================
+Load test a running API server with the traffic recorded in logs/access.log.
+
+log_request writes one line per API call with the query string and the JSON
+body, e.g.
+
+    ... - access - INFO - GET /api/trending?limit=10 - Status: 200 - Time: 0.003s
+    ... - access - INFO - POST /api/recommend - Status: 200 - Time: 0.012s - Body: {"movie_title":"Heat (1995)"}
+
+Those requests are sent again, in log order, by --concurrency threads (one
+keep-alive connection each), either as fast as possible or paced to --rate
+requests per second in total. With --duration the log is looped until the
+time is up. Lines that cannot be replayed (POSTs logged before bodies were
+recorded, or with bodies above ZEE_ACCESS_LOG_BODY_MAX) are skipped.
+
+Reported per endpoint: throughput, p50 / p90 / p99 / max latency, a latency
+histogram, status codes, the error rate (5xx and connection failures) and
+how many responses differ from the logged status.
+
+Start the server (python run.py), then from the backend folder:
+    python benchmarks/replay_access_log.py --concurrency 8
+    python benchmarks/replay_access_log.py --rate 200 --duration 60 --output replay.json
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_LOG = os.path.join(BACKEND_DIR, 'logs', 'access.log')
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, np.inf)
+
+LINE_PATTERN = re.compile(
+    r" - access - \w+ - (?P<method>[A-Z]+) (?P<target>\S+)"
+    r" - Status: (?P<status>\d+) - Time: (?P<time>[\d.]+)s"
+    r"(?: - Body: (?P<body>.*))?$"
+)
+
+
+def parse_line(line):
+    """
+    One access.log line as a request dict, or None when it is not replayable
+
+    Returns:
+    --------
+    {'method', 'path', 'target', 'body', 'status', 'time_s'} where target is
+    the path with its query string and body the JSON text (or None)
+    """
+    match = LINE_PATTERN.search(line.rstrip('\n'))
+    if match is None:
+        return None
+    body = match.group('body')
+    if body is not None and body.startswith('<omitted'):
+        return None
+    method, target = match.group('method'), match.group('target')
+    if method in ('POST', 'PUT', 'PATCH') and body is None:
+        return None
+    return {
+        'method': method,
+        'path': target.split('?', 1)[0],
+        'target': target,
+        'body': body,
+        'status': int(match.group('status')),
+        'time_s': float(match.group('time'))
+    }
+
+
+def load_requests(path=DEFAULT_LOG, endpoints=None, limit=None):
+    """
+    Replayable requests of an access log, in log order
+
+    Parameters:
+    -----------
+    path : access.log (rotated files access.log.1, ... can be passed too)
+    endpoints : Optional list of paths to keep (e.g. ['/api/recommend'])
+    limit : Keep at most this many requests
+
+    Returns:
+    --------
+    (requests, skipped) where skipped counts access lines that cannot be replayed
+    """
+    requests, skipped = [], 0
+    with open(path, encoding='utf-8', errors='replace') as handle:
+        for line in handle:
+            if ' - access - ' not in line:
+                continue
+            request = parse_line(line)
+            if request is None:
+                skipped += 1
+            elif endpoints is None or request['path'] in endpoints:
+                requests.append(request)
+                if limit is not None and len(requests) >= limit:
+                    break
+    return requests, skipped
+
+
+def replay(requests, base_url='http://localhost:5000', concurrency=8, rate=None, duration=None, timeout=30.0):
+    """
+    Send the requests to a running server
+
+    Parameters:
+    -----------
+    requests : From load_requests
+    base_url : Server root (the logged paths already start with /api)
+    concurrency : Worker threads, each with its own keep-alive connection
+    rate : Total requests per second (None: as fast as the workers go)
+    duration : Seconds to run, looping over the requests (None: one pass)
+    timeout : Socket timeout per request in seconds
+
+    Returns:
+    --------
+    (samples, elapsed_s) with one (request, status, latency_ms) per request;
+    status is the exception name when the request failed
+    """
+    if not requests:
+        raise ValueError("No replayable requests")
+    url = urlsplit(base_url)
+    prefix = url.path.rstrip('/')
+    connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+
+    order = itertools.count()
+    order_lock = threading.Lock()
+    samples, samples_lock = [], threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    def worker():
+        connection = connection_class(url.hostname, url.port, timeout=timeout)
+        local = []
+        while True:
+            with order_lock:
+                i = next(order)
+            if deadline is None and i >= len(requests):
+                break
+            if rate:
+                delay = start + i / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+            request = requests[i % len(requests)]
+            body = request['body'].encode('utf-8') if request['body'] is not None else None
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            request_start = time.perf_counter()
+            try:
+                connection.request(request['method'], prefix + request['target'], body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+                connection.close()
+            local.append((request, status, (time.perf_counter() - request_start) * 1000))
+        connection.close()
+        with samples_lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+
+def histogram(latencies_ms):
+    """Request counts per HISTOGRAM_BUCKETS_MS bucket"""
+    edges = np.asarray(HISTOGRAM_BUCKETS_MS[:-1])
+    return np.bincount(np.searchsorted(edges, latencies_ms, side='left'), minlength=len(HISTOGRAM_BUCKETS_MS)).tolist()
+
+
+def summarize(samples, elapsed_s):
+    """Per-endpoint and overall statistics of replay() samples"""
+    groups = {}
+    for request, status, latency_ms in samples:
+        groups.setdefault(f"{request['method']} {request['path']}", []).append((request, status, latency_ms))
+    groups['ALL'] = samples
+
+    report = {}
+    for name, group in groups.items():
+        latencies = np.array([latency_ms for _, _, latency_ms in group])
+        statuses = {}
+        errors = mismatches = 0
+        for request, status, _ in group:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            errors += not isinstance(status, int) or status >= 500
+            mismatches += status != request['status']
+        report[name] = {
+            'requests': len(group),
+            'throughput_rps': len(group) / elapsed_s,
+            'mean_ms': float(latencies.mean()),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p90_ms': float(np.percentile(latencies, 90)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'max_ms': float(latencies.max()),
+            'error_rate': errors / len(group),
+            'status_mismatches': mismatches,
+            'status': statuses,
+            'histogram': histogram(latencies)
+        }
+    return report
+
+
+def print_report(report, elapsed_s):
+    print("\n" + "="*100)
+    print(f"ACCESS LOG REPLAY - {report['ALL']['requests']:,} requests in {elapsed_s:.1f}s "
+          f"({report['ALL']['throughput_rps']:.1f} req/s)")
+    print("="*100)
+    print(f"{'endpoint':<28} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'errors':>7} {'mismatch':>8}")
+    for name, values in report.items():
+        print(f"{name:<28} {values['requests']:>8,} {values['throughput_rps']:>8.1f} {values['p50_ms']:>8.2f} "
+              f"{values['p90_ms']:>8.2f} {values['p99_ms']:>8.2f} {values['max_ms']:>8.1f} "
+              f"{values['error_rate']:>7.1%} {values['status_mismatches']:>8,}")
+
+    labels = [f"<={bound:g}" for bound in HISTOGRAM_BUCKETS_MS[:-1]] + [f">{HISTOGRAM_BUCKETS_MS[-2]:g}"]
+    print(f"\nLatency histogram (ms)\n{'endpoint':<28} " + " ".join(f"{label:>6}" for label in labels))
+    for name, values in report.items():
+        print(f"{name:<28} " + " ".join(f"{count:>6}" for count in values['histogram']))
+
+    print("\nStatus codes")
+    for name, values in report.items():
+        print(f"{name:<28} " + ", ".join(f"{status}: {count}" for status, count in sorted(values['status'].items())))
+
+
+def run(log_path=DEFAULT_LOG, base_url='http://localhost:5000', concurrency=8, rate=None,
+        duration=None, endpoints=None, limit=None, output=None):
+    requests, skipped = load_requests(log_path, endpoints, limit)
+    print(f"📂 {len(requests):,} replayable requests from {log_path} ({skipped:,} lines skipped)")
+    pacing = f"{rate:g} req/s" if rate else "unthrottled"
+    print(f"🚀 Replaying against {base_url} with {concurrency} workers, {pacing}"
+          + (f", for {duration:g}s" if duration else ""))
+
+    samples, elapsed_s = replay(requests, base_url, concurrency, rate, duration)
+    report = summarize(samples, elapsed_s)
+    print_report(report, elapsed_s)
+
+    if output:
+        with open(output, 'w') as handle:
+            json.dump({
+                'log': log_path, 'base_url': base_url, 'concurrency': concurrency, 'rate': rate,
+                'duration_s': elapsed_s, 'histogram_buckets_ms': [str(bound) for bound in HISTOGRAM_BUCKETS_MS],
+                'endpoints': report
+            }, handle, indent=2)
+        print(f"\n📁 Results saved to '{output}'")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Replay logs/access.log against a running API server')
+    parser.add_argument('--log', default=DEFAULT_LOG)
+    parser.add_argument('--url', default='http://localhost:5000', help='Server root')
+    parser.add_argument('--concurrency', type=int, default=8, help='Worker threads')
+    parser.add_argument('--rate', type=float, default=None, help='Total requests per second (default: unthrottled)')
+    parser.add_argument('--duration', type=float, default=None, help='Seconds to run, looping over the log')
+    parser.add_argument('--endpoints', nargs='+', default=None, help='Only replay these paths')
+    parser.add_argument('--limit', type=int, default=None, help='Use the first N replayable requests')
+    parser.add_argument('--output', default=None, help='JSON results file')
+    args = parser.parse_args()
+
+    try:
+        run(args.log, args.url, args.concurrency, args.rate, args.duration, args.endpoints, args.limit, args.output)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,334 @@
+"""
+BENCHMARK SUITE
+===============
+End-to-end benchmarks over synthetic datasets (synthetic_data.py) at one or
+more scales, written as JSON so runs from different commits can be compared:
+
+- startup: DataService.load_data wall time and RSS after loading
+- builds: time to rebuild each engine on the loaded data (rating index,
+  pivot + cosine, EASE, ALS, content, trending, segments, pipeline)
+- service: RecommenderService cosine / Pearson latency, called directly
+- endpoints: p50 / p90 / p99 latency and status codes of every API route
+  (Flask test client), including each /api/recommend method
+- peak_rss_mb: peak resident memory of the run
+
+Each scale runs in its own process (fresh DataService, honest peak RSS).
+Datasets are generated once into ./data/synthetic_<ratings>/ and reused.
+The smallest scale (100k ratings) takes a few minutes at most.
+
+Run from the backend folder:
+    python benchmarks/run_suite.py --scales 100000 1000000 --output before.json
+    python benchmarks/run_suite.py --compare before.json after.json --threshold 10
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from startup_profile import peak_resident_bytes, resident_bytes
+
+DEFAULT_SCALES = [100_000]
+
+
+def summarize(timings_ms):
+    """Latency percentiles of a list of milliseconds"""
+    timings = np.asarray(timings_ms)
+    return {
+        'count': int(len(timings)),
+        'mean_ms': float(timings.mean()),
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p90_ms': float(np.percentile(timings, 90)),
+        'p99_ms': float(np.percentile(timings, 99)),
+    }
+
+
+def _timed(function):
+    start_time = time.perf_counter()
+    function()
+    return time.perf_counter() - start_time
+
+
+def _endpoints(rng, titles, movie_ids, n_requests):
+    """(name, method, path, body) per request of every benchmarked route"""
+    def title():
+        return str(rng.choice(titles))
+
+    def history():
+        chosen = rng.choice(movie_ids, size=20, replace=False)
+        return [{'movie_id': int(movie_id), 'rating': int(rng.integers(1, 6))} for movie_id in chosen]
+
+    routes = {
+        'health': lambda: ('GET', '/api/health', None),
+        'stats': lambda: ('GET', '/api/stats', None),
+        'movies_search': lambda: ('GET', f"/api/movies?search={title().split()[0]}&limit=20", None),
+        'movies_genre': lambda: ('GET', '/api/movies?genre=Comedy&limit=50', None),
+        'trending': lambda: ('GET', '/api/trending?limit=10', None),
+        'trending_30d': lambda: ('GET', '/api/trending?limit=10&window=30d', None),
+        'trending_segment': lambda: ('GET', '/api/trending?limit=10&gender=F&age=25', None),
+        'recommend_user': lambda: ('POST', '/api/recommend/user', {'ratings': history(), 'top_n': 10}),
+    }
+    for method in ('cosine', 'pearson', 'ease', 'content', 'hybrid', 'pipeline'):
+        routes[f'recommend_{method}'] = (
+            lambda method=method: ('POST', '/api/recommend', {'movie_title': title(), 'top_n': 10, 'method': method})
+        )
+    routes['recommend_cosine_diverse'] = lambda: (
+        'POST', '/api/recommend', {'movie_title': title(), 'top_n': 10, 'method': 'cosine', 'diversity': 0.3}
+    )
+
+    for name, make in routes.items():
+        yield name, [make() for _ in range(n_requests)]
+
+
+def measure(data_path, n_requests=50, seed=42):
+    """
+    Benchmark one dataset in this process
+
+    Returns:
+    --------
+    dict with startup, builds, service, endpoints and peak_rss_mb
+    """
+    os.environ['ZEE_DATA_PATH'] = data_path
+    from app import create_app
+    from app.config import Config
+    from app.services.data_service import data_service
+    from app.services.pipeline import build_default_pipeline
+    from app.services.recommender import recommender_service
+    from als_solver import ALSModel
+    from content_recommender import ContentRecommender
+    from data_loader import load_ratings
+    from ease_recommender import EASERecommender
+    from rating_index import RatingIndex
+    from segment_popularity import SegmentPopularity
+    from sklearn.metrics.pairwise import cosine_similarity
+    from trending_index import TrendingIndex
+
+    results = {'data_path': data_path}
+    load_s = _timed(data_service.load_data)
+    results['startup'] = {'load_s': load_s, 'rss_after_load_mb': resident_bytes() / 2 ** 20}
+    results['dataset'] = {
+        'ratings': int(len(data_service.ratings_df)),
+        'users': int(len(data_service.users_df)),
+        'movies': int(len(data_service.movies_df)),
+    }
+
+    ratings, movies, users = data_service.ratings_df, data_service.movies_df, data_service.users_df
+    index = data_service.rating_index
+    catalog = data_service.movie_stats.index.values
+    coo = index.user_matrix.tocoo()
+    builds = {
+        'ratings_load': lambda: load_ratings(f'{data_path}ratings.dat'),
+        'rating_index': lambda: RatingIndex.from_ratings(ratings),
+        'pivot_cosine': lambda: cosine_similarity(
+            ratings.pivot_table(index='movie_id', columns='user_id', values='rating').fillna(0)
+        ),
+        'ease': lambda: EASERecommender(ratings, movies, lambda_=Config.EASE_LAMBDA, index=index).fit(),
+        'mf_als': lambda: ALSModel(
+            n_factors=Config.MF_FACTORS, lambda_=Config.MF_LAMBDA, n_iter=Config.MF_ITERATIONS
+        ).fit(coo.row, coo.col, coo.data, *index.shape),
+        'content': lambda: ContentRecommender(movies, k=Config.CONTENT_NEIGHBORS).fit(),
+        'trending_index': lambda: TrendingIndex.from_ratings(ratings, catalog),
+        'segment_popularity': lambda: SegmentPopularity(ratings, users, catalog).fit(),
+        'pipeline': lambda: build_default_pipeline(
+            data_service, Config.PIPELINE_CANDIDATES, Config.PIPELINE_NEIGHBORS
+        ),
+    }
+    results['builds'] = {f'{name}_s': _timed(build) for name, build in builds.items()}
+
+    # Queries: movies with enough ratings to stay on the requested method
+    rng = np.random.default_rng(seed)
+    stats = data_service.movie_stats
+    eligible = stats[stats['num_ratings'] >= max(Config.CONTENT_MIN_RATINGS, 20)]
+    movie_ids = eligible.index.values
+    titles = eligible['title'].astype(str).values
+
+    service = {}
+    for name, function in (('cosine', recommender_service.get_cosine_recommendations),
+                           ('pearson', recommender_service.get_pearson_recommendations)):
+        timings = []
+        for movie_id in rng.choice(movie_ids, size=n_requests):
+            start_time = time.perf_counter()
+            function(int(movie_id), 10)
+            timings.append((time.perf_counter() - start_time) * 1000)
+        service[name] = summarize(timings)
+    results['service'] = service
+
+    client = create_app().test_client()
+    endpoints = {}
+    for name, requests in _endpoints(rng, titles, movie_ids, n_requests):
+        timings, statuses = [], {}
+        for i, (method, path, body) in enumerate(requests):
+            start_time = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+            if i >= 2:  # first requests warm caches
+                timings.append(elapsed_ms)
+        endpoints[name] = {**summarize(timings), 'status': statuses}
+    results['endpoints'] = endpoints
+
+    results['peak_rss_mb'] = peak_resident_bytes() / 2 ** 20
+    return results
+
+
+def _git_revision():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BACKEND_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return revision + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scales=DEFAULT_SCALES, n_requests=50, output=None, seed=42):
+    """Benchmark every scale in a subprocess and write the combined JSON"""
+    from synthetic_data import generate
+
+    report = {
+        'meta': {
+            'revision': _git_revision(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'requests_per_endpoint': n_requests,
+        },
+        'scales': {}
+    }
+
+    for n_ratings in scales:
+        data_path = os.path.join(BACKEND_DIR, 'data', f'synthetic_{n_ratings}', '')
+        if not os.path.exists(os.path.join(data_path, 'ratings.dat')):
+            print(f"🎲 Generating {n_ratings:,} synthetic ratings into {data_path}...")
+            generate(data_path, n_ratings, seed=seed)
+
+        print(f"\n⏱️  Benchmarking {n_ratings:,} ratings...")
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as handle:
+            worker_output = handle.name
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', data_path,
+             '--worker-output', worker_output, '--requests', str(n_requests), '--seed', str(seed)],
+            cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        if process.returncode == 0:
+            with open(worker_output) as handle:
+                report['scales'][str(n_ratings)] = json.load(handle)
+            print_scale(n_ratings, report['scales'][str(n_ratings)])
+        else:
+            error = process.stderr.strip().splitlines()[-1:] or [f'exit code {process.returncode}']
+            report['scales'][str(n_ratings)] = {'error': error[0]}
+            print(f"❌ {n_ratings:,} ratings failed: {error[0]}")
+        os.remove(worker_output)
+
+    if output is None:
+        os.makedirs(os.path.join(BACKEND_DIR, 'benchmarks', 'results'), exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(BACKEND_DIR, 'benchmarks', 'results',
+                              f"suite_{report['meta']['revision'] or 'unknown'}_{stamp}.json")
+    with open(output, 'w') as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\n📁 Results saved to '{output}'")
+    return report
+
+
+def print_scale(n_ratings, results):
+    print("="*80)
+    print(f"{n_ratings:,} RATINGS - load {results['startup']['load_s']:.2f}s, peak RSS {results['peak_rss_mb']:.0f} MB")
+    print("="*80)
+    print("Builds: " + ", ".join(f"{name[:-2]} {seconds:.2f}s" for name, seconds in results['builds'].items()))
+    print(f"{'endpoint':<28} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}  status")
+    rows = {**{f'service_{name}': values for name, values in results['service'].items()}, **results['endpoints']}
+    for name, values in rows.items():
+        status = ' '.join(f"{code}x{count}" for code, count in values.get('status', {}).items())
+        print(f"{name:<28} {values['p50_ms']:>9.2f} {values['p90_ms']:>9.2f} {values['p99_ms']:>9.2f}  {status}")
+
+
+def flatten(report):
+    """{'<scale>/<metric path>': value} for every comparable number (lower is better)"""
+    metrics = {}
+    for scale, results in report['scales'].items():
+        if 'error' in results:
+            continue
+        metrics[f'{scale}/startup/load_s'] = results['startup']['load_s']
+        metrics[f'{scale}/peak_rss_mb'] = results['peak_rss_mb']
+        for name, seconds in results['builds'].items():
+            metrics[f'{scale}/builds/{name}'] = seconds
+        for group in ('service', 'endpoints'):
+            for name, values in results[group].items():
+                for statistic in ('p50_ms', 'p99_ms'):
+                    metrics[f'{scale}/{group}/{name}/{statistic}'] = values[statistic]
+    return metrics
+
+
+def compare(baseline_path, candidate_path, threshold_pct=10.0, min_delta_ms=0.5):
+    """
+    Print every metric of two result files side by side
+
+    A metric regresses when it grows by more than threshold_pct (and, for
+    millisecond metrics, by more than min_delta_ms, to ignore noise on
+    sub-millisecond routes). Returns the list of regressed metric names.
+    """
+    with open(baseline_path) as handle:
+        baseline = json.load(handle)
+    with open(candidate_path) as handle:
+        candidate = json.load(handle)
+    old, new = flatten(baseline), flatten(candidate)
+
+    print(f"\nBaseline:  {baseline['meta']['revision']} ({baseline['meta']['created']})")
+    print(f"Candidate: {candidate['meta']['revision']} ({candidate['meta']['created']})")
+    print(f"{'metric':<58} {'baseline':>10} {'candidate':>10} {'change':>8}")
+
+    regressions = []
+    for name in sorted(old.keys() & new.keys()):
+        change = (new[name] - old[name]) / old[name] * 100 if old[name] else 0.0
+        regressed = change > threshold_pct and not (name.endswith('_ms') and new[name] - old[name] < min_delta_ms)
+        if regressed:
+            regressions.append(name)
+        flag = '  ❌' if regressed else ('  ✅' if change < -threshold_pct else '')
+        print(f"{name:<58} {old[name]:>10.3f} {new[name]:>10.3f} {change:>+7.1f}%{flag}")
+
+    for name in sorted(old.keys() ^ new.keys()):
+        print(f"{name:<58} (only in {'baseline' if name in old else 'candidate'})")
+    print(f"\n{len(regressions)} regression(s) above {threshold_pct:.0f}%")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark suite over synthetic datasets')
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES, help='Ratings per dataset')
+    parser.add_argument('--requests', type=int, default=50, help='Requests per endpoint')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help='Default: benchmarks/results/suite_<revision>_<time>.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'))
+    parser.add_argument('--threshold', type=float, default=10.0, help='Regression threshold in percent')
+    parser.add_argument('--worker', metavar='DATA_PATH', help=argparse.SUPPRESS)
+    parser.add_argument('--worker-output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(*args.compare, threshold_pct=args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    if args.worker:
+        results = measure(args.worker, args.requests, args.seed)
+        with open(args.worker_output, 'w') as handle:
+            json.dump(results, handle)
+        return
+
+    run(args.scales, args.requests, args.output, args.seed)
+
+
+if __name__ == "__main__":
+    main()
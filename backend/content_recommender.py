@@ -0,0 +1,188 @@
+"""
+CONTENT-BASED RECOMMENDER (COLD START)
+======================================
+Item-to-item recommendations from movie metadata only, for movies with too
+few ratings for collaborative filtering.
+
+Each movie becomes a sparse TF-IDF vector over three token groups built from
+movies.dat: its genres (from the genre bitmask), its release period (decade
+and half-decade, with the year parsed from the title) and its title words.
+Cosine neighbors of every movie are precomputed once into a top-K table.
+"""
+
+import time
+
+import numpy as np
+from scipy.sparse import hstack
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from data_loader import read_movies
+from schema import genre_bitmask
+from similarity import blocked_top_k_cosine, save_neighbors
+
+
+class ContentRecommender:
+    """
+    Content-based item neighbors over genre, release period and title TF-IDF
+    """
+
+    def __init__(self, movies_df, k=50, genre_weight=1.0, year_weight=0.5, title_weight=0.7):
+        """
+        Initialize Content-based Recommender
+
+        Parameters:
+        -----------
+        movies_df : DataFrame with columns [movie_id, title, genres]
+        k : Neighbors kept per movie in the precomputed table
+        genre_weight, year_weight, title_weight : Relative weight of each token group
+        """
+        self.movies = movies_df
+        self.k = k
+        self.weights = {'genre': genre_weight, 'year': year_weight, 'title': title_weight}
+        self.movie_ids = movies_df['movie_id'].values
+        self.features = None
+        self.neighbors = None
+        self.scores = None
+        self.fit_time = None
+
+    @staticmethod
+    def _year_tokens(titles):
+        """Decade and half-decade tokens from the '(YYYY)' suffix of each title"""
+        years = titles.str.extract(r'\((\d{4})\)')[0].astype(float)
+        tokens = []
+        for year in years:
+            if np.isnan(year):
+                tokens.append('')
+            else:
+                year = int(year)
+                tokens.append(f"decade_{year // 10 * 10} period_{year // 5 * 5}")
+        return tokens
+
+    @staticmethod
+    def _title_text(titles):
+        """Titles without the year and with trailing articles ('Matrix, The') dropped"""
+        return (titles.str.replace(r'\s*\(\d{4}\)\s*$', '', regex=True)
+                      .str.replace(r',\s*(The|A|An)$', '', regex=True)
+                      .str.lower())
+
+    def build_features(self):
+        """Sparse, row-normalized TF-IDF matrix (movies x tokens)"""
+        titles = self.movies['title'].astype(str)
+
+        masks, vocabulary = genre_bitmask(self.movies['genres'])
+        genre_tokens = [
+            ' '.join(f"genre_{bit}" for bit in range(len(vocabulary)) if mask >> bit & 1)
+            for mask in masks
+        ]
+
+        groups = {
+            'genre': (genre_tokens, TfidfVectorizer(token_pattern=r'\S+')),
+            'year': (self._year_tokens(titles), TfidfVectorizer(token_pattern=r'\S+')),
+            'title': (self._title_text(titles), TfidfVectorizer(stop_words='english', min_df=2)),
+        }
+
+        blocks = []
+        for name, (documents, vectorizer) in groups.items():
+            try:
+                block = vectorizer.fit_transform(documents)
+            except ValueError:
+                # No usable tokens in this group (e.g. tiny catalogs)
+                continue
+            blocks.append(self.weights[name] * block)
+
+        self.features = normalize(hstack(blocks).tocsr())
+        return self.features
+
+    def fit(self):
+        """Build the features and the top-K neighbor table for the whole catalog"""
+        start_time = time.perf_counter()
+        self.build_features()
+        self.neighbors, self.scores = blocked_top_k_cosine(self.features, k=self.k)
+        self.fit_time = time.perf_counter() - start_time
+        return self
+
+    def movie_index(self, movie_id):
+        """Row of a movie id in the catalog, or None"""
+        positions = np.flatnonzero(self.movie_ids == movie_id)
+        return int(positions[0]) if len(positions) else None
+
+    def similar_movies(self, movie_id, top_n=10, allowed=None):
+        """
+        Most similar movies by content
+
+        Parameters:
+        -----------
+        movie_id : Query movie
+        top_n : Number of neighbors
+        allowed : Optional boolean mask over the catalog (e.g. a genre filter);
+                  filtered or oversized requests are scored exactly instead of
+                  from the top-K table
+
+        Returns:
+        --------
+        (movie_ids, scores) : arrays sorted by decreasing similarity
+        """
+        movie_idx = self.movie_index(movie_id)
+        if movie_idx is None:
+            return np.array([], dtype=self.movie_ids.dtype), np.array([], dtype=np.float32)
+
+        if allowed is None and top_n <= self.k:
+            neighbors = self.neighbors[movie_idx]
+            valid = neighbors >= 0
+            neighbors, scores = neighbors[valid][:top_n], self.scores[movie_idx][valid][:top_n]
+            return self.movie_ids[neighbors], scores
+
+        scores = (self.features @ self.features[movie_idx].T).toarray().ravel()
+        scores[movie_idx] = -np.inf
+        if allowed is not None:
+            scores[~allowed] = -np.inf
+        scores[scores <= 0] = -np.inf
+
+        top_n = min(top_n, int(np.isfinite(scores).sum()))
+        if top_n <= 0:
+            return np.array([], dtype=self.movie_ids.dtype), np.array([], dtype=np.float32)
+        top = np.argpartition(-scores, top_n - 1)[:top_n]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return self.movie_ids[top], scores[top].astype(np.float32)
+
+    def save_neighbors(self, path='content_neighbors.npz'):
+        """Persist the neighbor table (raw movie ids) for reuse"""
+        save_neighbors(path, self.movie_ids, self.neighbors, self.scores)
+
+
+def main_content(movies_df, movie_title="Toy Story (1995)", top_n=10):
+    """Main function for the Content-based Recommender"""
+    print("\n" + "🎭"*40)
+    print(" "*25 + "CONTENT-BASED (COLD START) RECOMMENDER")
+    print("🎭"*40 + "\n")
+
+    content = ContentRecommender(movies_df).fit()
+    print(f"✅ Features: {content.features.shape[0]:,} movies x {content.features.shape[1]:,} tokens")
+    print(f"✅ Top-{content.k} neighbor table built in {content.fit_time:.2f}s")
+
+    movie_id = movies_df.loc[movies_df['title'] == movie_title, 'movie_id']
+    if movie_id.empty:
+        print(f"❌ Movie '{movie_title}' not found!")
+        return content
+
+    movie_ids, scores = content.similar_movies(movie_id.iloc[0], top_n)
+    titles = movies_df.set_index('movie_id').loc[movie_ids, ['title', 'genres']]
+
+    print(f"\n🎬 Input Movie: {movie_title}")
+    print(f"\n📊 Top {top_n} Similar Movies (Content):")
+    print("-"*80)
+    for (_, row), score in zip(titles.iterrows(), scores):
+        print(f"{row['title']:<55} {row['genres']:<30} {score:.4f}")
+
+    return content
+
+
+if __name__ == "__main__":
+    # Load data
+    print("Loading data...")
+    movies = read_movies('./data/movies.dat')
+
+    content = main_content(movies)
+    content.save_neighbors('content_neighbors.npz')
+    print("\n💾 Saved neighbor table to content_neighbors.npz")
@@ -0,0 +1,431 @@
+"""
+CROSS-VALIDATION HARNESS
+========================
+K-fold evaluation of every recommender approach in the project:
+
+1. Item-based Cosine Similarity
+2. Item-based Pearson Correlation
+3. Item-based KNN (cosine, top-k neighbors)
+4. Matrix Factorization (ALS)
+5. User-based Collaborative Filtering (Pearson)
+6. EASE (closed-form item-item model)
+
+Folds are either random or per-user temporal (using the `timestamp`
+column), run in parallel processes, and scored with rating metrics
+(RMSE, MAE) and ranking metrics (precision@k, recall@k, NDCG@k, coverage)
+computed over all test users in vectorized batches, next to each engine's
+fit time and peak fit memory.
+
+Usage:
+    python cross_validation.py --engines cosine pearson knn mf user ease --folds 5
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from threadpoolctl import threadpool_limits
+
+from als_solver import ALSModel, encode_ids
+from data_loader import read_ratings
+from ease_recommender import ease_weights
+from similarity import corated_pearson, cosine_columns, keep_top_k
+
+
+# =============================================================================
+# SPLITS
+# =============================================================================
+
+def random_folds(n_ratings, n_folds=5, random_state=42):
+    """Assign every rating to one of n_folds random folds"""
+    rng = np.random.default_rng(random_state)
+    return rng.permutation(np.arange(n_ratings) % n_folds).astype(np.int8)
+
+
+def temporal_folds(user_idx, timestamps, n_folds=5):
+    """
+    Per-user forward-chaining folds
+
+    Each user's ratings are ordered by timestamp and cut into n_folds + 1
+    chronological blocks. Fold f trains on blocks 0..f and tests on block
+    f + 1, so no user is ever evaluated on ratings older than their training
+    data. Returns the block number of every rating.
+    """
+    order = np.lexsort((timestamps, user_idx))
+    sorted_users = user_idx[order]
+    counts = np.bincount(sorted_users)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.arange(len(order)) - starts[sorted_users]
+
+    blocks = np.empty(len(order), dtype=np.int8)
+    blocks[order] = (rank * (n_folds + 1) // counts[sorted_users]).astype(np.int8)
+    return blocks
+
+
+def fold_masks(assignment, fold, split):
+    """(train_mask, test_mask) for one fold of a random or temporal assignment"""
+    if split == 'temporal':
+        return assignment <= fold, assignment == fold + 1
+    return assignment != fold, assignment == fold
+
+
+# =============================================================================
+# ENGINES
+# =============================================================================
+
+class _Engine:
+    """
+    Common interface: fit on a (users x items) CSR matrix, then for a batch
+    of users return predicted ratings and ranking scores for every item.
+    """
+
+    def fit(self, train):
+        self.train = train
+        self.train_binary = (train != 0).astype(np.float32)
+        counts = np.asarray(self.train_binary.sum(axis=1)).ravel()
+        sums = np.asarray(train.sum(axis=1)).ravel()
+        self.global_mean = float(train.data.mean())
+        self.user_means = np.where(counts > 0, sums / np.maximum(counts, 1), self.global_mean)
+        return self
+
+    def _weighted_average(self, users, numerator, denominator):
+        """Neighborhood prediction with the user's mean as fallback"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            predictions = numerator / denominator
+        fallback = np.broadcast_to(self.user_means[users][:, None], predictions.shape)
+        return np.where(denominator > 0, predictions, fallback)
+
+
+class ItemNeighborhoodEngine(_Engine):
+    """Item-based CF over a cosine or co-rated Pearson item-item matrix"""
+
+    def __init__(self, similarity='cosine', n_neighbors=None, min_common=5):
+        self.similarity = similarity
+        self.n_neighbors = n_neighbors
+        self.min_common = min_common
+
+    def fit(self, train):
+        super().fit(train)
+        if self.similarity == 'pearson':
+            item_user = train.T.toarray()
+            similarity, _ = corated_pearson(item_user, item_user, self.min_common)
+            # Positive correlations only, as in the Pearson recommenders
+            similarity = np.clip(np.nan_to_num(similarity), 0, None).astype(np.float32)
+        else:
+            similarity = cosine_columns(train)
+
+        np.fill_diagonal(similarity, 0)
+        self.item_similarity = keep_top_k(similarity, self.n_neighbors)
+        return self
+
+    def predict_and_score(self, users):
+        numerator = np.asarray(self.train[users] @ self.item_similarity)
+        denominator = np.asarray(self.train_binary[users] @ self.item_similarity)
+        return self._weighted_average(users, numerator, denominator), numerator
+
+
+class MatrixFactorizationEngine(_Engine):
+    """Biased ALS matrix factorization"""
+
+    def __init__(self, n_factors=4, lambda_=0.1, n_iter=10):
+        self.model = ALSModel(n_factors=n_factors, lambda_=lambda_, n_iter=n_iter)
+
+    def fit(self, train):
+        super().fit(train)
+        coo = train.tocoo()
+        self.model.fit(coo.row, coo.col, coo.data, train.shape[0], train.shape[1])
+        return self
+
+    def predict_and_score(self, users):
+        predictions = (
+            self.model.global_mean
+            + self.model.user_bias[users][:, None]
+            + self.model.item_bias[None, :]
+            + self.model.user_factors[users] @ self.model.item_factors.T
+        )
+        return predictions, predictions
+
+
+class UserBasedEngine(_Engine):
+    """User-based CF with co-rated Pearson and positive top-k neighbors"""
+
+    def __init__(self, n_neighbors=50, min_common=2):
+        self.n_neighbors = n_neighbors
+        self.min_common = min_common
+
+    def fit(self, train):
+        super().fit(train)
+        self.dense_train = train.toarray()
+        return self
+
+    def predict_and_score(self, users):
+        correlation, _ = corated_pearson(self.dense_train[users], self.dense_train, self.min_common)
+        weights = np.nan_to_num(correlation.T)
+        weights[weights < 0] = 0
+        weights[np.arange(len(users)), users] = 0
+
+        if self.n_neighbors < weights.shape[1]:
+            cutoff = np.argpartition(-weights, self.n_neighbors, axis=1)[:, self.n_neighbors:]
+            np.put_along_axis(weights, cutoff, 0, axis=1)
+
+        weights = csr_matrix(weights.astype(np.float32))
+        numerator = np.asarray((weights @ self.train).todense())
+        denominator = np.asarray((weights @ self.train_binary).todense())
+        return self._weighted_average(users, numerator, denominator), numerator
+
+
+class EASEEngine(_Engine):
+    """EASE closed-form item model; ratings predicted from its positive weights"""
+
+    def __init__(self, lambda_=500.0):
+        self.lambda_ = lambda_
+
+    def fit(self, train):
+        super().fit(train)
+        self.weights = ease_weights(self.train_binary, self.lambda_)
+        self.positive_weights = np.clip(self.weights, 0, None)
+        return self
+
+    def predict_and_score(self, users):
+        scores = np.asarray(self.train_binary[users] @ self.weights)
+        numerator = np.asarray(self.train[users] @ self.positive_weights)
+        denominator = np.asarray(self.train_binary[users] @ self.positive_weights)
+        return self._weighted_average(users, numerator, denominator), scores
+
+
+ENGINES = {
+    'cosine': lambda params: ItemNeighborhoodEngine('cosine'),
+    'pearson': lambda params: ItemNeighborhoodEngine('pearson', min_common=params['min_common']),
+    'knn': lambda params: ItemNeighborhoodEngine('cosine', n_neighbors=params['n_neighbors']),
+    'mf': lambda params: MatrixFactorizationEngine(params['n_factors'], params['lambda_']),
+    'user': lambda params: UserBasedEngine(params['n_neighbors']),
+    'ease': lambda params: EASEEngine(params['ease_lambda'])
+}
+
+
+# =============================================================================
+# METRICS
+# =============================================================================
+
+def evaluate_engine(engine, train, test, k=10, relevance_threshold=4, batch_size=512):
+    """
+    Score a fitted engine against a (users x items) CSR test matrix
+
+    Rating metrics use every test rating; ranking metrics treat test ratings
+    >= relevance_threshold as relevant and exclude each user's training items
+    from their top-k list.
+    """
+    n_items = train.shape[1]
+    test_users = np.flatnonzero(np.diff(test.indptr))
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    ideal = np.cumsum(discounts)
+
+    squared_error = absolute_error = 0.0
+    n_ratings = 0
+    precision, recall, ndcg = [], [], []
+    recommended = np.zeros(n_items, dtype=bool)
+
+    for start in range(0, len(test_users), batch_size):
+        users = test_users[start:start + batch_size]
+        predictions, scores = engine.predict_and_score(users)
+        batch_test = test[users]
+
+        # Rating metrics on the held-out (user, item) pairs
+        rows = np.repeat(np.arange(len(users)), np.diff(batch_test.indptr))
+        errors = np.clip(predictions[rows, batch_test.indices], 1, 5) - batch_test.data
+        squared_error += float(np.sum(errors ** 2))
+        absolute_error += float(np.sum(np.abs(errors)))
+        n_ratings += len(errors)
+
+        # Ranking metrics: top-k over items the user has not rated in train
+        scores = np.array(scores, dtype=np.float32)
+        seen = train[users]
+        scores[np.repeat(np.arange(len(users)), np.diff(seen.indptr)), seen.indices] = -np.inf
+        top = np.argpartition(-scores, k, axis=1)[:, :k]
+        top = np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1), axis=1)
+        recommended[top.ravel()] = True
+
+        relevant = (batch_test >= relevance_threshold).toarray()
+        n_relevant = relevant.sum(axis=1)
+        hits = np.take_along_axis(relevant, top, axis=1)
+
+        has_relevant = n_relevant > 0
+        precision.append(hits.sum(axis=1)[has_relevant] / k)
+        recall.append(hits.sum(axis=1)[has_relevant] / n_relevant[has_relevant])
+        dcg = (hits * discounts).sum(axis=1)
+        ndcg.append(dcg[has_relevant] / ideal[np.minimum(n_relevant[has_relevant], k) - 1])
+
+    return {
+        'rmse': np.sqrt(squared_error / n_ratings),
+        'mae': absolute_error / n_ratings,
+        f'precision@{k}': float(np.concatenate(precision).mean()),
+        f'recall@{k}': float(np.concatenate(recall).mean()),
+        f'ndcg@{k}': float(np.concatenate(ndcg).mean()),
+        'coverage': float(recommended.mean())
+    }
+
+
+# =============================================================================
+# PARALLEL HARNESS
+# =============================================================================
+
+_DATA = {}
+
+
+def _init_worker(data, threads):
+    _DATA.update(data)
+    _DATA['_limits'] = threadpool_limits(limits=threads)
+
+
+def _run_fold(engine_name, fold):
+    """Fit one engine on one fold and return its metrics"""
+    train_mask, test_mask = fold_masks(_DATA['assignment'], fold, _DATA['split'])
+    shape = _DATA['shape']
+
+    def matrix(mask):
+        return csr_matrix(
+            (_DATA['ratings'][mask], (_DATA['user_idx'][mask], _DATA['item_idx'][mask])),
+            shape=shape
+        )
+
+    train, test = matrix(train_mask), matrix(test_mask)
+
+    tracemalloc.start()
+    start_time = time.time()
+    engine = ENGINES[engine_name](_DATA['params']).fit(train)
+    fit_time = time.time() - start_time
+    fit_peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+
+    start_time = time.time()
+    metrics = evaluate_engine(engine, train, test, k=_DATA['params']['k'])
+    metrics.update({
+        'engine': engine_name,
+        'fold': fold,
+        'fit_time_s': fit_time,
+        'fit_peak_mb': fit_peak_mb,
+        'eval_time_s': time.time() - start_time
+    })
+    return metrics
+
+
+class CrossValidator:
+    """
+    Parallel k-fold evaluation of the recommender engines
+    """
+
+    def __init__(self, ratings_df, n_folds=5, split='random', k=10, n_neighbors=50,
+                 min_common=5, n_factors=4, lambda_=0.1, ease_lambda=500.0, random_state=42, n_jobs=None):
+        """
+        Initialize the cross-validator
+
+        Parameters:
+        -----------
+        ratings_df : DataFrame with columns [user_id, movie_id, rating, timestamp]
+        n_folds : Number of folds
+        split : 'random' or 'temporal' (per-user, by timestamp)
+        k : Cut-off for precision/recall/NDCG
+        n_neighbors : Neighbors kept by the KNN and user-based engines
+        min_common : Minimum co-rating users for item Pearson
+        n_factors, lambda_ : Matrix factorization settings
+        ease_lambda : EASE regularization
+        n_jobs : Worker processes (default: all cores)
+        """
+        self.ratings = ratings_df
+        self.n_folds = n_folds
+        self.split = split
+        self.params = {
+            'k': k,
+            'n_neighbors': n_neighbors,
+            'min_common': min_common,
+            'n_factors': n_factors,
+            'lambda_': lambda_,
+            'ease_lambda': ease_lambda
+        }
+        self.random_state = random_state
+        self.n_jobs = n_jobs or os.cpu_count()
+        self.results = None
+
+    def _prepare(self):
+        user_idx, user_ids = encode_ids(self.ratings['user_id'].values)
+        item_idx, item_ids = encode_ids(self.ratings['movie_id'].values)
+
+        if self.split == 'temporal':
+            assignment = temporal_folds(user_idx, self.ratings['timestamp'].values, self.n_folds)
+        else:
+            assignment = random_folds(len(self.ratings), self.n_folds, self.random_state)
+
+        return {
+            'user_idx': user_idx,
+            'item_idx': item_idx,
+            'ratings': self.ratings['rating'].values.astype(np.float32),
+            'assignment': assignment,
+            'shape': (len(user_ids), len(item_ids)),
+            'split': self.split,
+            'params': self.params
+        }
+
+    def run(self, engines=('cosine', 'pearson', 'knn', 'mf', 'user', 'ease')):
+        """Evaluate every engine on every fold; returns per-fold results"""
+        print("\n" + "="*80)
+        print(f"CROSS-VALIDATION ({self.n_folds} {self.split} folds)")
+        print("="*80)
+
+        data = self._prepare()
+        tasks = [(engine, fold) for engine in engines for fold in range(self.n_folds)]
+        n_workers = min(self.n_jobs, len(tasks))
+        threads = max(1, self.n_jobs // n_workers)
+
+        print(f"\n🔬 {len(tasks)} fold runs on {n_workers} workers ({threads} BLAS threads each)")
+
+        start_time = time.time()
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(data, threads)) as executor:
+            futures = [executor.submit(_run_fold, engine, fold) for engine, fold in tasks]
+            self.results = pd.DataFrame([future.result() for future in futures])
+
+        print(f"\n✅ Cross-validation finished in {time.time() - start_time:.1f}s")
+        print("-" * 80)
+        print(self.summary().to_string())
+
+        return self.results
+
+    def summary(self):
+        """Mean of every metric per engine across folds"""
+        return (self.results
+                .drop(columns='fold')
+                .groupby('engine', sort=False)
+                .mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='K-fold evaluation of all recommenders')
+    parser.add_argument('--data-path', default='./data/')
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--split', choices=['random', 'temporal'], default='random')
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--jobs', type=int, default=None)
+    parser.add_argument('--output', default='cross_validation_results.csv')
+    args = parser.parse_args()
+
+    print("Loading data...")
+    ratings = read_ratings(f'{args.data_path}ratings.dat')
+
+    validator = CrossValidator(ratings, n_folds=args.folds, split=args.split,
+                               k=args.k, n_jobs=args.jobs)
+    results = validator.run(engines=args.engines)
+    results.to_csv(args.output, index=False)
+
+    print(f"\n📁 Per-fold results saved to '{args.output}'")
+
+    return validator
+
+
+if __name__ == "__main__":
+    validator = main()
@@ -0,0 +1,419 @@
+"""
+DATA LOADER
+===========
+Shared readers for the '::'-delimited MovieLens files (ratings, movies, users).
+
+pandas only accepts a multi-character separator in its slow python engine.
+Here the file is memory-mapped and parsed block by block at C speed:
+
+- ratings (all numeric): '::' becomes a space and np.fromstring reads the
+  block as one integer array, reshaped to 4 columns; blocks holding
+  fractional values (half-star ratings such as 4.5) are re-read as floats
+- movies / users (text): '::' becomes a single control character (0x1F,
+  never present in the data) and the block goes through pandas' C engine
+
+A header row ('UserID::MovieID::...') is detected and skipped; text is
+ISO-8859-1.
+
+read_ratings parses ratings.dat in blocks and copies each one into columns
+preallocated from a newline count, so the file is never resident as int64
+or object columns. Incremental builders see every chunk as it streams past:
+
+- IdEncoder: sorted raw id -> code table (users or movies)
+- MovieStatsBuilder: per-movie rating count and sum
+
+Both index arrays by raw id, so ids must lie in [0, MAX_ID) (ValueError
+otherwise).
+
+build_rating_index then assembles the user-major CSR and movie-major CSC of a
+RatingIndex with a counting sort over the compact columns, one chunk at a
+time, so peak memory stays close to the final arrays.
+"""
+
+import csv
+import io
+import mmap
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from rating_index import RatingIndex
+from schema import RATINGS_SCHEMA
+
+RATINGS_COLUMNS = ['user_id', 'movie_id', 'rating', 'timestamp']
+MOVIES_COLUMNS = ['movie_id', 'title', 'genres']
+USERS_COLUMNS = ['user_id', 'gender', 'age', 'occupation', 'zip_code']
+ENCODING = 'ISO-8859-1'
+SEPARATOR = '\x1f'
+# Bytes parsed per block (~400k ratings); C parser temporaries stay a few MB
+BLOCK_BYTES = 8 << 20
+# Ratings per chunk when assembling the sparse matrices
+CHUNK_ROWS = 500_000
+# Exclusive upper bound on user / movie ids: per-id tables are sized by the
+# largest id (MovieLens 32M tops out below 300k)
+MAX_ID = 1 << 24
+
+
+class _MappedFile:
+    """Read-only memory map of a file (an empty bytes object for empty files)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+        self.buffer = b''
+
+    def __enter__(self):
+        self.handle = open(self.path, 'rb')
+        try:
+            self.buffer = mmap.mmap(self.handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.buffer = b''
+        return self.buffer
+
+    def __exit__(self, *exc_info):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.handle.close()
+
+
+def _data_start(buffer):
+    """Offset of the first data line: past a header row whose first field is not an integer"""
+    end = buffer.find(b'\n')
+    end = len(buffer) if end < 0 else end
+    first_field = bytes(buffer[:end]).split(b'::', 1)[0].strip()
+    if first_field and not first_field.lstrip(b'-').isdigit():
+        return min(end + 1, len(buffer))
+    return 0
+
+
+def _blocks(buffer, start, block_size):
+    """Consecutive slices of `buffer` from `start`, each ending at a newline"""
+    while start < len(buffer):
+        end = min(start + block_size, len(buffer))
+        if end < len(buffer):
+            newline = buffer.rfind(b'\n', start, end)
+            end = newline + 1 if newline >= start else (buffer.find(b'\n', end) + 1 or len(buffer))
+        yield buffer[start:end]
+        start = end
+
+
+def _parse(block, names, dtype=None, nrows=None):
+    """Parse one block of '::'-separated lines with the C engine"""
+    return pd.read_csv(
+        io.BytesIO(bytes(block).replace(b'::', SEPARATOR.encode())),
+        sep=SEPARATOR,
+        header=None,
+        names=names,
+        dtype=dtype,
+        encoding=ENCODING,
+        quoting=csv.QUOTE_NONE,
+        nrows=nrows,
+        engine='c'
+    )
+
+
+def _count_nonblank_lines(data):
+    """Lines of `data` with at least one non-whitespace byte"""
+    data = np.frombuffer(data, dtype=np.uint8)
+    line_numbers = np.cumsum(data == ord('\n'))
+    filled = line_numbers[~np.isin(data, np.frombuffer(b' \t\r\n', dtype=np.uint8))]
+    return int(np.count_nonzero(np.diff(filled))) + 1 if len(filled) else 0
+
+
+def _fromstring(text, dtype):
+    """Space-separated numbers of `text`, or None if some token is not a `dtype` number"""
+    try:
+        with warnings.catch_warnings():
+            # Older numpy warns and returns the numbers read so far
+            warnings.simplefilter('error', DeprecationWarning)
+            return np.fromstring(text, dtype=dtype, sep=' ')
+    except (DeprecationWarning, ValueError):
+        return None
+
+
+def _bad_line(data, names, dtype):
+    """(offset, line) of the first non-blank line of `data` that does not fit the schema, or None"""
+    for offset, line in enumerate(data.split(b'\n')):
+        fields = line.strip().split(b'::')
+        if fields == [b'']:
+            continue
+        try:
+            if len(fields) != len(names):
+                raise ValueError
+            for name, field in zip(names, fields):
+                float(field) if np.dtype(dtype[name]).kind == 'f' else int(field)
+        except ValueError:
+            return offset, line.strip().decode(ENCODING)
+    return None
+
+
+def _parse_numeric(block, names, dtype, path='<block>', first_line=1):
+    """
+    Parse one block of numeric '::'-separated lines into compact columns
+
+    Blank (or whitespace-only) lines are skipped; any other line must hold
+    exactly len(names) numbers, integers except in float columns of `dtype`.
+    A line that does not raises ValueError naming `path` and its line number
+    (`first_line` is the number of the block's first line).
+    """
+    data = bytes(block)
+    text = data.replace(b'::', b' ').decode('ascii', errors='replace')
+    n_lines = data.count(b'\n') + (1 if data[-1:] not in (b'\n', b'') else 0)
+    values = _fromstring(text, np.int64)
+    if (values is None or len(values) != n_lines * len(names)) and any(
+            np.dtype(dtype[name]).kind == 'f' for name in names):
+        # Fractional values (e.g. half-star ratings): the slower float parse
+        values = _fromstring(text, np.float64)
+    if values is not None and len(values) != n_lines * len(names):
+        # Only count the non-blank lines (a slower pass) when the fast count does not fit
+        n_lines = _count_nonblank_lines(data)
+    bad = _bad_line(data, names, dtype) if values is None or len(values) != n_lines * len(names) else None
+    if bad is None and values is not None and values.dtype.kind == 'f':
+        # Integer columns must not have picked up fractions in the float parse
+        values = values.reshape(n_lines, len(names))
+        integral = [i for i, name in enumerate(names) if np.dtype(dtype[name]).kind != 'f']
+        if not np.array_equal(values[:, integral], np.floor(values[:, integral])):
+            bad = _bad_line(data, names, dtype)
+    if bad is not None:
+        offset, line = bad
+        raise ValueError(
+            f"{path}, line {first_line + offset}: {line!r} is not {len(names)} '::'-separated "
+            f"numbers ({', '.join(names)})"
+        )
+    if values is None or values.size != n_lines * len(names):
+        raise ValueError(f"{path}: malformed block of {n_lines} lines starting at line {first_line}")
+    values = values.reshape(n_lines, len(names))
+    return pd.DataFrame({name: values[:, i].astype(dtype[name]) for i, name in enumerate(names)})
+
+
+def read_dat(path, names, dtype=None, nrows=None):
+    """
+    Read a whole '::'-separated file
+
+    Parameters:
+    -----------
+    path : Path to a .dat file
+    names : Column names
+    dtype : Optional dtypes applied while parsing (e.g. a schema from schema.py)
+    nrows : Optional number of data rows to read
+
+    Returns:
+    --------
+    DataFrame with the given columns (header row skipped if present)
+    """
+    with _MappedFile(path) as buffer:
+        start = _data_start(buffer)
+        if start >= len(buffer):
+            return pd.DataFrame({name: pd.Series(dtype=(dtype or {}).get(name, 'object')) for name in names})
+        if nrows is not None:
+            end = start
+            for _ in range(nrows):
+                newline = buffer.find(b'\n', end)
+                end = len(buffer) if newline < 0 else newline + 1
+            return _parse(buffer[start:end], names, dtype)
+        return _parse(buffer[start:], names, dtype)
+
+
+def read_movies(path, nrows=None):
+    """movies.dat as [movie_id, title, genres]"""
+    return read_dat(path, MOVIES_COLUMNS, nrows=nrows)
+
+
+def read_users(path, nrows=None):
+    """users.dat as [user_id, gender, age, occupation, zip_code]"""
+    return read_dat(path, USERS_COLUMNS, dtype={'zip_code': str}, nrows=nrows)
+
+
+def count_rows(path):
+    """Data rows in a text file (header excluded), from a newline count"""
+    with _MappedFile(path) as buffer:
+        start = _data_start(buffer)
+        lines = sum(block.count(b'\n') for block in _blocks(buffer, start, BLOCK_BYTES))
+        if len(buffer) > start and buffer[-1:] != b'\n':
+            lines += 1
+    return lines
+
+
+def _check_ids(ids, column):
+    """Raise ValueError unless every id is in [0, MAX_ID)"""
+    if len(ids) and (ids.min() < 0 or ids.max() >= MAX_ID):
+        bad = ids[(ids < 0) | (ids >= MAX_ID)][0]
+        raise ValueError(f"{column} {bad} out of range (expected 0 <= {column} < {MAX_ID})")
+
+
+def _grow(array, size):
+    """Zero-padded copy of `array` with room for at least `size` entries"""
+    if size <= len(array):
+        return array
+    grown = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class IdEncoder:
+    """
+    Incremental id -> code encoding for one id column
+
+    Codes follow sorted raw ids, like np.unique, so they match the codes of
+    a RatingIndex built in memory.
+    """
+
+    def __init__(self, column):
+        self.column = column
+        self.seen = np.zeros(0, dtype=bool)
+        self.ids = None
+        self.lookup = None
+
+    def update(self, chunk):
+        ids = chunk[self.column].values
+        _check_ids(ids, self.column)
+        if len(ids):
+            self.seen = _grow(self.seen, int(ids.max()) + 1)
+            self.seen[ids] = True
+
+    def finish(self):
+        """Sorted unique ids, and a lookup array from raw id to code (-1 if unseen)"""
+        self.ids = np.flatnonzero(self.seen).astype(np.int32)
+        self.lookup = np.full(len(self.seen), -1, dtype=np.int32)
+        self.lookup[self.ids] = np.arange(len(self.ids), dtype=np.int32)
+        return self.ids, self.lookup
+
+
+class MovieStatsBuilder:
+    """
+    Incremental per-movie rating count and sum
+    """
+
+    def __init__(self):
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.sums = np.zeros(0, dtype=np.float64)
+
+    def update(self, chunk):
+        movie_ids = chunk['movie_id'].values
+        _check_ids(movie_ids, 'movie_id')
+        if len(movie_ids):
+            size = int(movie_ids.max()) + 1
+            self.counts = _grow(self.counts, size)
+            self.sums = _grow(self.sums, size)
+            self.counts[:size] += np.bincount(movie_ids, minlength=size)
+            self.sums[:size] += np.bincount(movie_ids, weights=chunk['rating'].values, minlength=size)
+
+    def frame(self):
+        """DataFrame indexed by movie_id with avg_rating and num_ratings (rated movies only)"""
+        movie_ids = np.flatnonzero(self.counts)
+        return pd.DataFrame({
+            'avg_rating': self.sums[movie_ids] / self.counts[movie_ids],
+            'num_ratings': self.counts[movie_ids]
+        }, index=pd.Index(movie_ids.astype(np.int32), name='movie_id'))
+
+
+def read_ratings_chunks(path, block_size=BLOCK_BYTES):
+    """Iterate over ratings.dat as compact-schema DataFrame chunks"""
+    with _MappedFile(path) as buffer:
+        start = _data_start(buffer)
+        first_line = 2 if start else 1
+        for block in _blocks(buffer, start, block_size):
+            chunk = _parse_numeric(block, RATINGS_COLUMNS, RATINGS_SCHEMA, path, first_line)
+            first_line += block.count(b'\n')
+            yield chunk
+
+
+def read_ratings(path, builders=(), block_size=BLOCK_BYTES):
+    """
+    Stream ratings.dat into compact columns
+
+    Parameters:
+    -----------
+    path : Path to ratings.dat
+    builders : Objects with .update(chunk), fed every chunk in file order
+    block_size : Bytes parsed per chunk
+
+    Returns:
+    --------
+    DataFrame [user_id, movie_id, rating, timestamp] with the compact schema
+    """
+    n_rows = count_rows(path)
+    columns = {name: np.empty(n_rows, dtype=RATINGS_SCHEMA[name]) for name in RATINGS_COLUMNS}
+
+    filled = 0
+    for chunk in read_ratings_chunks(path, block_size):
+        end = filled + len(chunk)
+        if end > n_rows:
+            raise ValueError(f"{path}: more rows than counted ({end} > {n_rows})")
+        for name in RATINGS_COLUMNS:
+            columns[name][filled:end] = chunk[name].values
+        for builder in builders:
+            builder.update(chunk)
+        filled = end
+
+    # count_rows includes blank lines, which the parser skips: trim the unused tail
+    return pd.DataFrame({name: values[:filled] for name, values in columns.items()}, copy=False)
+
+
+def _compressed(major, minor, values, major_lookup, minor_lookup, shape, chunksize):
+    """CSR over (major, minor) raw ids by a chunked counting sort"""
+    n_major = shape[0]
+    counts = np.zeros(n_major, dtype=np.int64)
+    for start in range(0, len(major), chunksize):
+        counts += np.bincount(major_lookup[major[start:start + chunksize]], minlength=n_major)
+
+    index_dtype = np.int32 if len(major) < np.iinfo(np.int32).max else np.int64
+    indptr = np.zeros(n_major + 1, dtype=index_dtype)
+    np.cumsum(counts, out=indptr[1:])
+    indices = np.empty(len(major), dtype=index_dtype)
+    data = np.empty(len(major), dtype=np.float32)
+
+    # Next free slot of every row; entries of a chunk go to their row in file order
+    cursor = indptr[:-1].astype(np.int64)
+    for start in range(0, len(major), chunksize):
+        rows = major_lookup[major[start:start + chunksize]]
+        order = np.argsort(rows, kind='stable')
+        sorted_rows = rows[order]
+        rank = np.arange(len(rows)) - np.searchsorted(sorted_rows, sorted_rows)
+        slots = cursor[sorted_rows] + rank
+        indices[slots] = minor_lookup[minor[start:start + chunksize][order]]
+        data[slots] = values[start:start + chunksize][order]
+        cursor += np.bincount(rows, minlength=n_major)
+
+    matrix = csr_matrix((data, indices, indptr), shape=shape)
+    matrix.sum_duplicates()
+    return matrix
+
+
+def build_rating_index(ratings_df, user_encoder, movie_encoder, chunksize=CHUNK_ROWS):
+    """
+    RatingIndex over streamed ratings, from encoders that saw every chunk
+
+    Equivalent to RatingIndex.from_ratings(ratings_df), without the COO
+    intermediate (int64 row/col arrays of one entry per rating).
+    """
+    user_ids, user_lookup = user_encoder.finish()
+    movie_ids, movie_lookup = movie_encoder.finish()
+    users = ratings_df['user_id'].values
+    movies = ratings_df['movie_id'].values
+    ratings = ratings_df['rating'].values
+
+    user_matrix = _compressed(users, movies, ratings, user_lookup, movie_lookup,
+                              (len(user_ids), len(movie_ids)), chunksize)
+    # Movie-major CSR transposed is the (users x movies) CSC, without a copy
+    movie_matrix = _compressed(movies, users, ratings, movie_lookup, user_lookup,
+                               (len(movie_ids), len(user_ids)), chunksize).T
+    return RatingIndex.from_matrices(user_ids, movie_ids, user_matrix, movie_matrix)
+
+
+def load_ratings(path, block_size=BLOCK_BYTES, chunksize=CHUNK_ROWS):
+    """
+    Stream ratings.dat once and build everything derived from it
+
+    Returns:
+    --------
+    (ratings_df, rating_index, movie_stats) : compact ratings, RatingIndex
+    and a per-movie DataFrame with avg_rating and num_ratings
+    """
+    user_encoder, movie_encoder = IdEncoder('user_id'), IdEncoder('movie_id')
+    stats = MovieStatsBuilder()
+    ratings_df = read_ratings(path, (user_encoder, movie_encoder, stats), block_size)
+    rating_index = build_rating_index(ratings_df, user_encoder, movie_encoder, chunksize)
+    return ratings_df, rating_index, stats.frame()
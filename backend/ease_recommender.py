@@ -0,0 +1,213 @@
+"""
+EASE RECOMMENDER
+================
+Embarrassingly Shallow Autoencoder (Steck, 2019): a closed-form item-item
+model. With X the (users x movies) interaction matrix and G = X^T X + lambda*I,
+
+    P = G^-1,    B = -P / diag(P),    diag(B) = 0
+
+B is dense (movies x movies) and comes from a single float32 inverse of the
+Gram matrix, which is cheap at MovieLens scale (~3.7k movies). Scores for a
+user are x_u @ B (a sparse-dense product); the neighbors of a movie are the
+largest entries of its row of B.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import read_movies, read_ratings
+from rating_index import RatingIndex
+
+
+def ease_weights(matrix, lambda_=500.0, dtype=np.float32):
+    """
+    Closed-form EASE weight matrix
+
+    Parameters:
+    -----------
+    matrix : Sparse (users x items) interaction matrix
+    lambda_ : L2 regularization added to the Gram diagonal
+    dtype : Precision of the Gram matrix and its inverse
+
+    Returns:
+    --------
+    (items x items) dense weight matrix B with a zero diagonal
+    """
+    gram = (matrix.T @ matrix).toarray().astype(dtype, copy=False)
+    gram[np.diag_indices_from(gram)] += lambda_
+
+    weights = np.linalg.inv(gram)
+    del gram
+    weights /= -np.diag(weights)
+    np.fill_diagonal(weights, 0)
+    return weights
+
+
+class EASERecommender:
+    """
+    Closed-form item-item recommender (EASE)
+    """
+
+    def __init__(self, ratings_df, movies_df, lambda_=500.0, implicit=True, index=None):
+        """
+        Initialize EASE Recommender
+
+        Parameters:
+        -----------
+        ratings_df : DataFrame with columns [user_id, movie_id, rating]
+        movies_df : DataFrame with columns [movie_id, title, genres]
+        lambda_ : L2 regularization (larger favors popular items less)
+        implicit : Fit on rated / not rated (True) or on the rating values
+        index : Optional prebuilt RatingIndex over ratings_df
+        """
+        self.ratings = ratings_df
+        self.movies = movies_df
+        self.lambda_ = lambda_
+        self.implicit = implicit
+        self.index = index
+        self.weights = None
+        self.fit_time = None
+
+    def _interactions(self, matrix):
+        if not self.implicit:
+            return matrix
+        binary = matrix.copy()
+        binary.data = np.ones_like(binary.data)
+        return binary
+
+    def fit(self):
+        """Compute the item weight matrix from the Gram matrix of the ratings"""
+        start_time = time.perf_counter()
+        if self.index is None:
+            self.index = RatingIndex.from_ratings(self.ratings)
+
+        self.weights = ease_weights(self._interactions(self.index.user_matrix), self.lambda_)
+        self.fit_time = time.perf_counter() - start_time
+        return self
+
+    @property
+    def memory_mb(self):
+        """Size of the weight matrix in MB"""
+        return self.weights.nbytes / 2 ** 20
+
+    def score_users(self, user_codes):
+        """(len(user_codes) x movies) scores, already-rated movies set to -inf"""
+        history = self._interactions(self.index.user_matrix[user_codes])
+        scores = np.asarray(history @ self.weights)
+        scores[np.repeat(np.arange(len(user_codes)), np.diff(history.indptr)), history.indices] = -np.inf
+        return scores
+
+    def score_history(self, movie_ids, ratings=None):
+        """Scores for a new user from the movies they rated (rated movies get -inf)"""
+        movie_codes = self.index.movie_codes(movie_ids)
+        known = movie_codes >= 0
+        values = np.ones(known.sum(), dtype=np.float32)
+        if not self.implicit and ratings is not None:
+            values = np.asarray(ratings, dtype=np.float32)[known]
+
+        scores = values @ self.weights[movie_codes[known]]
+        scores[movie_codes[known]] = -np.inf
+        return scores
+
+    def similar_movies(self, movie_id, top_n=10, allowed=None):
+        """
+        Movies with the largest EASE weights from movie_id
+
+        Parameters:
+        -----------
+        movie_id : Query movie
+        top_n : Number of neighbors
+        allowed : Optional boolean mask over index.movie_ids
+
+        Returns:
+        --------
+        (movie_ids, scores) : arrays sorted by decreasing weight
+        """
+        movie_idx = self.index.movie_codes(movie_id)[0]
+        if movie_idx < 0:
+            return np.array([], dtype=self.index.movie_ids.dtype), np.array([], dtype=np.float32)
+
+        scores = self.weights[movie_idx].copy()
+        scores[movie_idx] = -np.inf
+        if allowed is not None:
+            scores[~allowed] = -np.inf
+        scores[scores <= 0] = -np.inf
+        top = self._top(scores, top_n)
+        return self.index.movie_ids[top], scores[top]
+
+    def recommend_for_user(self, user_id, top_n=10):
+        """Top-N unseen movies for an existing user as a DataFrame"""
+        user_idx = self.index.user_codes(user_id)[0]
+        if user_idx < 0:
+            print(f"❌ User {user_id} not found!")
+            return None
+
+        scores = self.score_users([user_idx])[0]
+        top = self._top(scores, top_n)
+        recommendations = pd.DataFrame({
+            'movie_id': self.index.movie_ids[top],
+            'score': scores[top]
+        })
+        return recommendations.merge(self.movies[['movie_id', 'title', 'genres']], on='movie_id', how='left')
+
+    def item_neighbors(self, k=50):
+        """Top-k neighbor table over all movies: (movie_ids, neighbors, scores)"""
+        weights = self.weights.copy()
+        np.fill_diagonal(weights, -np.inf)
+        k = min(k, weights.shape[0] - 1)
+
+        neighbors = np.argpartition(-weights, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(weights, neighbors, axis=1)
+        order = np.argsort(-scores, axis=1)
+        neighbors = np.take_along_axis(neighbors, order, axis=1).astype(np.int32)
+        scores = np.take_along_axis(scores, order, axis=1)
+        return self.index.movie_ids, neighbors, scores
+
+    @staticmethod
+    def _top(scores, top_n):
+        top_n = min(top_n, int(np.isfinite(scores).sum()))
+        if top_n <= 0:
+            return np.array([], dtype=int)
+        top = np.argpartition(-scores, top_n - 1)[:top_n]
+        return top[np.argsort(-scores[top], kind='stable')]
+
+
+def main_ease(ratings_df, movies_df, lambda_=500.0, movie_title="Toy Story (1995)", user_id=1, top_n=10):
+    """Main function for the EASE Recommender"""
+    print("\n" + "⚡"*40)
+    print(" "*30 + "EASE (CLOSED-FORM ITEM MODEL) RECOMMENDER")
+    print("⚡"*40 + "\n")
+
+    ease = EASERecommender(ratings_df, movies_df, lambda_=lambda_).fit()
+    print(f"✅ Weight matrix {ease.weights.shape} ({ease.memory_mb:.1f} MB) in {ease.fit_time:.2f}s")
+
+    movie_id = movies_df.loc[movies_df['title'] == movie_title, 'movie_id']
+    if not movie_id.empty:
+        movie_ids, scores = ease.similar_movies(movie_id.iloc[0], top_n)
+        titles = movies_df.set_index('movie_id').loc[movie_ids, 'title']
+
+        print(f"\n🎬 Input Movie: {movie_title}")
+        print(f"\n📊 Top {top_n} Similar Movies (EASE):")
+        print("-"*80)
+        for title, score in zip(titles, scores):
+            print(f"{title:<60} {score:.4f}")
+
+    recommendations = ease.recommend_for_user(user_id, top_n)
+    if recommendations is not None:
+        print(f"\n👤 Top {top_n} Recommendations for User {user_id} (EASE):")
+        print("-"*80)
+        for _, row in recommendations.iterrows():
+            print(f"{row['title']:<60} {row['score']:.4f}")
+
+    return ease
+
+
+if __name__ == "__main__":
+    # Load data
+    print("Loading data...")
+    ratings = read_ratings('./data/ratings.dat')
+    movies = read_movies('./data/movies.dat')
+
+    ease = main_ease(ratings, movies)
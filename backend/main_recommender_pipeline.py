@@ -20,7 +20,7 @@ warnings.filterwarnings('ignore')
 
 # Import custom modules
 from movie_recommender_system import MovieRecommenderSystem
-from matrix_factorization_recommender import MatrixFactorizationRecommender, main_mf
+from matrix_factorization_recommender import CMFREC_AVAILABLE, MatrixFactorizationRecommender, main_mf
 from user_based_recommender import UserBasedRecommender, main_user_based
 
 
@@ -196,6 +196,7 @@ def main():
      .create_pivot_table()
      .visualize_data()
      .answer_questions())
+    recommender.startup_report()
     
     # Test different recommendation approaches
     print("\n" + "▓"*100)
@@ -221,15 +222,19 @@ def main():
     print(" "*35 + "PART 2: MATRIX FACTORIZATION")
     print("█"*100 + "\n")
     
-    try:
-        mf_recommender, mf_metrics = main_mf(
-            ratings_df=recommender.ratings,
-            movies_df=recommender.movies
-        )
-    except Exception as e:
-        print(f"⚠️  Matrix Factorization skipped: {e}")
+    mf_metrics = None
+    if not CMFREC_AVAILABLE:
+        print("⚠️  Matrix Factorization skipped: cmfrec not installed")
         print("   Install cmfrec with: pip install cmfrec")
-        mf_metrics = None
+    else:
+        try:
+            mf_recommender, mf_metrics = main_mf(
+                ratings_df=recommender.ratings,
+                movies_df=recommender.movies,
+                index=recommender.rating_matrices
+            )
+        except Exception as e:
+            print(f"⚠️  Matrix Factorization failed: {type(e).__name__}: {e}")
     
     # =========================================================================
     # PART 3: USER-BASED COLLABORATIVE FILTERING
@@ -242,7 +247,8 @@ def main():
     try:
         user_recommender, user_recommendations = main_user_based(
             ratings_df=recommender.ratings,
-            movies_df=recommender.movies
+            movies_df=recommender.movies,
+            index=recommender.rating_matrices
         )
     except Exception as e:
         print(f"⚠️  User-based CF encountered an issue: {e}")
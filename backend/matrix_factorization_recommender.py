@@ -9,6 +9,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.model_selection import train_test_split
+from data_loader import read_movies, read_ratings
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -20,12 +21,21 @@ except ImportError:
     print("⚠️  cmfrec not installed. Install with: pip install cmfrec")
 
 
+def _triplets(ratings_df):
+    """Ratings in cmfrec's (UserId, ItemId, Rating) layout; a bare 2-D array would be read as a dense matrix"""
+    return pd.DataFrame({
+        'UserId': ratings_df['user_id'].to_numpy(),
+        'ItemId': ratings_df['movie_id'].to_numpy(),
+        'Rating': ratings_df['rating'].to_numpy(dtype=np.float64)
+    })
+
+
 class MatrixFactorizationRecommender:
     """
     Matrix Factorization based Recommender System
     """
     
-    def __init__(self, ratings_df, movies_df, n_factors=4):
+    def __init__(self, ratings_df, movies_df, n_factors=4, lambda_=0.1, index=None):
         """
         Initialize Matrix Factorization Recommender
         
@@ -34,10 +44,14 @@ class MatrixFactorizationRecommender:
         ratings_df : DataFrame with columns [user_id, movie_id, rating]
         movies_df : DataFrame with columns [movie_id, title, genres]
         n_factors : Number of latent factors (d)
+        lambda_ : Regularization strength
+        index : Optional prebuilt RatingIndex over ratings_df
         """
         self.ratings = ratings_df
         self.movies = movies_df
         self.n_factors = n_factors
+        self.lambda_ = lambda_
+        self.index = index
         self.model = None
         self.user_factors = None
         self.item_factors = None
@@ -74,20 +88,19 @@ class MatrixFactorizationRecommender:
         
         print(f"\n🤖 Training model with {len(train_data):,} ratings...")
         print(f"   Latent factors (d): {self.n_factors}")
+        print(f"   Regularization (lambda): {self.lambda_}")
         
         # Create model
         self.model = cmfrec.CMF(
             k=self.n_factors,
-            lambda_=0.1,
+            lambda_=self.lambda_,
             method='als',
             verbose=False,
             random_state=42
         )
         
         # Fit model
-        self.model.fit(
-            X=train_data[['user_id', 'movie_id', 'rating']].values
-        )
+        self.model.fit(X=_triplets(train_data))
         
         # Extract factors
         self.user_factors = self.model.A_  # User embeddings
@@ -109,23 +122,15 @@ class MatrixFactorizationRecommender:
             print("❌ Model not trained yet!")
             return None
         
-        # Make predictions
-        predictions = []
-        actuals = []
-        
-        for _, row in test_data.iterrows():
-            try:
-                pred = self.model.predict(
-                    user=[row['user_id']],
-                    item=[row['movie_id']]
-                )[0]
-                predictions.append(pred)
-                actuals.append(row['rating'])
-            except:
-                continue
+        # Make predictions (NaN for users or movies missing from the train set)
+        predictions = np.asarray(self.model.predict(
+            user=test_data['user_id'].to_numpy(),
+            item=test_data['movie_id'].to_numpy()
+        ), dtype=np.float64)
+        actuals = test_data['rating'].to_numpy(dtype=np.float64)
         
-        predictions = np.array(predictions)
-        actuals = np.array(actuals)
+        known = ~np.isnan(predictions)
+        predictions, actuals = predictions[known], actuals[known]
         
         # Calculate RMSE
         rmse = np.sqrt(np.mean((predictions - actuals) ** 2))
@@ -302,15 +307,19 @@ class MatrixFactorizationRecommender:
             random_state=42
         )
         
-        model_2d.fit(
-            X=self.ratings[['user_id', 'movie_id', 'rating']].values
-        )
+        model_2d.fit(X=_triplets(self.ratings))
         
         item_factors_2d = model_2d.B_
         
-        # Get top N most rated movies for visualization
-        movie_counts = self.ratings['movie_id'].value_counts().head(n_movies)
-        top_movie_ids = movie_counts.index.tolist()
+        # Get top N most rated movies for visualization (posting list lengths
+        # of the shared index when there is one)
+        if self.index is not None:
+            movie_counts = np.diff(self.index.movie_matrix.indptr)
+            top_codes = np.argsort(-movie_counts, kind='stable')[:n_movies]
+            top_movie_ids = self.index.movie_ids[top_codes].tolist()
+        else:
+            movie_counts = self.ratings['movie_id'].value_counts().head(n_movies)
+            top_movie_ids = movie_counts.index.tolist()
         
         # Filter embeddings for top movies
         embeddings_to_plot = []
@@ -367,8 +376,13 @@ class MatrixFactorizationRecommender:
         return embeddings_to_plot, labels
 
 
-def main_mf(ratings_df, movies_df):
-    """Main function for Matrix Factorization"""
+def main_mf(ratings_df, movies_df, n_factors=4, lambda_=0.1, index=None):
+    """
+    Main function for Matrix Factorization (index: optional shared RatingIndex)
+
+    n_factors and lambda_ default to the original d=4 setup; pass
+    MFHyperparameterSweep.best_params() to use the sweep's winner.
+    """
     print("\n" + "🎯"*40)
     print(" "*25 + "MATRIX FACTORIZATION RECOMMENDER")
     print("🎯"*40 + "\n")
@@ -377,11 +391,13 @@ def main_mf(ratings_df, movies_df):
         print("❌ Please install cmfrec: pip install cmfrec")
         return None
     
-    # Initialize recommender with d=4
+    # Initialize recommender (d=4 unless overridden)
     mf_recommender = MatrixFactorizationRecommender(
         ratings_df=ratings_df,
         movies_df=movies_df,
-        n_factors=4
+        n_factors=n_factors,
+        lambda_=lambda_,
+        index=index
     )
     
     # Train-test split
@@ -412,23 +428,8 @@ def main_mf(ratings_df, movies_df):
 if __name__ == "__main__":
     # Load data
     print("Loading data...")
-    ratings = pd.read_csv(
-        './data/ratings.dat',
-        sep='::',
-        engine='python',
-        header=0,
-        names=['user_id', 'movie_id', 'rating', 'timestamp'],
-        encoding='ISO-8859-1'
-    )
-    
-    movies = pd.read_csv(
-        './data/movies.dat',
-        sep='::',
-        engine='python',
-        header=0,
-        names=['movie_id', 'title', 'genres'],
-        encoding='ISO-8859-1'
-    )
+    ratings = read_ratings('./data/ratings.dat')
+    movies = read_movies('./data/movies.dat')
     
     # Run Matrix Factorization
     mf_recommender, metrics = main_mf(ratings, movies)
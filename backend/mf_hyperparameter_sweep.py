@@ -0,0 +1,304 @@
+"""
+MATRIX FACTORIZATION HYPERPARAMETER SWEEP
+=========================================
+Grid search over latent factors (k), regularization (lambda) and ALS
+iterations for the matrix factorization recommender.
+
+- Trials run in a process pool; the train/test split lives in shared memory
+  so workers attach to it instead of receiving pickled copies.
+- Trials sharing (lambda, iterations) form a chain ordered by k, and each
+  trial is warm-started from the previous (smaller k) trial's factors.
+- Finished trials are cached on disk and skipped on the next run; the cache
+  key includes the warm-start path, so results never mix cold and warm starts.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from threadpoolctl import threadpool_limits
+
+from als_solver import ALSModel, encode_ids
+from data_loader import read_ratings
+
+
+# Shared-memory views, populated in each worker by _init_worker
+_SHARED = {}
+
+
+def _share_array(array):
+    """Copy an array into a new shared memory block; returns (block, spec)"""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    view[:] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _init_worker(specs, shape):
+    """Attach the worker to the shared train/test arrays"""
+    for name, (block_name, array_shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _SHARED[name] = np.ndarray(array_shape, dtype=np.dtype(dtype), buffer=block.buf)
+        _SHARED[f'_block_{name}'] = block
+    _SHARED['shape'] = shape
+    # One BLAS thread per process: parallelism comes from the pool
+    _SHARED['_limits'] = threadpool_limits(limits=1)
+
+
+def _run_chain(chain, cache_dir, random_state):
+    """Run trials of one (lambda, iterations) chain in increasing k order"""
+    n_users, n_items = _SHARED['shape']
+    results = []
+    previous = None
+
+    for trial in chain:
+        cached = _load_cached_trial(cache_dir, trial['key'])
+        if cached is not None:
+            result, factors = cached
+            result['cached'] = True
+            results.append(result)
+            previous = factors
+            continue
+
+        model = ALSModel(
+            n_factors=trial['k'],
+            lambda_=trial['lambda'],
+            n_iter=trial['iterations'],
+            random_state=random_state
+        )
+
+        start_time = time.time()
+        model.fit(
+            _SHARED['train_user'], _SHARED['train_item'], _SHARED['train_rating'],
+            n_users, n_items,
+            init_user_factors=None if previous is None else previous['user_factors'],
+            init_item_factors=None if previous is None else previous['item_factors']
+        )
+        train_time = time.time() - start_time
+
+        predictions = np.clip(model.predict(_SHARED['test_user'], _SHARED['test_item']), 1, 5)
+        errors = predictions - _SHARED['test_rating']
+
+        result = {
+            'k': trial['k'],
+            'lambda': trial['lambda'],
+            'iterations': trial['iterations'],
+            'rmse': float(np.sqrt(np.mean(errors ** 2))),
+            'mae': float(np.mean(np.abs(errors))),
+            'train_time_s': train_time,
+            'warm_start_k': trial['warm_start_k'] if previous is not None else None,
+            'cached': False
+        }
+        factors = {'user_factors': model.user_factors, 'item_factors': model.item_factors}
+        _save_cached_trial(cache_dir, trial['key'], result, factors)
+
+        results.append(result)
+        previous = factors
+
+    return results
+
+
+def _load_cached_trial(cache_dir, key):
+    result_path = os.path.join(cache_dir, f'{key}.json')
+    factors_path = os.path.join(cache_dir, f'{key}.npz')
+    if not (os.path.exists(result_path) and os.path.exists(factors_path)):
+        return None
+
+    with open(result_path) as f:
+        result = json.load(f)
+    with np.load(factors_path) as data:
+        factors = {'user_factors': data['user_factors'], 'item_factors': data['item_factors']}
+    return result, factors
+
+
+def _save_cached_trial(cache_dir, key, result, factors):
+    np.savez(os.path.join(cache_dir, f'{key}.npz'), **factors)
+    # Result file is written last so a half-written trial is never reused
+    with open(os.path.join(cache_dir, f'{key}.json'), 'w') as f:
+        json.dump(result, f)
+
+
+class MFHyperparameterSweep:
+    """
+    Parallel grid search for the matrix factorization recommender
+    """
+
+    def __init__(self, ratings_df, k_values=(2, 4, 8, 16), lambda_values=(0.1, 1.0, 10.0),
+                 iteration_values=(5, 10), test_size=0.2, random_state=42,
+                 cache_dir='./mf_sweep_cache/', n_jobs=None):
+        """
+        Initialize the sweep
+
+        Parameters:
+        -----------
+        ratings_df : DataFrame with columns [user_id, movie_id, rating]
+        k_values : Latent factor counts (d) to try
+        lambda_values : Regularization strengths to try
+        iteration_values : ALS iteration counts to try
+        test_size : Fraction of ratings held out for RMSE
+        random_state : Seed for the split and factor initialisation
+        cache_dir : Directory holding finished trials
+        n_jobs : Worker processes (default: all cores)
+        """
+        self.ratings = ratings_df
+        self.k_values = sorted(k_values)
+        self.lambda_values = list(lambda_values)
+        self.iteration_values = list(iteration_values)
+        self.test_size = test_size
+        self.random_state = random_state
+        self.cache_dir = cache_dir
+        self.n_jobs = n_jobs or os.cpu_count()
+        self.results = None
+
+    def _split(self):
+        """Encode ids and split into train/test arrays"""
+        user_idx, user_ids = encode_ids(self.ratings['user_id'].values)
+        item_idx, item_ids = encode_ids(self.ratings['movie_id'].values)
+        ratings = self.ratings['rating'].values.astype(np.float32)
+
+        train_rows, test_rows = train_test_split(
+            np.arange(len(ratings)),
+            test_size=self.test_size,
+            random_state=self.random_state
+        )
+
+        arrays = {
+            'train_user': user_idx[train_rows],
+            'train_item': item_idx[train_rows],
+            'train_rating': ratings[train_rows],
+            'test_user': user_idx[test_rows],
+            'test_item': item_idx[test_rows],
+            'test_rating': ratings[test_rows]
+        }
+        return arrays, (len(user_ids), len(item_ids))
+
+    def _fingerprint(self, arrays):
+        digest = hashlib.sha1()
+        for name in sorted(arrays):
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+        return digest.hexdigest()[:16]
+
+    def _build_chains(self, fingerprint):
+        """Group trials by (lambda, iterations), ordered by k for warm starts"""
+        chains = []
+        for lambda_, iterations in product(self.lambda_values, self.iteration_values):
+            chains.append([{'k': k, 'lambda': lambda_, 'iterations': iterations} for k in self.k_values])
+
+        # Split the longest chains while cores would otherwise sit idle;
+        # the first trial of each split chain starts cold.
+        while len(chains) < self.n_jobs:
+            longest = max(chains, key=len)
+            if len(longest) < 2:
+                break
+            chains.remove(longest)
+            middle = len(longest) // 2
+            chains.extend([longest[:middle], longest[middle:]])
+
+        # A trial's factors depend on every k it was warm-started through, which
+        # depends on how the chains were split (--jobs): that path is part of the key
+        for chain in chains:
+            path = []
+            for trial in chain:
+                path.append(str(trial['k']))
+                trial['warm_start_k'] = int(path[-2]) if len(path) > 1 else None
+                trial['key'] = hashlib.sha1(
+                    f"{fingerprint}-{trial['k']}-{trial['lambda']}-{trial['iterations']}-{self.random_state}"
+                    f"-{'>'.join(path)}".encode()
+                ).hexdigest()[:16]
+
+        return chains
+
+    def run(self):
+        """Run every trial and return the results table sorted by RMSE"""
+        print("\n" + "="*80)
+        print("MATRIX FACTORIZATION HYPERPARAMETER SWEEP")
+        print("="*80)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        arrays, shape = self._split()
+        chains = self._build_chains(self._fingerprint(arrays))
+        n_trials = sum(len(chain) for chain in chains)
+
+        print(f"\n🔬 {n_trials} trials in {len(chains)} warm-start chains on {self.n_jobs} workers")
+        print(f"   k: {self.k_values} | lambda: {self.lambda_values} | iterations: {self.iteration_values}")
+
+        blocks, specs = [], {}
+        try:
+            for name, array in arrays.items():
+                block, specs[name] = _share_array(array)
+                blocks.append(block)
+
+            start_time = time.time()
+            with ProcessPoolExecutor(max_workers=min(self.n_jobs, len(chains)),
+                                     initializer=_init_worker,
+                                     initargs=(specs, shape)) as executor:
+                futures = [
+                    executor.submit(_run_chain, chain, self.cache_dir, self.random_state)
+                    for chain in chains
+                ]
+                results = [result for future in futures for result in future.result()]
+            elapsed = time.time() - start_time
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        self.results = (pd.DataFrame(results)
+                        .sort_values('rmse')
+                        .reset_index(drop=True))
+
+        print(f"\n✅ Sweep finished in {elapsed:.1f}s "
+              f"({int(self.results['cached'].sum())} trials from cache)")
+        print("-" * 80)
+        print(self.results.to_string(index=False))
+
+        return self.results
+
+    def best_params(self):
+        """Best (n_factors, lambda_) by test RMSE, ready for main_mf"""
+        best = self.results.iloc[0]
+        return {'n_factors': int(best['k']), 'lambda_': float(best['lambda'])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel MF hyperparameter sweep')
+    parser.add_argument('--data-path', default='./data/')
+    parser.add_argument('--k', type=int, nargs='+', default=[4, 8, 16, 32])
+    parser.add_argument('--lambdas', type=float, nargs='+', default=[0.1, 1.0, 10.0])
+    parser.add_argument('--iterations', type=int, nargs='+', default=[5, 10])
+    parser.add_argument('--jobs', type=int, default=None)
+    parser.add_argument('--cache-dir', default='./mf_sweep_cache/')
+    parser.add_argument('--output', default='mf_sweep_results.csv')
+    args = parser.parse_args()
+
+    print("Loading data...")
+    ratings = read_ratings(f'{args.data_path}ratings.dat')
+
+    sweep = MFHyperparameterSweep(
+        ratings,
+        k_values=args.k,
+        lambda_values=args.lambdas,
+        iteration_values=args.iterations,
+        cache_dir=args.cache_dir,
+        n_jobs=args.jobs
+    )
+    results = sweep.run()
+    results.to_csv(args.output, index=False)
+
+    print(f"\n📁 Results saved to '{args.output}'")
+    print(f"🏆 Best parameters: {sweep.best_params()}")
+
+    return sweep
+
+
+if __name__ == "__main__":
+    sweep = main()
@@ -12,10 +12,13 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from scipy.stats import pearsonr
-from scipy.sparse import csr_matrix
 from sklearn.neighbors import NearestNeighbors
 from sklearn.metrics.pairwise import cosine_similarity
+from data_loader import load_ratings, read_movies, read_users
+from rating_index import RatingIndex
+from schema import categorical_merge, compact_frames, genre_bitmask, memory_mb
+from similarity import blocked_top_k_cosine, corated_pearson, save_neighbors
+from startup_profile import StartupProfile, profiled
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -29,55 +32,100 @@ class MovieRecommenderSystem:
     Complete Movie Recommender System with multiple approaches
     """
     
-    def __init__(self, data_path='./data/'):
-        """Initialize the recommender system"""
+    def __init__(self, data_path='./data/', trace_memory=False):
+        """
+        Initialize the recommender system
+
+        Every pipeline step is profiled (wall, CPU time, memory) in
+        self.startup; trace_memory adds tracemalloc figures per step.
+        """
         self.data_path = data_path
+        self.startup = StartupProfile('MovieRecommenderSystem', trace_memory=trace_memory)
         self.ratings = None
         self.movies = None
         self.users = None
         self.merged_data = None
         self.pivot_table = None
+        self.user_neighbors = None
+        
+    @property
+    def ratings(self):
+        return self._ratings
+    
+    @ratings.setter
+    def ratings(self, value):
+        """
+        Assigning ratings invalidates every cached matrix; after editing the
+        frame in place, assign it again (recommender.ratings = recommender.ratings)
+        """
+        self._ratings = value
+        self._rating_matrices = None
         self.item_similarity_matrix = None
-        self.user_similarity_matrix = None
+    
+    @property
+    def rating_matrices(self):
+        """
+        Sparse rating matrices shared by every recommender method, built
+        once on first use: user-major CSR (`user_matrix`), movie-major CSC
+        (`movie_matrix`) and the `user_ids` / `movie_ids` maps.
+        Rebuilt after the ratings are assigned (see the ratings setter).
+        """
+        if self._rating_matrices is None:
+            print("\n🔄 Building sparse rating matrices (cached for all methods)...")
+            with self.startup.stage('rating_matrices'):
+                self._rating_matrices = RatingIndex.from_ratings(self._ratings)
+            self.item_similarity_matrix = None
+        return self._rating_matrices
+    
+    def _movie_user_csr(self):
+        """Movie-major CSR (movies x users): a transposed view of the cached CSC"""
+        return self.rating_matrices.movie_matrix.T
+    
+    def _find_movie_index(self, movie_title):
+        """Row of a movie title in the cached matrices, or None"""
+        movie_id = self.movies[self.movies['title'] == movie_title]['movie_id'].values
         
+        if len(movie_id) == 0:
+            print(f"❌ Movie '{movie_title}' not found!")
+            return None
+        
+        movie_idx = self.rating_matrices.movie_codes(movie_id[0])[0]
+        if movie_idx < 0:
+            print(f"❌ Movie '{movie_title}' has no ratings!")
+            return None
+        return movie_idx
+        
+    @profiled('load_data')
     def load_data(self):
         """Load and format the data files"""
         print("="*80)
         print("STEP 1: LOADING DATA FILES")
         print("="*80)
         
-        # Load ratings
+        # Load ratings (streamed in chunks into compact columns; the sparse
+        # rating matrices are assembled along the way and cached)
         print("\n📊 Loading ratings.dat...")
-        self.ratings = pd.read_csv(
-            f'{self.data_path}ratings.dat',
-            sep='::',
-            engine='python',
-            header=0,
-            names=['user_id', 'movie_id', 'rating', 'timestamp'],
-            encoding='ISO-8859-1'
-        )
+        with self.startup.stage('ratings'):
+            self.ratings, rating_matrices, _ = load_ratings(f'{self.data_path}ratings.dat')
+            self._rating_matrices = rating_matrices
         
         # Load movies
         print("🎬 Loading movies.dat...")
-        self.movies = pd.read_csv(
-            f'{self.data_path}movies.dat',
-            sep='::',
-            engine='python',
-            header=0,
-            names=['movie_id', 'title', 'genres'],
-            encoding='ISO-8859-1'
-        )
+        with self.startup.stage('movies'):
+            self.movies = read_movies(f'{self.data_path}movies.dat')
         
         # Load users
         print("👥 Loading users.dat...")
-        self.users = pd.read_csv(
-            f'{self.data_path}users.dat',
-            sep='::',
-            engine='python',
-            header=0,
-            names=['user_id', 'gender', 'age', 'occupation', 'zip_code'],
-            encoding='ISO-8859-1'
-        )
+        with self.startup.stage('users'):
+            self.users = read_users(f'{self.data_path}users.dat')
+        
+        # Compact dtypes (int32 ids, float32 ratings, categoricals)
+        print("🗜️  Applying compact schema...")
+        with self.startup.stage('compact'):
+            frames, memory_report = compact_frames(movies=self.movies, users=self.users)
+            self.movies, self.users = frames['movies'], frames['users']
+        print(memory_report.round(2).to_string())
+        print(f"ratings (streamed, compact): {memory_mb(self.ratings):.2f} MB")
         
         print("\n✅ Data loaded successfully!")
         print(f"   Ratings: {self.ratings.shape}")
@@ -86,6 +134,7 @@ class MovieRecommenderSystem:
         
         return self
     
+    @profiled('format_and_merge')
     def format_and_merge_data(self):
         """Format and merge all dataframes"""
         print("\n" + "="*80)
@@ -95,27 +144,33 @@ class MovieRecommenderSystem:
         # Convert timestamp to datetime
         print("\n🔄 Converting timestamp to datetime...")
         self.ratings['date'] = pd.to_datetime(self.ratings['timestamp'], unit='s')
-        self.ratings['year'] = self.ratings['date'].dt.year
+        self.ratings['year'] = self.ratings['date'].dt.year.astype('int16')
         
         # Extract release year from movie title
         print("📅 Extracting release year from movie titles...")
-        self.movies['release_year'] = self.movies['title'].str.extract(r'\((\d{4})\)').astype(float)
+        self.movies['release_year'] = self.movies['title'].str.extract(r'\((\d{4})\)').astype('float32')
         
         # Split genres
         print("🎭 Processing genres...")
         self.movies['genre_list'] = self.movies['genres'].str.split('|')
-        self.movies['num_genres'] = self.movies['genre_list'].apply(len)
+        self.movies['num_genres'] = self.movies['genre_list'].apply(len).astype('int8')
+        self.movies['genre_mask'], self.genre_vocabulary = genre_bitmask(self.movies['genres'])
         
-        # Merge all dataframes
+        # Merge all dataframes; per-movie strings ride along as categorical
+        # codes and the per-movie genre lists stay on self.movies
         print("🔗 Merging dataframes...")
-        self.merged_data = self.ratings.merge(self.movies, on='movie_id')
-        self.merged_data = self.merged_data.merge(self.users, on='user_id')
+        self.merged_data = categorical_merge(
+            self.ratings, self.movies.drop(columns='genre_list'), on='movie_id', columns=['title']
+        )
+        self.merged_data = categorical_merge(self.merged_data, self.users, on='user_id', columns=['zip_code'])
         
         print(f"\n✅ Merged data shape: {self.merged_data.shape}")
+        print(f"   Memory: {memory_mb(self.merged_data):.1f} MB")
         print(f"   Columns: {list(self.merged_data.columns)}")
         
         return self
     
+    @profiled('eda')
     def perform_eda(self):
         """Perform Exploratory Data Analysis"""
         print("\n" + "="*80)
@@ -157,6 +212,7 @@ class MovieRecommenderSystem:
         
         return self
     
+    @profiled('group_and_aggregate')
     def group_and_aggregate(self):
         """Group data by average rating and number of ratings"""
         print("\n" + "="*80)
@@ -190,6 +246,7 @@ class MovieRecommenderSystem:
         
         return self
     
+    @profiled('pivot_table')
     def create_pivot_table(self):
         """Create pivot table for collaborative filtering"""
         print("\n" + "="*80)
@@ -197,20 +254,23 @@ class MovieRecommenderSystem:
         print("="*80)
         
         print("\n📊 Creating user-movie pivot table...")
-        self.pivot_table = self.ratings.pivot_table(
-            index='user_id',
-            columns='movie_id',
-            values='rating'
+        matrices = self.rating_matrices
+        
+        # Dense views of the cached sparse matrix, no second pivot
+        self.pivot_table_filled = pd.DataFrame(
+            matrices.user_matrix.toarray(),
+            index=pd.Index(matrices.user_ids, name='user_id'),
+            columns=pd.Index(matrices.movie_ids, name='movie_id')
         )
+        self.pivot_table = self.pivot_table_filled.mask(self.pivot_table_filled == 0)
         
+        n_cells = matrices.shape[0] * matrices.shape[1]
         print(f"   Pivot table shape: {self.pivot_table.shape}")
-        print(f"   Sparsity: {(self.pivot_table.isnull().sum().sum() / (self.pivot_table.shape[0] * self.pivot_table.shape[1]) * 100):.2f}%")
-        
-        # Fill NaN with 0 for similarity calculations
-        self.pivot_table_filled = self.pivot_table.fillna(0)
+        print(f"   Sparsity: {((n_cells - matrices.user_matrix.nnz) / n_cells * 100):.2f}%")
         
         return self
     
+    @profiled('visualize')
     def visualize_data(self):
         """Create visualizations"""
         print("\n" + "="*80)
@@ -274,52 +334,26 @@ class MovieRecommenderSystem:
         print(f"PEARSON CORRELATION RECOMMENDER")
         print("="*80)
         
-        # Create movie-user pivot table
-        movie_user_pivot = self.ratings.pivot_table(
-            index='movie_id',
-            columns='user_id',
-            values='rating'
-        )
-        
-        # Get movie ID from title
-        movie_id = self.movies[self.movies['title'] == movie_title]['movie_id'].values
-        
-        if len(movie_id) == 0:
-            print(f"❌ Movie '{movie_title}' not found!")
+        movie_idx = self._find_movie_index(movie_title)
+        if movie_idx is None:
             return None
         
-        movie_id = movie_id[0]
-        
-        # Get ratings for the target movie
-        target_movie_ratings = movie_user_pivot.loc[movie_id].dropna()
-        
-        # Calculate Pearson correlation with all other movies
-        correlations = []
-        
-        for other_movie_id in movie_user_pivot.index:
-            if other_movie_id == movie_id:
-                continue
-            
-            other_movie_ratings = movie_user_pivot.loc[other_movie_id].dropna()
-            
-            # Find common users
-            common_users = target_movie_ratings.index.intersection(other_movie_ratings.index)
-            
-            if len(common_users) > 2:  # Need at least 3 common users
-                corr, _ = pearsonr(
-                    target_movie_ratings[common_users],
-                    other_movie_ratings[common_users]
-                )
-                
-                if not np.isnan(corr):
-                    correlations.append({
-                        'movie_id': other_movie_id,
-                        'correlation': corr,
-                        'common_users': len(common_users)
-                    })
+        # Correlate the target movie's ratings with every movie at once,
+        # over the users who rated both (at least 3 common users)
+        movie_user = self._movie_user_csr()
+        target_ratings = movie_user[movie_idx].toarray()
+        correlation, common = corated_pearson(target_ratings, movie_user, min_common=3)
+        correlation, common = correlation[:, 0], common[:, 0]
+        
+        valid = ~np.isnan(correlation)
+        valid[movie_idx] = False
         
         # Sort by correlation
-        correlations_df = pd.DataFrame(correlations)
+        correlations_df = pd.DataFrame({
+            'movie_id': self.rating_matrices.movie_ids[valid],
+            'correlation': correlation[valid],
+            'common_users': common[valid].astype(int)
+        })
         correlations_df = correlations_df.sort_values('correlation', ascending=False)
         
         # Get top N recommendations
@@ -337,59 +371,65 @@ class MovieRecommenderSystem:
         
         return top_recommendations
     
-    def cosine_similarity_recommender(self, movie_title, top_n=5):
-        """Item-based recommender using Cosine Similarity with KNN"""
+    @profiled('user_neighbors')
+    def compute_user_neighbors(self, k=50, path='user_neighbors.npz', n_jobs=None):
+        """
+        Top-k cosine neighbors for every user, computed block by block
+        from the sparse user-movie matrix (never the dense users x users
+        matrix) and saved for reuse by the user-based recommender
+        """
+        print("📊 Calculating top-k user neighbors (blocked)...")
+        
+        index = self.rating_matrices
+        neighbors, scores = blocked_top_k_cosine(index.user_matrix, k=k, n_jobs=n_jobs)
+        self.user_neighbors = {'ids': index.user_ids, 'neighbors': neighbors, 'scores': scores}
+        
+        if path:
+            save_neighbors(path, index.user_ids, neighbors, scores)
+            print(f"   Saved {neighbors.shape[0]} x {neighbors.shape[1]} neighbor table to '{path}'")
+        
+        return self.user_neighbors
+    
+    def cosine_similarity_recommender(self, movie_title, top_n=5, user_neighbors=False,
+                                      n_user_neighbors=50, user_neighbors_path='user_neighbors.npz'):
+        """
+        Item-based recommender using Cosine Similarity with KNN
+
+        With user_neighbors=True the top-k user-user neighbor table is also
+        built (see compute_user_neighbors); it is not needed for the item
+        recommendations returned here.
+        """
         print("\n" + "="*80)
         print(f"COSINE SIMILARITY RECOMMENDER (KNN)")
         print("="*80)
         
-        # Create movie-user pivot table
-        movie_user_pivot = self.ratings.pivot_table(
-            index='movie_id',
-            columns='user_id',
-            values='rating'
-        ).fillna(0)
-        
-        # Calculate item similarity matrix
-        print("\n📊 Calculating item similarity matrix...")
-        self.item_similarity_matrix = cosine_similarity(movie_user_pivot)
+        # Calculate item similarity matrix (memoized with the rating matrices)
+        movie_user = self._movie_user_csr()
+        if self.item_similarity_matrix is None:
+            print("\n📊 Calculating item similarity matrix...")
+            self.item_similarity_matrix = cosine_similarity(movie_user)
         
         print(f"   Item similarity matrix shape: {self.item_similarity_matrix.shape}")
         
-        # Calculate user similarity matrix
-        print("📊 Calculating user similarity matrix...")
-        user_movie_pivot = self.ratings.pivot_table(
-            index='user_id',
-            columns='movie_id',
-            values='rating'
-        ).fillna(0)
-        
-        self.user_similarity_matrix = cosine_similarity(user_movie_pivot)
-        print(f"   User similarity matrix shape: {self.user_similarity_matrix.shape}")
-        
-        # Get movie ID from title
-        movie_id = self.movies[self.movies['title'] == movie_title]['movie_id'].values
-        
-        if len(movie_id) == 0:
-            print(f"❌ Movie '{movie_title}' not found!")
-            return None
-        
-        movie_id = movie_id[0]
+        # Optional top-k user neighbors (opt-in, bounded memory)
+        if user_neighbors:
+            self.compute_user_neighbors(k=n_user_neighbors, path=user_neighbors_path)
         
         # Find index of the movie
-        movie_idx = movie_user_pivot.index.get_loc(movie_id)
-        
-        # Get similarity scores
-        similarity_scores = list(enumerate(self.item_similarity_matrix[movie_idx]))
-        similarity_scores = sorted(similarity_scores, key=lambda x: x[1], reverse=True)
+        movie_idx = self._find_movie_index(movie_title)
+        if movie_idx is None:
+            return None
         
-        # Get top N (excluding the movie itself)
-        top_similar = similarity_scores[1:top_n+1]
+        # Get top N similarity scores (excluding the movie itself)
+        similarity_scores = self.item_similarity_matrix[movie_idx].copy()
+        similarity_scores[movie_idx] = -np.inf
+        top_similar = np.argsort(-similarity_scores, kind='stable')[:top_n]
         
         # Get movie details
         recommendations = []
-        for idx, score in top_similar:
-            movie_id_rec = movie_user_pivot.index[idx]
+        for idx in top_similar:
+            score = similarity_scores[idx]
+            movie_id_rec = self.rating_matrices.movie_ids[idx]
             movie_title_rec = self.movies[self.movies['movie_id'] == movie_id_rec]['title'].values[0]
             recommendations.append({
                 'title': movie_title_rec,
@@ -415,34 +455,19 @@ class MovieRecommenderSystem:
         print(f"K-NEAREST NEIGHBORS RECOMMENDER")
         print("="*80)
         
-        # Create movie-user pivot table
-        movie_user_pivot = self.ratings.pivot_table(
-            index='movie_id',
-            columns='user_id',
-            values='rating'
-        ).fillna(0)
-        
-        # Create CSR matrix for efficient computation
-        print("\n🔄 Creating CSR matrix...")
-        csr_data = csr_matrix(movie_user_pivot.values)
-        print(f"   CSR matrix shape: {csr_data.shape}")
+        # CSR matrix from the shared cache
+        csr_data = self._movie_user_csr()
+        print(f"\n🔄 CSR matrix shape: {csr_data.shape}")
         
         # Fit KNN model
         print("🤖 Fitting KNN model...")
         knn_model = NearestNeighbors(metric='cosine', algorithm='brute', n_neighbors=top_n+1)
         knn_model.fit(csr_data)
         
-        # Get movie ID from title
-        movie_id = self.movies[self.movies['title'] == movie_title]['movie_id'].values
-        
-        if len(movie_id) == 0:
-            print(f"❌ Movie '{movie_title}' not found!")
-            return None
-        
-        movie_id = movie_id[0]
-        
         # Find index of the movie
-        movie_idx = movie_user_pivot.index.get_loc(movie_id)
+        movie_idx = self._find_movie_index(movie_title)
+        if movie_idx is None:
+            return None
         
         # Find nearest neighbors
         distances, indices = knn_model.kneighbors(
@@ -453,7 +478,7 @@ class MovieRecommenderSystem:
         # Get recommendations (excluding the movie itself)
         recommendations = []
         for i in range(1, len(indices.flatten())):
-            movie_id_rec = movie_user_pivot.index[indices.flatten()[i]]
+            movie_id_rec = self.rating_matrices.movie_ids[indices.flatten()[i]]
             movie_title_rec = self.movies[self.movies['movie_id'] == movie_id_rec]['title'].values[0]
             recommendations.append({
                 'title': movie_title_rec,
@@ -474,6 +499,25 @@ class MovieRecommenderSystem:
         
         return recommendations_df
     
+    def startup_report(self, budget_s=None, stage_budgets=None):
+        """
+        Print the per-step timing and memory profile and check its budget
+
+        Parameters:
+        -----------
+        budget_s : Seconds allowed for everything profiled so far (None = no budget)
+        stage_budgets : {stage: seconds}, e.g. {'load_data': 10, 'pivot_table': 30}
+
+        Raises StartupBudgetExceeded when a budget is exceeded.
+        """
+        print("\n" + "="*80)
+        print("STARTUP PROFILE")
+        print("="*80)
+        self.startup.finish()
+        print(self.startup.format_table())
+        self.startup.enforce_budget(budget_s, stage_budgets)
+        return self.startup.report()
+    
     def answer_questions(self):
         """Answer the questionnaire"""
         print("\n" + "="*80)
@@ -530,6 +574,7 @@ def main():
      .create_pivot_table()
      .visualize_data()
      .answer_questions())
+    recommender.startup_report()
     
     # Test Pearson Correlation Recommender
     print("\n" + "🔵"*40)
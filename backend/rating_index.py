@@ -0,0 +1,120 @@
+"""
+RATING INDEX
+============
+Posting lists over the ratings in both directions:
+
+- movie -> sorted user codes and their ratings (CSC columns)
+- user  -> sorted movie codes and their ratings (CSR rows)
+
+Gathering the users of a few movies (or the movies of a few users) is then a
+concatenation of posting lists, so the cost scales with the postings touched
+rather than with the total number of ratings.
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class RatingIndex:
+    """
+    Inverted index over (user_id, movie_id, rating) triplets
+    """
+
+    def __init__(self, user_ids, movie_ids, ratings):
+        """
+        Build the index from raw id/rating arrays
+
+        Parameters:
+        -----------
+        user_ids, movie_ids : Raw ids, one entry per rating
+        ratings : Rating values
+        """
+        self.user_ids = np.unique(user_ids)
+        self.movie_ids = np.unique(movie_ids)
+
+        self.user_matrix = csr_matrix(
+            (
+                np.asarray(ratings, dtype=np.float32),
+                (np.searchsorted(self.user_ids, user_ids), np.searchsorted(self.movie_ids, movie_ids))
+            ),
+            shape=(len(self.user_ids), len(self.movie_ids))
+        )
+        self.user_matrix.sort_indices()
+        self.movie_matrix = self.user_matrix.tocsc()
+        self.movie_matrix.sort_indices()
+
+    @classmethod
+    def from_ratings(cls, ratings_df):
+        """Build from a DataFrame with columns [user_id, movie_id, rating]"""
+        return cls(
+            ratings_df['user_id'].values,
+            ratings_df['movie_id'].values,
+            ratings_df['rating'].values
+        )
+
+    @classmethod
+    def from_matrices(cls, user_ids, movie_ids, user_matrix, movie_matrix):
+        """Wrap prebuilt matrices (sorted ids, canonical CSR / CSC) without copying"""
+        index = cls.__new__(cls)
+        index.user_ids = user_ids
+        index.movie_ids = movie_ids
+        index.user_matrix = user_matrix
+        index.movie_matrix = movie_matrix
+        return index
+
+    @property
+    def shape(self):
+        return self.user_matrix.shape
+
+    def user_codes(self, user_ids):
+        """Row positions of raw user ids (-1 if unknown)"""
+        return self._codes(self.user_ids, user_ids)
+
+    def movie_codes(self, movie_ids):
+        """Column positions of raw movie ids (-1 if unknown)"""
+        return self._codes(self.movie_ids, movie_ids)
+
+    def users_for_movies(self, movie_codes):
+        """
+        Concatenate the posting lists of the given movies
+
+        Returns:
+        --------
+        (user_codes, movie_codes, ratings) : one entry per posting
+        """
+        return self._postings(self.movie_matrix, movie_codes, swap=True)
+
+    def movies_for_users(self, user_codes):
+        """
+        Concatenate the posting lists of the given users
+
+        Returns:
+        --------
+        (user_codes, movie_codes, ratings) : one entry per posting
+        """
+        return self._postings(self.user_matrix, user_codes, swap=False)
+
+    @staticmethod
+    def _codes(categories, ids):
+        ids = np.atleast_1d(np.asarray(ids))
+        if len(categories) == 0:
+            return np.full(len(ids), -1)
+        positions = np.minimum(np.searchsorted(categories, ids), len(categories) - 1)
+        return np.where(categories[positions] == ids, positions, -1)
+
+    @staticmethod
+    def _postings(compressed, keys, swap):
+        """Gather CSR rows / CSC columns `keys` as flat (key, other, value) arrays"""
+        keys = np.asarray(keys, dtype=np.int64)
+        starts = compressed.indptr[keys]
+        lengths = compressed.indptr[keys + 1] - starts
+
+        # Flat positions of every posting: start of its list + offset inside it
+        total = int(lengths.sum())
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions = np.repeat(starts, lengths) + offsets
+
+        owner = np.repeat(keys, lengths)
+        other = compressed.indices[positions]
+        values = compressed.data[positions]
+        return (other, owner, values) if swap else (owner, other, values)
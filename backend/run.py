@@ -23,7 +23,10 @@ if __name__ == '__main__':
         print("   GET  /api/movies?search=<query>&limit=<n>")
         print("   GET  /api/trending?limit=<n>")
         print("   POST /api/recommend")
+        print("   POST /api/recommend/user")
         print("   GET  /api/stats")
+        print("   GET  /api/metrics")
+        print("   GET  /api/debug/startup")
         print("="*50)
         print("Logs are being written to:")
         print("   - backend/logs/api.log")
@@ -0,0 +1,151 @@
+"""
+COMPACT DATA SCHEMA
+===================
+Explicit dtypes for the MovieLens frames, applied right after loading:
+
+- ids as int32, ratings as float32 (MovieLens 10M and later have half
+  stars), timestamps as uint32
+- low-cardinality strings (genres, gender) and small integer codes
+  (age, occupation) as pandas categoricals
+- genres additionally as one uint32 bitmask per movie, so genre filters
+  are a bitwise AND over an array
+"""
+
+import numpy as np
+import pandas as pd
+
+
+RATINGS_SCHEMA = {
+    'user_id': 'int32',
+    'movie_id': 'int32',
+    'rating': 'float32',
+    'timestamp': 'uint32',
+}
+
+MOVIES_SCHEMA = {
+    'movie_id': 'int32',
+    'genres': 'category',
+}
+
+USERS_SCHEMA = {
+    'user_id': 'int32',
+    'gender': 'category',
+    'age': 'category',
+    'occupation': 'category',
+}
+
+SCHEMAS = {
+    'ratings': RATINGS_SCHEMA,
+    'movies': MOVIES_SCHEMA,
+    'users': USERS_SCHEMA,
+}
+
+
+def apply_schema(df, schema):
+    """Cast the columns of `df` that appear in `schema`"""
+    return df.astype({column: dtype for column, dtype in schema.items() if column in df.columns})
+
+
+def memory_mb(df):
+    """Deep memory footprint of a frame in MB (object strings included)"""
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def compact_frames(**frames):
+    """
+    Apply the schema named by each keyword to its frame
+
+    Example:
+    --------
+    frames, report = compact_frames(ratings=ratings_df, movies=movies_df)
+
+    Returns:
+    --------
+    (frames, report) : dict of compacted frames, and a DataFrame indexed by
+    frame name with before_mb, after_mb and saved_pct
+    """
+    compacted = {}
+    rows = []
+    for name, df in frames.items():
+        before = memory_mb(df)
+        compacted[name] = apply_schema(df, SCHEMAS[name])
+        after = memory_mb(compacted[name])
+        rows.append({
+            'frame': name,
+            'before_mb': before,
+            'after_mb': after,
+            'saved_pct': (1 - after / before) * 100 if before else 0.0
+        })
+
+    return compacted, pd.DataFrame(rows).set_index('frame')
+
+
+def categorical_merge(left, right, on, columns=()):
+    """
+    Merge `right` into `left`, carrying the listed string columns of `right`
+    as categoricals so each value is stored once instead of once per row
+    """
+    right = right.astype({column: 'category' for column in columns})
+    merged = left.merge(right, on=on)
+    for column in merged.select_dtypes('category').columns:
+        merged[column] = merged[column].cat.remove_unused_categories()
+    return merged
+
+
+def genre_bitmask(genres, vocabulary=None):
+    """
+    One uint32 bitmask per movie from 'A|B|C' genre strings
+
+    Parameters:
+    -----------
+    genres : Series of pipe-separated genre strings
+    vocabulary : Genre names in bit order (default: sorted names found)
+
+    Returns:
+    --------
+    (masks, vocabulary) : uint32 array aligned with `genres`, list of names
+    """
+    genres = pd.Series(genres).astype(str)
+    indicators = genres.str.get_dummies(sep='|')
+    if vocabulary is None:
+        vocabulary = sorted(indicators.columns)
+    if len(vocabulary) > 32:
+        raise ValueError(f"{len(vocabulary)} genres do not fit in a uint32 bitmask")
+
+    indicators = indicators.reindex(columns=vocabulary, fill_value=0).values.astype(np.uint32)
+    masks = indicators @ (np.uint32(1) << np.arange(len(vocabulary), dtype=np.uint32))
+    return masks.astype(np.uint32), list(vocabulary)
+
+
+def genre_bits(names, vocabulary):
+    """
+    OR of the bits of the given genre names (case-insensitive)
+
+    names may be a comma-separated string or a list of strings; anything else
+    and unknown names raise ValueError
+    """
+    if isinstance(names, str):
+        names = names.split(',')
+    elif not isinstance(names, (list, tuple)) or not all(isinstance(name, str) for name in names):
+        raise ValueError("genre filters must be a genre name, a comma-separated string or a list of names")
+    lookup = {genre.lower(): bit for bit, genre in enumerate(vocabulary)}
+
+    bits = np.uint32(0)
+    for name in names:
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in lookup:
+            raise ValueError(f"Unknown genre '{name}'. Known genres: {', '.join(vocabulary)}")
+        bits |= np.uint32(1) << np.uint32(lookup[name])
+    return bits
+
+
+def genre_filter(masks, include=0, exclude=0):
+    """Boolean mask: movies with any of the `include` bits and none of the `exclude` bits"""
+    allowed = np.ones(len(masks), dtype=bool)
+    if include:
+        allowed &= (masks & include) != 0
+    if exclude:
+        allowed &= (masks & exclude) == 0
+    return allowed
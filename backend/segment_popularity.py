@@ -0,0 +1,199 @@
+"""
+SEGMENT POPULARITY
+==================
+Per-movie rating counts and rating sums for every demographic segment of
+users.dat (gender x age bucket x occupation), for visitors with no history.
+
+Each dimension gets one extra "any" slot, so the cube
+
+    counts[gender, age, occupation, movie]
+
+also holds every roll-up (e.g. women of any age and occupation, or everyone).
+The cube is one np.bincount over encoded (segment, movie) ids followed by
+three axis sums. Segment mean ratings are shrunk toward the movie's mean over
+all users:
+
+    (rating_sum + k * movie_mean) / (count + k)
+
+The top movies of every segment are precomputed, so a default lookup is a
+slice.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ('gender', 'age', 'occupation')
+MAX_AGE = 120
+
+
+class SegmentPopularity:
+    """
+    Popularity and shrunk mean rating per (gender, age, occupation) segment
+    """
+
+    def __init__(self, ratings_df, users_df, movie_ids, shrinkage=20.0, min_ratings=5, top_k=100):
+        """
+        Initialize Segment Popularity
+
+        Parameters:
+        -----------
+        ratings_df : DataFrame with columns [user_id, movie_id, rating]
+        users_df : DataFrame with columns [user_id, gender, age, occupation]
+        movie_ids : Catalog movie ids; every per-movie array follows this order
+        shrinkage : Pseudo-count k pulling segment means toward the movie mean
+        min_ratings : Segment ratings needed to rank by mean rating
+        top_k : Movies precomputed per segment and order
+        """
+        self.ratings = ratings_df
+        self.users = users_df
+        self.movie_ids = np.asarray(movie_ids)
+        self.shrinkage = shrinkage
+        self.min_ratings = min_ratings
+        self.top_k = top_k
+        self.vocabularies = {}
+        self.counts = None
+        self.means = None
+        self.top_popular = None
+        self.top_rated = None
+        self.fit_time = None
+
+    def _user_segments(self):
+        """(user_ids, codes per dimension) with codes into self.vocabularies"""
+        codes = []
+        for dimension in DIMENSIONS:
+            values = self.users[dimension].astype('category')
+            self.vocabularies[dimension] = list(values.cat.categories)
+            codes.append(values.cat.codes.values.astype(np.int64))
+        return self.users['user_id'].values, codes
+
+    def fit(self):
+        """Build the count and mean cubes and the per-segment top lists"""
+        start_time = time.perf_counter()
+        n_movies = len(self.movie_ids)
+
+        user_ids, codes = self._user_segments()
+        shape = tuple(len(self.vocabularies[dimension]) for dimension in DIMENSIONS)
+
+        # Encoded segment of every rating (users missing from users.dat are dropped)
+        segment_of_user = pd.Series(np.ravel_multi_index(codes, shape), index=user_ids)
+        segments = segment_of_user.reindex(self.ratings['user_id'].values).values
+        sorter = np.argsort(self.movie_ids, kind='stable')
+        positions = np.minimum(np.searchsorted(self.movie_ids, self.ratings['movie_id'].values, sorter=sorter), n_movies - 1)
+        movie_codes = sorter[positions]
+        known = ~np.isnan(segments) & (self.movie_ids[movie_codes] == self.ratings['movie_id'].values)
+
+        cell = segments[known].astype(np.int64) * n_movies + movie_codes[known]
+        size = int(np.prod(shape)) * n_movies
+        base_counts = np.bincount(cell, minlength=size).reshape(*shape, n_movies)
+        base_sums = np.bincount(cell, weights=self.ratings['rating'].values[known], minlength=size).reshape(*shape, n_movies)
+
+        # Last slot of every dimension is the roll-up over that dimension
+        counts = np.zeros(tuple(n + 1 for n in shape) + (n_movies,), dtype=np.float64)
+        sums = np.zeros_like(counts)
+        counts[:shape[0], :shape[1], :shape[2]] = base_counts
+        sums[:shape[0], :shape[1], :shape[2]] = base_sums
+        for axis, n in enumerate(shape):
+            rollup = (slice(None),) * axis + (n,)
+            counts[rollup] = counts[(slice(None),) * axis + (slice(0, n),)].sum(axis=axis)
+            sums[rollup] = sums[(slice(None),) * axis + (slice(0, n),)].sum(axis=axis)
+
+        overall_counts, overall_sums = counts[-1, -1, -1], sums[-1, -1, -1]
+        global_mean = overall_sums.sum() / max(overall_counts.sum(), 1)
+        movie_means = np.where(overall_counts > 0, overall_sums / np.maximum(overall_counts, 1), global_mean)
+
+        self.means = ((sums + self.shrinkage * movie_means) / (counts + self.shrinkage)).astype(np.float32)
+        self.counts = counts.astype(np.int32)
+
+        n_segments = int(np.prod(self.counts.shape[:3]))
+        flat_counts = self.counts.reshape(n_segments, n_movies)
+        flat_means = self.means.reshape(n_segments, n_movies)
+        self.top_popular = self._top_rows(flat_counts.astype(np.float32), flat_counts > 0)
+        self.top_rated = self._top_rows(flat_means, flat_counts >= self.min_ratings)
+
+        self.fit_time = time.perf_counter() - start_time
+        return self
+
+    def _top_rows(self, scores, eligible):
+        """(segments x top_k) movie positions per row, best first, -1 padded"""
+        k = min(self.top_k, scores.shape[1])
+        scores = np.where(eligible, scores, -np.inf)
+        # Catalog order inside the partition, so ties stay in catalog order
+        top = np.sort(np.argpartition(-scores, k - 1, axis=1)[:, :k], axis=1)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1).astype(np.int32)
+        top[~np.isfinite(np.take_along_axis(top_scores, order, axis=1))] = -1
+        return top
+
+    @property
+    def memory_mb(self):
+        """Size of the cubes and top lists in MB"""
+        return sum(array.nbytes for array in (self.counts, self.means, self.top_popular, self.top_rated)) / 2 ** 20
+
+    def segment(self, gender=None, age=None, occupation=None):
+        """
+        Cube coordinates of a segment; None means any value of that dimension
+
+        Ages in 0..MAX_AGE are mapped to their users.dat bucket (e.g. 30 -> 25).
+        Other ages and unknown values raise ValueError.
+        """
+        coordinates = []
+        for dimension, value in zip(DIMENSIONS, (gender, age, occupation)):
+            vocabulary = self.vocabularies[dimension]
+            if value is None or value == '':
+                coordinates.append(len(vocabulary))
+                continue
+            if dimension == 'gender':
+                value = str(value).upper()
+            else:
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"Invalid {dimension}: {value!r}")
+            if dimension == 'age':
+                if not 0 <= value <= MAX_AGE:
+                    raise ValueError(f"Invalid age: {value!r} (expected 0-{MAX_AGE})")
+                buckets = np.asarray(vocabulary)
+                value = buckets[max(np.searchsorted(buckets, value, side='right') - 1, 0)]
+            if value not in vocabulary:
+                raise ValueError(f"Unknown {dimension}: {value!r} (known: {', '.join(map(str, vocabulary))})")
+            coordinates.append(vocabulary.index(value))
+        return tuple(coordinates)
+
+    def top(self, segment, limit=10, sort='popular', min_ratings=None, allowed=None):
+        """
+        Top movies of a segment
+
+        Parameters:
+        -----------
+        segment : Coordinates from segment()
+        limit : Number of movies
+        sort : 'popular' (segment rating count) or 'rating' (shrunk segment mean)
+        min_ratings : Minimum segment ratings (default: 1 for 'popular', min_ratings for 'rating')
+        allowed : Optional boolean mask over movie_ids (e.g. a genre filter)
+
+        Returns:
+        --------
+        (positions, counts, means) for the movies, best first
+        """
+        if sort not in ('popular', 'rating'):
+            raise ValueError(f"Invalid sort: {sort!r} (use 'popular' or 'rating')")
+        default_min = 1 if sort == 'popular' else self.min_ratings
+        counts, means = self.counts[segment], self.means[segment]
+
+        if allowed is None and limit <= self.top_k and min_ratings in (None, default_min):
+            # Precomputed list: a slice
+            row = np.ravel_multi_index(segment, self.counts.shape[:3])
+            positions = (self.top_popular if sort == 'popular' else self.top_rated)[row][:limit]
+            positions = positions[positions >= 0]
+            return positions, counts[positions], means[positions]
+
+        eligible = counts >= max(default_min if min_ratings is None else min_ratings, 1)
+        if allowed is not None:
+            eligible &= allowed
+        positions = np.flatnonzero(eligible)
+        scores = counts[positions] if sort == 'popular' else means[positions]
+        positions = positions[np.argsort(-scores, kind='stable')][:limit]
+        return positions, counts[positions], means[positions]
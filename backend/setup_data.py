@@ -71,44 +71,23 @@ def verify_data_format():
     print("="*80)
     
     try:
-        import pandas as pd
+        from data_loader import RATINGS_COLUMNS, read_dat, read_movies, read_users
         
         # Try to load ratings
         print("\n🔍 Checking ratings.dat...")
-        ratings = pd.read_csv(
-            './data/ratings.dat',
-            sep='::',
-            engine='python',
-            names=['user_id', 'movie_id', 'rating', 'timestamp'],
-            encoding='ISO-8859-1',
-            nrows=10
-        )
+        ratings = read_dat('./data/ratings.dat', RATINGS_COLUMNS, nrows=10)
         print(f"   ✅ Format OK - Sample shape: {ratings.shape}")
         print(f"   Columns: {list(ratings.columns)}")
         
         # Try to load movies
         print("\n🔍 Checking movies.dat...")
-        movies = pd.read_csv(
-            './data/movies.dat',
-            sep='::',
-            engine='python',
-            names=['movie_id', 'title', 'genres'],
-            encoding='ISO-8859-1',
-            nrows=10
-        )
+        movies = read_movies('./data/movies.dat', nrows=10)
         print(f"   ✅ Format OK - Sample shape: {movies.shape}")
         print(f"   Columns: {list(movies.columns)}")
         
         # Try to load users
         print("\n🔍 Checking users.dat...")
-        users = pd.read_csv(
-            './data/users.dat',
-            sep='::',
-            engine='python',
-            names=['user_id', 'gender', 'age', 'occupation', 'zip_code'],
-            encoding='ISO-8859-1',
-            nrows=10
-        )
+        users = read_users('./data/users.dat', nrows=10)
         print(f"   ✅ Format OK - Sample shape: {users.shape}")
         print(f"   Columns: {list(users.columns)}")
         
@@ -0,0 +1,268 @@
+"""
+VECTORIZED SIMILARITY KERNELS
+=============================
+Cosine and co-rated Pearson similarity computed with matrix products instead
+of per-pair Python loops. Rating matrices use 0 for "not rated".
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.sparse import csr_matrix, diags, issparse
+
+
+def _binary(matrix):
+    """0/1 indicator of rated entries, keeping sparse inputs sparse"""
+    if issparse(matrix):
+        binary = matrix.copy()
+        binary.data = np.ones_like(binary.data)
+        return binary
+    return (matrix != 0).astype(matrix.dtype)
+
+
+def _square(matrix):
+    return matrix.multiply(matrix).tocsr() if issparse(matrix) else matrix * matrix
+
+
+def _dense(product):
+    return product.toarray() if issparse(product) else np.asarray(product)
+
+
+def corated_pearson(queries, matrix, min_common=2):
+    """
+    Pearson correlation between each row of `queries` and each row of
+    `matrix`, using only the columns rated in both rows.
+
+    Parameters:
+    -----------
+    queries : Dense (q x n) array of query rating vectors
+    matrix : Dense or sparse (m x n) rating matrix
+    min_common : Pairs with fewer co-rated columns get NaN
+
+    Returns:
+    --------
+    (correlation, common) : two dense (m x q) arrays
+    """
+    queries = np.atleast_2d(queries)
+    queries_binary = _binary(queries).T
+    queries_values = queries.T
+    queries_squared = _square(queries).T
+
+    matrix_binary = _binary(matrix)
+
+    # Sufficient statistics over co-rated columns, one product each
+    common = _dense(matrix_binary @ queries_binary)
+    sum_x = _dense(matrix @ queries_binary)
+    sum_y = _dense(matrix_binary @ queries_values)
+    sum_xx = _dense(_square(matrix) @ queries_binary)
+    sum_yy = _dense(matrix_binary @ queries_squared)
+    sum_xy = _dense(matrix @ queries_values)
+
+    numerator = common * sum_xy - sum_x * sum_y
+    denominator = np.sqrt(
+        np.clip(common * sum_xx - sum_x ** 2, 0, None)
+        * np.clip(common * sum_yy - sum_y ** 2, 0, None)
+    )
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = numerator / denominator
+    correlation[(common < min_common) | (denominator <= 0)] = np.nan
+
+    return correlation, common
+
+
+def cosine_columns(matrix, dtype=np.float32):
+    """Dense column-column cosine similarity of a (rows x columns) matrix"""
+    dense = _dense(matrix).astype(dtype, copy=False)
+    norms = np.linalg.norm(dense, axis=0)
+    norms[norms == 0] = 1
+    normalized = dense / norms
+    return normalized.T @ normalized
+
+
+def keep_top_k(similarity, k):
+    """Zero all but the k largest entries of every column"""
+    if k is None or k >= similarity.shape[0]:
+        return similarity
+    cutoff = np.argpartition(-similarity, k, axis=0)[k:]
+    truncated = similarity.copy()
+    np.put_along_axis(truncated, cutoff, 0, axis=0)
+    return truncated
+
+
+def grouped_pearson(groups, x, y, n_groups, min_common=2):
+    """
+    Pearson correlation of paired values (x, y) within each group
+
+    Used on gathered posting lists: `groups` is the candidate each co-rated
+    pair belongs to, so the cost is linear in the number of pairs.
+
+    Returns:
+    --------
+    (correlation, common) : arrays of length n_groups
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    common = np.bincount(groups, minlength=n_groups)
+    sum_x = np.bincount(groups, x, n_groups)
+    sum_y = np.bincount(groups, y, n_groups)
+    sum_xx = np.bincount(groups, x * x, n_groups)
+    sum_yy = np.bincount(groups, y * y, n_groups)
+    sum_xy = np.bincount(groups, x * y, n_groups)
+
+    numerator = common * sum_xy - sum_x * sum_y
+    denominator = np.sqrt(
+        np.clip(common * sum_xx - sum_x ** 2, 0, None)
+        * np.clip(common * sum_yy - sum_y ** 2, 0, None)
+    )
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = numerator / denominator
+    correlation[(common < min_common) | (denominator <= 0)] = np.nan
+
+    return correlation, common
+
+
+def blocked_top_k_cosine(matrix, k=50, block_size=None, memory_mb=48, n_jobs=None):
+    """
+    Top-k cosine neighbors of every row of a sparse matrix, without ever
+    materializing the full (rows x rows) similarity matrix.
+
+    Rows are processed in blocks: each block's similarities to all rows are
+    computed as a dense float32 slab, reduced to its top k with argpartition
+    and discarded. Blocks run on a thread pool; memory_mb is shared by the
+    slabs in flight; peak usage stays within about 5x that (sparse product,
+    dense slab, int64 partition indices) plus the (n_rows x k) result.
+    Slabs that are mostly zero are ranked from their non-zero entries only.
+
+    Parameters:
+    -----------
+    matrix : Sparse (rows x columns) matrix, e.g. users x movies
+    k : Neighbors kept per row (the row itself is excluded)
+    block_size : Rows per block (default: sized from memory_mb)
+    memory_mb : Budget for all concurrent similarity slabs
+    n_jobs : Worker threads (default: all cores)
+
+    Returns:
+    --------
+    (neighbors, scores) : (n_rows x k) int32 row indices and float32 scores,
+    sorted by decreasing similarity; rows with fewer than k similar rows
+    are padded with index -1 and score 0
+    """
+    matrix = csr_matrix(matrix, dtype=np.float32)
+    n_rows = matrix.shape[0]
+    k = max(0, min(k, n_rows - 1))
+    if k == 0:
+        # A single row (or k=0) has no neighbors to rank
+        return (np.full((n_rows, 0), -1, dtype=np.int32),
+                np.zeros((n_rows, 0), dtype=np.float32))
+    n_jobs = n_jobs or os.cpu_count()
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    normalized = csr_matrix(diags(1 / norms).astype(np.float32) @ matrix)
+    normalized_t = normalized.T.tocsc()
+
+    if block_size is None:
+        block_size = max(1, int(memory_mb * 2 ** 20 // (4 * n_rows * n_jobs)))
+
+    neighbors = np.full((n_rows, k), -1, dtype=np.int32)
+    scores = np.zeros((n_rows, k), dtype=np.float32)
+
+    def run_block(start):
+        stop = min(start + block_size, n_rows)
+        product = normalized[start:stop] @ normalized_t
+
+        if product.nnz * 8 < (stop - start) * n_rows:
+            # Mostly empty slab: rank only the non-zero similarities
+            product = product.tocoo()
+            not_self = product.row + start != product.col
+            rows, cols, values = product.row[not_self], product.col[not_self], product.data[not_self]
+
+            order = np.lexsort((-values, rows))
+            rows, cols, values = rows[order], cols[order], values[order]
+            starts = np.searchsorted(rows, np.arange(stop - start))
+            rank = np.arange(len(rows)) - starts[rows]
+            keep = rank < k
+            neighbors[start + rows[keep], rank[keep]] = cols[keep]
+            scores[start + rows[keep], rank[keep]] = values[keep]
+            return
+
+        block = product.toarray()
+        del product
+        block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+
+        top = np.argpartition(block, n_rows - k, axis=1)[:, n_rows - k:]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        # Rows with fewer than k similar rows: pad with -1 / 0
+        top[top_scores <= 0] = -1
+        neighbors[start:stop] = top
+        scores[start:stop] = np.maximum(top_scores, 0)
+
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        list(executor.map(run_block, range(0, n_rows, block_size)))
+
+    return neighbors, scores
+
+
+def save_neighbors(path, ids, neighbors, scores):
+    """Persist a top-k neighbor table keyed by the raw ids of its rows"""
+    np.savez(path, ids=ids, neighbors=neighbors, scores=scores)
+
+
+def load_neighbors(path):
+    """Load a table written by save_neighbors as a dict of arrays"""
+    with np.load(path) as data:
+        return {name: data[name] for name in ('ids', 'neighbors', 'scores')}
+
+
+def mmr_rerank(relevance, similarity, top_n, diversity=0.3):
+    """
+    Maximal Marginal Relevance selection
+
+    Greedily picks the item maximizing
+        (1 - diversity) * relevance - diversity * max similarity to the picked items,
+    keeping the max-similarity vector up to date with one row update per pick,
+    so only top_n similarity rows are ever read.
+
+    Parameters:
+    -----------
+    relevance : (n,) candidate relevance scores
+    similarity : (n x n) candidate-candidate similarity, or a callable
+                 returning the (n,) similarity row of a candidate position
+    top_n : Items to select
+    diversity : 0 = pure relevance order, 1 = pure novelty
+
+    Returns:
+    --------
+    Selected candidate positions, in pick order
+    """
+    relevance = np.asarray(relevance, dtype=np.float32)
+    n = len(relevance)
+    top_n = min(top_n, n)
+    if diversity <= 0 or top_n <= 1:
+        return np.argsort(-relevance, kind='stable')[:top_n]
+
+    row = similarity if callable(similarity) else similarity.__getitem__
+    # Picked items get -inf relevance, so they can never win again
+    weighted = (1 - diversity) * relevance
+    marginal = np.empty(n, dtype=np.float32)
+    selected = np.empty(top_n, dtype=np.intp)
+
+    pick = int(np.argmax(weighted))
+    penalty = np.array(diversity * row(pick), dtype=np.float32)
+    for i in range(top_n):
+        selected[i] = pick
+        weighted[pick] = -np.inf
+        if i:
+            np.maximum(penalty, diversity * row(pick), out=penalty)
+        np.subtract(weighted, penalty, out=marginal)
+        pick = int(np.argmax(marginal))
+
+    return selected
@@ -0,0 +1,205 @@
+"""
+STARTUP PROFILE
+===============
+Per-stage wall time, CPU time and memory of a load / build sequence, shared
+by DataService.load_data (the API) and MovieRecommenderSystem (the offline
+pipeline):
+
+    profile = StartupProfile('DataService')
+    with profile.stage('ratings'):
+        ...
+    profile.finish()
+    print(profile.format_table())
+    profile.enforce_budget(total_s=60, stage_budgets={'similarity': 20})
+
+Every stage records wall time (perf_counter), process CPU time (all threads,
+so CPU > wall means parallel work), resident memory after the stage and its
+delta, and optionally (trace_memory=True) the tracemalloc delta and peak of
+the stage. tracemalloc slows allocations down noticeably, so it is off unless
+asked for and stopped again by finish(). Stages can be nested; totals run
+from the creation of the profile to finish().
+"""
+
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+
+
+class StartupBudgetExceeded(RuntimeError):
+    """Startup (or one of its stages) took longer than its configured budget"""
+
+
+def resident_bytes():
+    """Current resident set size (Linux /proc; peak RSS elsewhere)"""
+    try:
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return peak_resident_bytes()
+
+
+def peak_resident_bytes():
+    """Peak resident set size (ru_maxrss is in KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def profiled(name):
+    """Method decorator: run the method as a stage of the instance's `startup` profile"""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.startup.stage(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class StartupProfile:
+    """
+    Timing and memory per named stage of a startup sequence
+    """
+
+    def __init__(self, name, trace_memory=False):
+        """
+        Initialize Startup Profile
+
+        Parameters:
+        -----------
+        name : What is being started (shown in reports)
+        trace_memory : Also record tracemalloc deltas and peaks per stage
+        """
+        self.name = name
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.budget = None
+        self._active = []
+        self._started_tracing = False
+        self.finished = False
+        self.start_time = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.start_rss = resident_bytes()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Profile a with-block as one stage; yields its record, filled on exit
+
+        Nested stages are named 'outer/inner'.
+        """
+        record = {'stage': '/'.join([entry['stage'] for entry in self._active] + [name]),
+                  'depth': len(self._active)}
+        self.stages.append(record)
+        self._active.append({'stage': name, 'child_peak': 0})
+        rss_before = resident_bytes()
+        traced_before = 0
+        if self.trace_memory:
+            traced_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start_time, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            wall_s, cpu_s = time.perf_counter() - start_time, time.process_time() - start_cpu
+            rss_after = resident_bytes()
+            entry = self._active.pop()
+            record.update({
+                'wallS': wall_s,
+                'cpuS': cpu_s,
+                'rssMb': rss_after / 2 ** 20,
+                'rssDeltaMb': (rss_after - rss_before) / 2 ** 20
+            })
+            if self.trace_memory:
+                traced, peak = tracemalloc.get_traced_memory()
+                # A nested stage reset the peak: keep the larger of both
+                peak = max(peak, entry['child_peak'])
+                if self._active:
+                    self._active[-1]['child_peak'] = max(self._active[-1]['child_peak'], peak)
+                record.update({
+                    'tracedDeltaMb': (traced - traced_before) / 2 ** 20,
+                    'tracedPeakMb': (peak - traced_before) / 2 ** 20
+                })
+
+    def finish(self):
+        """Close the profile (totals, peak RSS) and stop tracemalloc if it was started here"""
+        self.total_wall_s = time.perf_counter() - self.start_time
+        self.total_cpu_s = time.process_time() - self.start_cpu
+        self.end_rss = resident_bytes()
+        self.peak_rss = peak_resident_bytes()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self.finished = True
+        return self
+
+    def check_budget(self, total_s=None, stage_budgets=None):
+        """
+        Compare wall times with their budgets (seconds; None or 0 = no budget)
+
+        Returns:
+        --------
+        List of violation messages (empty when within budget)
+        """
+        stage_budgets = stage_budgets or {}
+        violations = []
+        if total_s and self.total_wall_s > total_s:
+            violations.append(f"total {self.total_wall_s:.2f}s > budget {total_s:g}s")
+        for record in self.stages:
+            budget = stage_budgets.get(record['stage'])
+            if budget and record['wallS'] > budget:
+                violations.append(f"{record['stage']} {record['wallS']:.2f}s > budget {budget:g}s")
+        self.budget = {'totalS': total_s or None, 'stages': stage_budgets, 'violations': violations}
+        return violations
+
+    def enforce_budget(self, total_s=None, stage_budgets=None):
+        """check_budget, raising StartupBudgetExceeded on any violation"""
+        violations = self.check_budget(total_s, stage_budgets)
+        if violations:
+            raise StartupBudgetExceeded(f"{self.name} startup over budget: " + '; '.join(violations))
+
+    def report(self):
+        """JSON-serializable summary of the profile"""
+        report = {
+            'name': self.name,
+            'finished': self.finished,
+            'traceMemory': self.trace_memory,
+            'rssStartMb': self.start_rss / 2 ** 20,
+            'stages': self.stages,
+            'budget': self.budget
+        }
+        if self.finished:
+            report.update({
+                'totalWallS': self.total_wall_s,
+                'totalCpuS': self.total_cpu_s,
+                'rssEndMb': self.end_rss / 2 ** 20,
+                'peakRssMb': self.peak_rss / 2 ** 20
+            })
+        return report
+
+    def format_table(self):
+        """Stages as an aligned text table (one line per stage, then totals)"""
+        traced = f" {'traced MB':>10} {'peak MB':>9}" if self.trace_memory else ''
+        lines = [f"{self.name} startup profile",
+                 f"{'stage':<32} {'wall s':>8} {'cpu s':>8} {'rss MB':>9} {'+rss MB':>9}{traced}"]
+        for record in self.stages:
+            name = '  ' * record['depth'] + record['stage'].rsplit('/', 1)[-1]
+            if 'wallS' not in record:
+                lines.append(f"{name:<32} (running)")
+                continue
+            line = (f"{name:<32} {record['wallS']:>8.3f} {record['cpuS']:>8.3f} "
+                    f"{record['rssMb']:>9.1f} {record['rssDeltaMb']:>+9.1f}")
+            if self.trace_memory:
+                line += f" {record['tracedDeltaMb']:>+10.1f} {record['tracedPeakMb']:>9.1f}"
+            lines.append(line)
+        if self.finished:
+            lines.append(f"{'total':<32} {self.total_wall_s:>8.3f} {self.total_cpu_s:>8.3f} "
+                         f"{self.end_rss / 2 ** 20:>9.1f} {(self.end_rss - self.start_rss) / 2 ** 20:>+9.1f}"
+                         f"   (peak RSS {self.peak_rss / 2 ** 20:.1f} MB)")
+        return '\n'.join(lines)
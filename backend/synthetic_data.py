@@ -0,0 +1,281 @@
+"""
+SYNTHETIC MOVIELENS DATA
+========================
+Writes ratings.dat, movies.dat and users.dat in the '::' format of ./data/
+(header row included), shaped like MovieLens and seeded for reproducibility:
+
+- item popularity follows a power law (Zipf over a random movie order)
+- user activity is skewed (log-normal ratings per user, at least 20 each)
+- every user has a favorite genre: part of their ratings are drawn from that
+  genre's movies, and movies of that genre get a rating bonus
+- ratings = movie quality + user bias + genre bonus + noise, rounded to 1-5
+- timestamps: users sign up over the period (more early on) and rate in
+  bursts after signing up; output is ordered by user like ratings.dat
+- genres, gender, age and occupation frequencies follow the bundled files
+
+Ratings are generated and written one block of users at a time, so memory
+does not grow with the number of ratings (100k up to 100M).
+
+Run from the backend folder:
+    python synthetic_data.py --ratings 25000000 --output ./data/synthetic_25m/
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+GENRES = {
+    'Drama': 1603, 'Comedy': 1200, 'Action': 503, 'Thriller': 492, 'Romance': 471,
+    'Horror': 343, 'Adventure': 283, 'Sci-Fi': 276, "Children's": 251, 'Crime': 211,
+    'War': 143, 'Documentary': 127, 'Musical': 114, 'Mystery': 106, 'Animation': 105,
+    'Fantasy': 68, 'Western': 68, 'Film-Noir': 44,
+}
+GENRES_PER_MOVIE = {1: 2025, 2: 1322, 3: 421, 4: 100, 5: 14}
+AGES = {1: 0.037, 18: 0.183, 25: 0.347, 35: 0.198, 45: 0.091, 50: 0.082, 56: 0.063}
+OCCUPATIONS = [0.118, 0.087, 0.044, 0.029, 0.126, 0.019, 0.039, 0.112, 0.003, 0.015, 0.032,
+               0.021, 0.064, 0.024, 0.050, 0.024, 0.040, 0.083, 0.012, 0.012, 0.047]
+TITLE_WORDS = [
+    'Night', 'Love', 'Last', 'Dark', 'Man', 'Story', 'City', 'Blood', 'Day', 'Dead', 'Girl',
+    'Heart', 'King', 'Star', 'Return', 'House', 'Time', 'Secret', 'Lost', 'American', 'Wild',
+    'Life', 'Big', 'Little', 'Road', 'Island', 'Summer', 'Black', 'Red', 'Moon', 'War', 'Game',
+    'Dream', 'River', 'Fire', 'Ghost', 'Street', 'Angel', 'Shadow', 'Storm',
+]
+
+MOVIES_HEADER = 'Movie ID::Title::Genres'
+USERS_HEADER = 'UserID::Gender::Age::Occupation::Zip-code'
+RATINGS_HEADER = 'UserID::MovieID::Rating::Timestamp'
+
+
+def default_shape(n_ratings):
+    """(n_users, n_movies) scaled from MovieLens-1M (6,040 users, 3,883 movies per 1M ratings)"""
+    n_users = max(100, int(round(n_ratings / 1_000_000 * 6040)))
+    n_movies = max(100, int(round(3883 * np.sqrt(n_ratings / 1_000_000))))
+    return n_users, n_movies
+
+
+def make_movies(rng, n_movies):
+    """movies DataFrame [movie_id, title, genres] and its (movies x genres) boolean matrix"""
+    names = list(GENRES)
+    genre_p = np.array(list(GENRES.values()), dtype=float)
+    genre_p /= genre_p.sum()
+    count_p = np.array(list(GENRES_PER_MOVIE.values()), dtype=float)
+    n_genres = rng.choice(list(GENRES_PER_MOVIE), size=n_movies, p=count_p / count_p.sum())
+
+    membership = np.zeros((n_movies, len(names)), dtype=bool)
+    for movie, k in enumerate(n_genres):
+        membership[movie, rng.choice(len(names), size=k, replace=False, p=genre_p)] = True
+
+    # Release years skewed toward the 1990s, like the bundled catalog
+    years = np.clip(np.round(2000 - rng.gamma(1.2, 12.0, n_movies)), 1919, 2000).astype(int)
+    words = rng.choice(TITLE_WORDS, size=(n_movies, 2))
+    titles = [f"{first} {second} {movie_id} ({year})"
+              for movie_id, ((first, second), year) in enumerate(zip(words, years), start=1)]
+    genres = ['|'.join(names[g] for g in np.flatnonzero(row)) for row in membership]
+
+    movies = pd.DataFrame({'movie_id': np.arange(1, n_movies + 1), 'title': titles, 'genres': genres})
+    return movies, membership
+
+
+def make_users(rng, n_users):
+    """users DataFrame [user_id, gender, age, occupation, zip_code]"""
+    occupation_p = np.array(OCCUPATIONS) / sum(OCCUPATIONS)
+    return pd.DataFrame({
+        'user_id': np.arange(1, n_users + 1),
+        'gender': rng.choice(['M', 'F'], size=n_users, p=[0.717, 0.283]),
+        'age': rng.choice(list(AGES), size=n_users, p=np.array(list(AGES.values())) / sum(AGES.values())),
+        'occupation': rng.choice(len(OCCUPATIONS), size=n_users, p=occupation_p),
+        'zip_code': [f"{z:05d}" for z in rng.integers(1000, 99999, n_users)],
+    })
+
+
+def write_dat(path, df, header):
+    """Write a DataFrame as '::'-separated lines"""
+    with open(path, 'w', encoding='ISO-8859-1') as handle:
+        if header:
+            handle.write(header + '\n')
+        handle.write(''.join('::'.join(map(str, row)) + '\n' for row in df.itertuples(index=False)))
+
+
+def _activity(rng, n_users, n_ratings, n_movies, min_ratings=20):
+    """Ratings per user: log-normal skew, at least min_ratings, summing to n_ratings"""
+    cap = max(min_ratings, n_movies // 2)
+    weights = rng.lognormal(0.0, 1.0, n_users)
+    counts = np.clip(np.round(weights / weights.sum() * n_ratings), min_ratings, cap).astype(np.int64)
+    # Spread the rounding / clipping difference over users that still have room
+    difference = n_ratings - counts.sum()
+    while difference != 0:
+        room = np.flatnonzero(counts < cap) if difference > 0 else np.flatnonzero(counts > min_ratings)
+        if len(room) == 0:
+            break
+        chosen = rng.choice(room, size=min(abs(difference), len(room)), replace=False)
+        counts[chosen] += np.sign(difference)
+        difference = n_ratings - counts.sum()
+    return counts
+
+
+def _sample_movies(rng, users, counts, favorite, cumulative, genre_cumulative, genre_movies, favorite_share,
+                   redraw_rounds=8):
+    """
+    Distinct movies per user: popularity sampling, part of it inside the
+    favorite genre. Duplicates are redrawn a few rounds; what is left (heavy
+    users running into the long tail) is drawn without replacement per user.
+    """
+    owners = np.repeat(users, counts)
+    movies = np.full(len(owners), -1, dtype=np.int64)
+    pending = np.arange(len(owners))
+
+    for _ in range(redraw_rounds):
+        if len(pending) == 0:
+            break
+        draws = rng.random(len(pending))
+        in_genre = rng.random(len(pending)) < favorite_share
+        picked = np.searchsorted(cumulative, draws * cumulative[-1])
+        for genre in np.unique(favorite[owners[pending[in_genre]]]):
+            rows = np.flatnonzero(in_genre & (favorite[owners[pending]] == genre))
+            scale = genre_cumulative[genre][-1]
+            picked[rows] = genre_movies[genre][np.searchsorted(genre_cumulative[genre], draws[rows] * scale)]
+        movies[pending] = np.minimum(picked, len(cumulative) - 1)
+
+        # Keep the first copy of every (user, movie); redraw the duplicates
+        keys = owners * len(cumulative) + movies
+        _, first = np.unique(keys, return_index=True)
+        duplicate = np.ones(len(keys), dtype=bool)
+        duplicate[first] = False
+        pending = np.flatnonzero(duplicate)
+
+    weights = np.diff(cumulative, prepend=0.0)
+    is_pending = np.zeros(len(owners), dtype=bool)
+    is_pending[pending] = True
+    for user in np.unique(owners[pending]):
+        start, end = np.searchsorted(owners, [user, user + 1])
+        redraw = is_pending[start:end]
+        taken = np.zeros(len(cumulative), dtype=bool)
+        taken[movies[start:end][~redraw]] = True
+        available = np.flatnonzero(~taken)
+        p = weights[available] / weights[available].sum()
+        movies[start:end][redraw] = rng.choice(available, size=redraw.sum(), replace=False, p=p)
+    return owners, movies
+
+
+def generate(output_dir, n_ratings=1_000_000, n_users=None, n_movies=None, seed=42,
+             popularity_exponent=1.0, favorite_share=0.4, start='2000-04-25', end='2003-02-28',
+             header=True, block_ratings=1_000_000):
+    """
+    Write synthetic movies.dat, users.dat and ratings.dat to output_dir
+
+    Parameters:
+    -----------
+    output_dir : Folder for the three files (created if missing)
+    n_ratings : Total ratings
+    n_users, n_movies : Default: scaled from MovieLens-1M (see default_shape)
+    seed : Random seed; the same arguments always produce the same files
+    popularity_exponent : Zipf exponent of movie popularity (larger = more skewed)
+    favorite_share : Share of each user's ratings drawn from their favorite genre
+    start, end : Rating period
+    header : Write the header row of the bundled files
+    block_ratings : Approximate ratings generated and written per block
+
+    Returns:
+    --------
+    dict with the counts, the paths and the elapsed seconds
+    """
+    start_time = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    default_users, default_movies = default_shape(n_ratings)
+    n_users = n_users or default_users
+    n_movies = n_movies or default_movies
+    if n_ratings > n_users * n_movies // 2:
+        raise ValueError(f"{n_ratings:,} ratings do not fit {n_users:,} users x {n_movies:,} movies")
+    os.makedirs(output_dir, exist_ok=True)
+
+    movies, membership = make_movies(rng, n_movies)
+    users = make_users(rng, n_users)
+    write_dat(os.path.join(output_dir, 'movies.dat'), movies, MOVIES_HEADER if header else None)
+    write_dat(os.path.join(output_dir, 'users.dat'), users, USERS_HEADER if header else None)
+
+    # Power-law popularity over a random order of the movies
+    popularity = np.empty(n_movies)
+    popularity[rng.permutation(n_movies)] = np.arange(1, n_movies + 1) ** -popularity_exponent
+    cumulative = np.cumsum(popularity)
+    genre_movies = [np.flatnonzero(membership[:, g]) for g in range(membership.shape[1])]
+    genre_cumulative = [np.cumsum(popularity[movies_of_genre]) for movies_of_genre in genre_movies]
+
+    quality = np.clip(rng.normal(3.5, 0.45, n_movies), 1.5, 4.7)
+    user_bias = rng.normal(0.0, 0.35, n_users)
+    genre_p = membership.sum(axis=0) / membership.sum()
+    favorite = rng.choice(membership.shape[1], size=n_users, p=genre_p)
+
+    # Signups skewed toward the start of the period; rating bursts after signup
+    period_start = int(pd.Timestamp(start).timestamp())
+    period_end = int(pd.Timestamp(end).timestamp())
+    span = period_end - period_start
+    signup = period_start + (np.minimum(rng.exponential(0.25, n_users), 1.0) * span * 0.9).astype(np.int64)
+
+    counts = _activity(rng, n_users, n_ratings, n_movies)
+    block_ends = np.searchsorted(np.cumsum(counts), np.arange(block_ratings, n_ratings, block_ratings))
+    boundaries = np.unique(np.concatenate([[0], block_ends + 1, [n_users]]))
+
+    ratings_path = os.path.join(output_dir, 'ratings.dat')
+    with open(ratings_path, 'w', encoding='ISO-8859-1') as handle:
+        if header:
+            handle.write(RATINGS_HEADER + '\n')
+        for block_start, block_end in zip(boundaries[:-1], boundaries[1:]):
+            block_users = np.arange(block_start, block_end)
+            owners, movie_codes = _sample_movies(
+                rng, block_users, counts[block_users], favorite,
+                cumulative, genre_cumulative, genre_movies, favorite_share
+            )
+            bonus = np.where(membership[movie_codes, favorite[owners]], 0.5, -0.1)
+            noise = rng.normal(0.0, 0.8, len(owners))
+            ratings = np.clip(np.round(quality[movie_codes] + user_bias[owners] + bonus + noise), 1, 5).astype(int)
+
+            burst = rng.exponential(30 * 86400, len(owners)) * np.where(rng.random(len(owners)) < 0.8, 0.05, 1.0)
+            timestamps = np.minimum(signup[owners] + burst.astype(np.int64), period_end)
+
+            order = np.lexsort((timestamps, owners))
+            columns = (owners[order] + 1, movie_codes[order] + 1, ratings[order], timestamps[order])
+            handle.write(''.join(f"{u}::{m}::{r}::{t}\n" for u, m, r, t in zip(*columns)))
+
+    return {
+        'ratings': int(counts.sum()),
+        'users': n_users,
+        'movies': n_movies,
+        'output_dir': output_dir,
+        'seconds': time.perf_counter() - start_time
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetic MovieLens-shaped data')
+    parser.add_argument('--ratings', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=None)
+    parser.add_argument('--movies', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--popularity-exponent', type=float, default=1.0)
+    parser.add_argument('--output', default=None, help='Default: ./data/synthetic_<ratings>/')
+    parser.add_argument('--no-header', action='store_true')
+    parser.add_argument('--force', action='store_true', help='Overwrite existing .dat files')
+    args = parser.parse_args()
+
+    output_dir = args.output or f'./data/synthetic_{args.ratings}/'
+    existing = [name for name in ('ratings.dat', 'movies.dat', 'users.dat')
+                if os.path.exists(os.path.join(output_dir, name))]
+    if existing and not args.force:
+        print(f"❌ {output_dir} already has {', '.join(existing)} (use --force to overwrite)")
+        return None
+
+    print(f"🎲 Generating {args.ratings:,} ratings into {output_dir} (seed {args.seed})...")
+    summary = generate(
+        output_dir, args.ratings, args.users, args.movies, seed=args.seed,
+        popularity_exponent=args.popularity_exponent, header=not args.no_header
+    )
+    print(f"✅ {summary['ratings']:,} ratings, {summary['users']:,} users, "
+          f"{summary['movies']:,} movies in {summary['seconds']:.1f}s")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+TRENDING INDEX
+==============
+Per-movie rating counts over time windows, precomputed once from the rating
+timestamps.
+
+Ratings are bucketed by age (days before the newest rating in the data).
+Every (movie, age bucket) pair that has ratings becomes one sorted key
+
+    key = movie position * n_buckets + age
+
+with the running count of ratings up to it, so the count of any window for
+every movie is two searchsorted calls over the keys (one query per movie) and
+trending is a top-K over the result. Memory grows with the distinct (movie,
+day) pairs, at most one per rating, not with days x catalog. Totals and an
+exponentially decayed count (half-life in days) are precomputed alongside,
+and recent window counts are cached.
+"""
+
+import re
+
+import numpy as np
+
+SECONDS_PER_DAY = 86400
+# Distinct (start, end) bucket windows whose counts are kept
+WINDOW_CACHE_SIZE = 32
+
+
+def parse_window(window):
+    """
+    Normalize a trending window
+
+    Parameters:
+    -----------
+    window : None or 'all', 'decay', or a number of days ('7', '7d', 30)
+
+    Returns:
+    --------
+    'all', 'decay' or a positive int number of days; anything else raises ValueError
+    """
+    if window is None or str(window).lower() in ('', 'all'):
+        return 'all'
+    if str(window).lower() == 'decay':
+        return 'decay'
+    match = re.fullmatch(r'(\d+)d?', str(window).strip().lower())
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"Invalid window: {window!r} (use 'all', 'decay' or a number of days like '7d')")
+    return int(match.group(1))
+
+
+class TrendingIndex:
+    """
+    Cumulative per-movie rating counts by age bucket
+    """
+
+    def __init__(self, movie_ids, rated_movie_ids, timestamps, bucket_days=1, half_life_days=30.0):
+        """
+        Build the index
+
+        Parameters:
+        -----------
+        movie_ids : Catalog movie ids; every count array follows this order
+        rated_movie_ids, timestamps : One entry per rating (unix seconds)
+        bucket_days : Bucket width in days (window lengths round up to whole buckets)
+        half_life_days : Half-life of the decayed count
+        """
+        self.movie_ids = np.asarray(movie_ids)
+        self.bucket_days = bucket_days
+        self.half_life_days = half_life_days
+        n_movies = len(self.movie_ids)
+
+        rated_movie_ids = np.asarray(rated_movie_ids)
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.max_timestamp = int(timestamps.max()) if len(timestamps) else 0
+
+        # Catalog position of every rating (ratings of unknown movies are dropped)
+        sorter = np.argsort(self.movie_ids, kind='stable')
+        positions = np.searchsorted(self.movie_ids, rated_movie_ids, sorter=sorter)
+        positions = np.minimum(positions, n_movies - 1)
+        codes = sorter[positions]
+        known = self.movie_ids[codes] == rated_movie_ids
+        codes = codes[known]
+
+        ages = (self.max_timestamp - timestamps[known]) // (SECONDS_PER_DAY * bucket_days)
+        self.n_buckets = int(ages.max()) + 1 if len(ages) else 1
+
+        # Sorted (movie, age) keys and the number of ratings up to each key
+        key_dtype = np.uint32 if n_movies * self.n_buckets < 2 ** 32 else np.int64
+        keys = codes.astype(key_dtype) * key_dtype(self.n_buckets) + ages.astype(key_dtype)
+        self.keys, pair_counts = np.unique(keys, return_counts=True)
+        count_dtype = np.int32 if len(keys) < 2 ** 31 else np.int64
+        self.cumulative = np.zeros(len(self.keys) + 1, dtype=count_dtype)
+        np.cumsum(pair_counts, out=self.cumulative[1:])
+        self.movie_starts = np.arange(n_movies, dtype=key_dtype) * key_dtype(self.n_buckets)
+
+        pair_movies = self.keys // key_dtype(self.n_buckets)
+        pair_age_days = (self.keys % key_dtype(self.n_buckets)) * bucket_days
+        self.totals = np.bincount(pair_movies, weights=pair_counts, minlength=n_movies).astype(count_dtype)
+        self.decayed = np.bincount(
+            pair_movies, weights=pair_counts * 0.5 ** (pair_age_days / half_life_days), minlength=n_movies
+        ).astype(np.float32)
+        self._window_cache = {}
+
+    @classmethod
+    def from_ratings(cls, ratings_df, movie_ids, **kwargs):
+        """Build from a DataFrame with columns [movie_id, timestamp]"""
+        return cls(movie_ids, ratings_df['movie_id'].values, ratings_df['timestamp'].values, **kwargs)
+
+    @property
+    def memory_mb(self):
+        """Size of the key and count arrays in MB"""
+        arrays = (self.keys, self.cumulative, self.movie_starts, self.totals, self.decayed)
+        return sum(array.nbytes for array in arrays) / 2 ** 20
+
+    def window_counts(self, days, offset_days=0):
+        """Ratings per movie in the `days` days ending `offset_days` before the newest rating"""
+        start = min(-(-offset_days // self.bucket_days), self.n_buckets)
+        end = min(-(-(offset_days + days) // self.bucket_days), self.n_buckets)
+        counts = self._window_cache.get((start, end))
+        if counts is None:
+            # Ages are < n_buckets, so start + n_buckets is the next movie's first key
+            lower = np.searchsorted(self.keys, self.movie_starts + start)
+            upper = np.searchsorted(self.keys, self.movie_starts + end)
+            counts = self.cumulative[upper] - self.cumulative[lower]
+            counts.flags.writeable = False
+            if len(self._window_cache) >= WINDOW_CACHE_SIZE:
+                self._window_cache.clear()
+            self._window_cache[(start, end)] = counts
+        return counts
+
+    def counts(self, window='all'):
+        """Per-movie counts for a window accepted by parse_window"""
+        window = parse_window(window)
+        if window == 'all':
+            return self.totals
+        if window == 'decay':
+            return self.decayed
+        return self.window_counts(window)
+
+    def top(self, window='all', limit=10, min_ratings=1, allowed=None):
+        """
+        Most rated movies in a window
+
+        Parameters:
+        -----------
+        window : See parse_window
+        limit : Number of movies
+        min_ratings : Minimum count (decayed count for 'decay') in the window
+        allowed : Optional boolean mask over movie_ids (e.g. a genre filter)
+
+        Returns:
+        --------
+        (positions, counts) : catalog positions and window counts, most rated
+        first (ties keep catalog order)
+        """
+        if limit < 0:
+            raise ValueError(f"Invalid limit: {limit} (must be >= 0)")
+        counts = self.counts(window)
+        eligible = (counts >= min_ratings) & (counts > 0)
+        if allowed is not None:
+            eligible &= allowed
+        positions = np.flatnonzero(eligible)
+
+        if 0 < limit < len(positions):
+            # Keep everything tied with the limit-th count, then order exactly
+            threshold = np.partition(counts[positions], len(positions) - limit)[len(positions) - limit]
+            positions = positions[counts[positions] >= threshold]
+        positions = positions[np.argsort(-counts[positions], kind='stable')][:limit]
+        return positions, counts[positions]
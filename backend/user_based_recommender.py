@@ -6,17 +6,27 @@ Recommender system based on user similarity using Pearson Correlation
 
 import pandas as pd
 import numpy as np
-from scipy.stats import pearsonr
+from data_loader import read_movies, read_ratings
+from rating_index import RatingIndex
+from similarity import grouped_pearson, load_neighbors
 import warnings
 warnings.filterwarnings('ignore')
 
 
+def last_rating_per_movie(movie_codes, ratings):
+    """Drop repeated movies, keeping each movie's last rating (input order otherwise kept)"""
+    movie_codes = np.asarray(movie_codes)
+    _, last = np.unique(movie_codes[::-1], return_index=True)
+    keep = np.sort(len(movie_codes) - 1 - last)
+    return movie_codes[keep], np.asarray(ratings)[keep]
+
+
 class UserBasedRecommender:
     """
     User-based Collaborative Filtering Recommender System
     """
     
-    def __init__(self, ratings_df, movies_df):
+    def __init__(self, ratings_df, movies_df, index=None):
         """
         Initialize User-based Recommender
         
@@ -24,9 +34,12 @@ class UserBasedRecommender:
         -----------
         ratings_df : DataFrame with columns [user_id, movie_id, rating]
         movies_df : DataFrame with columns [movie_id, title, genres]
+        index : Optional prebuilt RatingIndex over ratings_df
         """
         self.ratings = ratings_df
         self.movies = movies_df
+        self.index = index
+        self.user_neighbors = None
         self.new_user_ratings = None
         
     def get_user_input(self, sample_movies=None, n_movies=10):
@@ -85,13 +98,31 @@ class UserBasedRecommender:
         
         return self.new_user_ratings
     
-    def find_similar_users(self, top_n=100):
+    def _build_index(self):
+        """Build the movie <-> user posting lists once"""
+        if self.index is None:
+            self.index = RatingIndex.from_ratings(self.ratings)
+        return self.index
+
+    def _new_user_postings(self):
+        """New user's ratings as (movie_codes, ratings), unknown movies dropped and the last of repeated movies kept"""
+        index = self._build_index()
+        movie_codes = index.movie_codes(self.new_user_ratings['movie_id'].values)
+        ratings = self.new_user_ratings['rating'].values.astype(np.float32)
+        known = movie_codes >= 0
+        return last_rating_per_movie(movie_codes[known], ratings[known])
+
+    def find_similar_users(self, top_n=None):
         """
         Find users who have watched the same movies as the new user
         
+        Candidates are gathered by concatenating the posting lists of the
+        new user's movies, so the cost depends only on those movies.
+        
         Parameters:
         -----------
-        top_n : Number of most similar users to consider
+        top_n : Number of users with the most common movies to consider
+                (default: all of them)
         """
         print("\n" + "="*80)
         print("FINDING SIMILAR USERS")
@@ -102,90 +133,94 @@ class UserBasedRecommender:
             return None
         
         # Get movies rated by new user
-        new_user_movies = set(self.new_user_ratings['movie_id'].values)
+        movie_codes, _ = self._new_user_postings()
         
         print(f"\n🔍 Finding users who watched the same movies...")
-        print(f"   New user rated {len(new_user_movies)} movies")
+        print(f"   New user rated {len(self.new_user_ratings)} movies")
         
-        # Find users who have rated at least one of the same movies
-        similar_users_data = self.ratings[
-            self.ratings['movie_id'].isin(new_user_movies)
-        ].copy()
+        # Postings of those movies: every (user, movie, rating) that overlaps
+        user_codes, posting_movies, posting_ratings = self.index.users_for_movies(movie_codes)
+        similar_users_data = pd.DataFrame({
+            'user_id': self.index.user_ids[user_codes],
+            'movie_id': self.index.movie_ids[posting_movies],
+            'rating': posting_ratings
+        })
         
         # Count common movies for each user
-        common_movie_counts = (similar_users_data.groupby('user_id')
-                              .size()
-                              .sort_values(ascending=False))
+        candidates, common_counts = np.unique(user_codes, return_counts=True)
+        order = np.argsort(-common_counts, kind='stable')
+        candidates, common_counts = candidates[order], common_counts[order]
         
-        print(f"\n📊 Found {len(common_movie_counts)} users with common movies")
-        print(f"   Max common movies: {common_movie_counts.max()}")
-        print(f"   Avg common movies: {common_movie_counts.mean():.2f}")
+        print(f"\n📊 Found {len(candidates)} users with common movies")
+        if len(candidates) > 0:
+            print(f"   Max common movies: {common_counts.max()}")
+            print(f"   Avg common movies: {common_counts.mean():.2f}")
         
         # Take top N users with most common movies
-        top_users = common_movie_counts.head(top_n).index.tolist()
+        if top_n is not None:
+            candidates = candidates[:top_n]
+        top_users = self.index.user_ids[candidates].tolist()
         
         print(f"\n✅ Selected top {len(top_users)} users for similarity calculation")
         
         return top_users, similar_users_data
     
-    def calculate_user_similarity(self, top_users, similar_users_data):
+    def user_similarities(self, movie_codes, ratings, min_common=2):
+        """
+        Pearson correlation between a rating vector and every user sharing
+        at least one movie with it, computed from the movies' posting lists
+        (a movie given twice counts once, with its last rating)
+
+        Returns:
+        --------
+        (user_codes, correlation, common) : positive correlations only
         """
-        Calculate Pearson Correlation similarity for each user
+        index = self._build_index()
+        movie_codes, ratings = last_rating_per_movie(movie_codes, ratings)
+        user_codes, posting_movies, posting_ratings = index.users_for_movies(movie_codes)
+
+        # Pair each posting with the new user's rating of the same movie
+        new_ratings = np.repeat(ratings, np.diff(index.movie_matrix.indptr)[movie_codes])
+        candidates, groups = np.unique(user_codes, return_inverse=True)
+        correlation, common = grouped_pearson(
+            groups, posting_ratings, new_ratings, len(candidates), min_common
+        )
+
+        keep = np.nan_to_num(correlation) > 0
+        return candidates[keep], correlation[keep], common[keep]
+
+    def calculate_user_similarity(self, top_users=None, similar_users_data=None):
+        """
+        Calculate Pearson Correlation similarity against all candidate users at once
+
+        Co-counts and centered sums over the co-rated movies are accumulated
+        per candidate from the posting lists of the new user's movies;
+        users with fewer than 2 common movies or non-positive correlation
+        are dropped.
         
         Parameters:
         -----------
-        top_users : List of user IDs to calculate similarity with
-        similar_users_data : DataFrame with ratings from similar users
+        top_users : Optional list of user IDs to restrict the result to
+                    (default: every user sharing a movie)
+        similar_users_data : Unused; kept for backwards compatibility
         """
         print("\n" + "="*80)
         print("CALCULATING USER SIMILARITY (Pearson Correlation)")
         print("="*80)
         
-        similarities = []
+        movie_codes, ratings = self._new_user_postings()
         
-        # Create a mapping of new user's ratings
-        new_user_rating_map = dict(zip(
-            self.new_user_ratings['movie_id'],
-            self.new_user_ratings['rating']
-        ))
+        print(f"\n🔄 Calculating similarity against users sharing {len(movie_codes)} movies...")
         
-        print(f"\n🔄 Calculating similarity for {len(top_users)} users...")
+        user_codes, correlation, common = self.user_similarities(movie_codes, ratings)
         
-        for user_id in top_users:
-            # Get ratings for this user
-            user_ratings = similar_users_data[
-                similar_users_data['user_id'] == user_id
-            ]
-            
-            # Find common movies
-            common_movies = set(user_ratings['movie_id'].values).intersection(
-                set(new_user_rating_map.keys())
-            )
-            
-            if len(common_movies) < 2:  # Need at least 2 common movies
-                continue
-            
-            # Get ratings for common movies
-            new_user_common_ratings = [new_user_rating_map[mid] for mid in common_movies]
-            other_user_common_ratings = [
-                user_ratings[user_ratings['movie_id'] == mid]['rating'].values[0]
-                for mid in common_movies
-            ]
-            
-            # Calculate Pearson correlation
-            try:
-                corr, _ = pearsonr(new_user_common_ratings, other_user_common_ratings)
-                
-                if not np.isnan(corr) and corr > 0:  # Only positive correlations
-                    similarities.append({
-                        'user_id': user_id,
-                        'similarity': corr,
-                        'common_movies': len(common_movies)
-                    })
-            except:
-                continue
-        
-        similarities_df = pd.DataFrame(similarities)
+        similarities_df = pd.DataFrame({
+            'user_id': self.index.user_ids[user_codes],
+            'similarity': correlation,
+            'common_movies': common
+        })
+        if top_users is not None:
+            similarities_df = similarities_df[similarities_df['user_id'].isin(top_users)]
         similarities_df = similarities_df.sort_values('similarity', ascending=False)
         
         print(f"\n✅ Calculated similarity for {len(similarities_df)} users")
@@ -194,6 +229,37 @@ class UserBasedRecommender:
         
         return similarities_df
     
+    def score_movies(self, user_codes, similarities, exclude_movie_codes=()):
+        """
+        Similarity-weighted ratings of every movie rated by the given users
+
+        Parameters:
+        -----------
+        user_codes : Index rows of the neighbor users
+        similarities : Their similarity to the new user
+        exclude_movie_codes : Movies to leave out (already rated)
+
+        Returns:
+        --------
+        dict of aligned arrays: movie_codes, weighted_rating_sum,
+        similarity_sum, num_ratings
+        """
+        index = self._build_index()
+        owners, movie_codes, ratings = index.movies_for_users(user_codes)
+
+        # Weight of each posting = similarity of the user it came from
+        weights = np.repeat(similarities, np.diff(index.user_matrix.indptr)[user_codes])
+        keep = ~np.isin(movie_codes, exclude_movie_codes)
+        movie_codes, ratings, weights = movie_codes[keep], ratings[keep], weights[keep]
+
+        unique_movies, groups = np.unique(movie_codes, return_inverse=True)
+        return {
+            'movie_codes': unique_movies,
+            'weighted_rating_sum': np.bincount(groups, ratings * weights, len(unique_movies)),
+            'similarity_sum': np.bincount(groups, weights, len(unique_movies)),
+            'num_ratings': np.bincount(groups, minlength=len(unique_movies))
+        }
+
     def get_recommendations(self, similarities_df, top_similar_users=10, top_n_movies=10):
         """
         Get movie recommendations based on similar users
@@ -217,37 +283,19 @@ class UserBasedRecommender:
         if len(top_similar) > 5:
             print(f"   ... and {len(top_similar) - 5} more users")
         
-        # Get all movies rated by similar users
-        similar_user_ids = top_similar['user_id'].tolist()
-        similar_user_ratings = self.ratings[
-            self.ratings['user_id'].isin(similar_user_ids)
-        ].copy()
-        
-        # Exclude movies already rated by new user
-        new_user_movies = set(self.new_user_ratings['movie_id'].values)
-        candidate_movies = similar_user_ratings[
-            ~similar_user_ratings['movie_id'].isin(new_user_movies)
-        ].copy()
-        
-        # Merge with similarity scores
-        candidate_movies = candidate_movies.merge(
-            top_similar[['user_id', 'similarity']],
-            on='user_id'
-        )
-        
-        # Calculate weighted rating
-        candidate_movies['weighted_rating'] = (
-            candidate_movies['rating'] * candidate_movies['similarity']
+        # Weighted scores from the similar users' posting lists
+        movie_codes, _ = self._new_user_postings()
+        scores = self.score_movies(
+            self.index.user_codes(top_similar['user_id'].values),
+            top_similar['similarity'].values,
+            movie_codes
         )
-        
-        # Group by movie and calculate average recommendation score
-        movie_scores = candidate_movies.groupby('movie_id').agg({
-            'weighted_rating': 'sum',
-            'similarity': 'sum',
-            'rating': 'count'
-        }).reset_index()
-        
-        movie_scores.columns = ['movie_id', 'weighted_rating_sum', 'similarity_sum', 'num_ratings']
+        movie_scores = pd.DataFrame({
+            'movie_id': self.index.movie_ids[scores['movie_codes']],
+            'weighted_rating_sum': scores['weighted_rating_sum'],
+            'similarity_sum': scores['similarity_sum'],
+            'num_ratings': scores['num_ratings']
+        })
         
         # Calculate recommendation score
         movie_scores['recommendation_score'] = (
@@ -277,6 +325,56 @@ class UserBasedRecommender:
         
         return top_recommendations
     
+    def load_user_neighbors(self, path='user_neighbors.npz'):
+        """
+        Load the top-k user neighbor table written by
+        MovieRecommenderSystem.compute_user_neighbors
+        """
+        self.user_neighbors = load_neighbors(path)
+        return self.user_neighbors
+    
+    def recommend_for_existing_user(self, user_id, top_similar_users=10, top_n_movies=10):
+        """
+        Recommendations for a user already in the dataset, using the
+        precomputed neighbor table instead of a similarity search
+        
+        Parameters:
+        -----------
+        user_id : Existing user ID
+        top_similar_users : Number of neighbors to use (<= table width)
+        top_n_movies : Number of movies to recommend
+        """
+        if self.user_neighbors is None:
+            self.load_user_neighbors()
+        
+        index = self._build_index()
+        table = self.user_neighbors
+        row = np.searchsorted(table['ids'], user_id)
+        if row >= len(table['ids']) or table['ids'][row] != user_id:
+            print(f"❌ User {user_id} not in neighbor table!")
+            return None
+        
+        # Valid neighbors only (-1 pads users with few similar users)
+        valid = table['neighbors'][row][:top_similar_users] >= 0
+        neighbor_ids = table['ids'][table['neighbors'][row][:top_similar_users][valid]]
+        similarities = table['scores'][row][:top_similar_users][valid]
+        
+        user_code = index.user_codes(user_id)
+        _, own_movies, _ = index.movies_for_users(user_code)
+        scores = self.score_movies(index.user_codes(neighbor_ids), similarities, own_movies)
+        
+        movie_scores = pd.DataFrame({
+            'movie_id': index.movie_ids[scores['movie_codes']],
+            'recommendation_score': scores['weighted_rating_sum'] / scores['similarity_sum'],
+            'num_ratings': scores['num_ratings']
+        })
+        movie_scores = movie_scores.sort_values('recommendation_score', ascending=False)
+        
+        return movie_scores.head(top_n_movies).merge(
+            self.movies[['movie_id', 'title', 'genres']],
+            on='movie_id'
+        )
+    
     def run_user_based_recommendation(self, sample_movies=None, n_movies_to_rate=10,
                                      top_similar_users=10, top_n_recommendations=10):
         """
@@ -296,8 +394,8 @@ class UserBasedRecommender:
         # Step 1: Get user ratings
         self.get_user_input(sample_movies, n_movies_to_rate)
         
-        # Step 2: Find similar users
-        top_users, similar_users_data = self.find_similar_users(top_n=100)
+        # Step 2: Find similar users (every user sharing a movie)
+        top_users, similar_users_data = self.find_similar_users()
         
         # Step 3: Calculate user similarity
         similarities_df = self.calculate_user_similarity(top_users, similar_users_data)
@@ -316,8 +414,8 @@ class UserBasedRecommender:
         return recommendations
 
 
-def main_user_based(ratings_df, movies_df):
-    """Main function for User-based Collaborative Filtering"""
+def main_user_based(ratings_df, movies_df, index=None):
+    """Main function for User-based Collaborative Filtering (index: optional shared RatingIndex)"""
     print("\n" + "👥"*40)
     print(" "*20 + "USER-BASED COLLABORATIVE FILTERING RECOMMENDER")
     print("👥"*40 + "\n")
@@ -325,7 +423,8 @@ def main_user_based(ratings_df, movies_df):
     # Initialize recommender
     user_recommender = UserBasedRecommender(
         ratings_df=ratings_df,
-        movies_df=movies_df
+        movies_df=movies_df,
+        index=index
     )
     
     # Run recommendation pipeline
@@ -341,23 +440,8 @@ def main_user_based(ratings_df, movies_df):
 if __name__ == "__main__":
     # Load data
     print("Loading data...")
-    ratings = pd.read_csv(
-        './data/ratings.dat',
-        sep='::',
-        engine='python',
-        header=0,
-        names=['user_id', 'movie_id', 'rating', 'timestamp'],
-        encoding='ISO-8859-1'
-    )
-    
-    movies = pd.read_csv(
-        './data/movies.dat',
-        sep='::',
-        engine='python',
-        header=0,
-        names=['movie_id', 'title', 'genres'],
-        encoding='ISO-8859-1'
-    )
+    ratings = read_ratings('./data/ratings.dat')
+    movies = read_movies('./data/movies.dat')
     
     # Run User-based Collaborative Filtering
     user_recommender, recommendations = main_user_based(ratings, movies)
@@ -10,9 +10,11 @@ export const api = {
     },
 
     // Get all movies or search
-    async getMovies(search = '', limit = 50) {
+    async getMovies(search = '', limit = 50, genre = '', excludeGenre = '') {
         const params = new URLSearchParams()
         if (search) params.append('search', search)
+        if (genre) params.append('genre', genre)
+        if (excludeGenre) params.append('exclude_genre', excludeGenre)
         params.append('limit', limit.toString())
 
         const response = await fetch(`${API_BASE_URL}/movies?${params}`)
@@ -20,13 +22,17 @@ export const api = {
     },
 
     // Get trending movies
-    async getTrending(limit = 10) {
-        const response = await fetch(`${API_BASE_URL}/trending?limit=${limit}`)
+    async getTrending(limit = 10, genre = '', window = '') {
+        const params = new URLSearchParams({ limit: limit.toString() })
+        if (genre) params.append('genre', genre)
+        if (window) params.append('window', window)
+
+        const response = await fetch(`${API_BASE_URL}/trending?${params}`)
         return response.json()
     },
 
     // Get recommendations
-    async getRecommendations(movieTitle, topN = 10, method = 'cosine') {
+    async getRecommendations(movieTitle, topN = 10, method = 'cosine', genre = '', excludeGenre = '') {
         const response = await fetch(`${API_BASE_URL}/recommend`, {
             method: 'POST',
             headers: {
@@ -35,7 +41,31 @@ export const api = {
             body: JSON.stringify({
                 movie_title: movieTitle,
                 top_n: topN,
-                method: method
+                method: method,
+                genre: genre || undefined,
+                exclude_genre: excludeGenre || undefined
+            })
+        })
+
+        if (!response.ok) {
+            const error = await response.json()
+            throw new Error(error.error || 'Failed to get recommendations')
+        }
+
+        return response.json()
+    },
+
+    // Get recommendations for a new user from their ratings
+    async getUserRecommendations(ratings, topN = 10, neighbors = 10) {
+        const response = await fetch(`${API_BASE_URL}/recommend/user`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                ratings: ratings,
+                top_n: topN,
+                neighbors: neighbors
             })
         })
 